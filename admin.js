@@ -5,18 +5,63 @@ document.addEventListener('DOMContentLoaded', function() {
     // Event listeners
     document.getElementById('addBtn').addEventListener('click', addItem);
     document.getElementById('refreshBtn').addEventListener('click', loadAllItems);
+    document.getElementById('importBtn').addEventListener('click', importItems);
     
-    // Load all items on page load
+    // Load all items on page load, then keep them current from /events/menu
     loadAllItems();
+    menuEvents = subscribeMenuEvents({ onChange: applyMenuChange, onResync: loadAllItems });
 });
 
+let menuEvents = { live: false };
+
+// Our own edits come back as events too; without a live stream, reload instead
+function refreshAfterEdit() {
+    if (!menuEvents.live) {
+        loadAllItems();
+    }
+}
+
+// Patch the table in place from an insert/update/delete event
+function applyMenuChange(change) {
+    const tbody = document.querySelector('#itemsList .items-table tbody');
+    if (!tbody) {
+        // Showing the empty state; just render the list again
+        loadAllItems();
+        return;
+    }
+    const ids = change.type === 'delete' ? change.ids : change.items.map(item => item.id);
+    ids.forEach(removeItemRows);
+    if (change.type !== 'delete') {
+        change.items.forEach(item => {
+            insertMenuItemHtml(tbody, 'tr[data-price]', item, renderItemRows(item), !!listCursor);
+        });
+    }
+}
+
+function removeItemRows(id) {
+    ['item-', 'edit-form-'].forEach(prefix => {
+        const row = document.getElementById(prefix + id);
+        if (row) {
+            row.remove();
+        }
+    });
+}
+
 function checkAuthStatus() {
     fetch('/check-auth')
-        .then(response => response.json())
+        .then(response => {
+            // 503: the session could not be renewed just now, but is kept
+            return response.status === 503 ? null : response.json();
+        })
         .then(data => {
+            if (data === null) {
+                return;
+            }
             if (!data.authenticated) {
                 // User is not authenticated, redirect to login
                 window.location.href = '/login';
+            } else if (data.session_expires_in !== undefined) {
+                scheduleSessionRefresh(data.session_expires_in);
             }
         })
         .catch(error => {
@@ -26,6 +71,40 @@ function checkAuthStatus() {
         });
 }
 
+// With SESSION_MODE=signed, renew the session cookie about a minute before
+// it expires, so requests from this page never have to wait on a refresh
+let sessionRefreshTimer = null;
+
+function scheduleSessionRefresh(expiresIn) {
+    clearTimeout(sessionRefreshTimer);
+    const delay = Math.max(expiresIn - 60, expiresIn / 2, 1) * 1000;
+    sessionRefreshTimer = setTimeout(refreshSession, delay);
+}
+
+function refreshSession() {
+    fetch('/refresh-session', { method: 'POST' })
+        .then(response => {
+            // Only 401 means the session is gone; 503 (Supabase unreachable),
+            // 429 and 504 keep it, so try again after Retry-After
+            if (response.status === 401) {
+                window.location.href = '/login';
+                return;
+            }
+            return response.json().then(data => {
+                if (data.success) {
+                    scheduleSessionRefresh(data.expires_in);
+                } else {
+                    const retryAfter = Number(response.headers.get('Retry-After')) || 5;
+                    sessionRefreshTimer = setTimeout(refreshSession, retryAfter * 1000);
+                }
+            });
+        })
+        .catch(error => {
+            // Leave it to the next request; an expired cookie is renewed there too
+            console.error('Session refresh failed:', error);
+        });
+}
+
 function logout() {
     if (confirm('Are you sure you want to logout?')) {
         fetch('/logout', {
@@ -96,7 +175,7 @@ function addItem() {
                 document.getElementById('addPrice').value = '';
                 document.getElementById('addImageUrl').value = '';
                 // Refresh the list
-                loadAllItems();
+                refreshAfterEdit();
             } else {
                 throw new Error('Failed to add item');
             }
@@ -112,18 +191,111 @@ function addItem() {
         });
 }
 
-function loadAllItems() {
-    fetch('/list')
+// Uploads a CSV or JSON file to /bulk/items in one request; the server
+// validates every row first and lists per-row errors if any are bad
+function importItems() {
+    const fileInput = document.getElementById('importFile');
+    const mode = document.getElementById('importMode').value;
+    const importBtn = document.getElementById('importBtn');
+    const errorList = document.getElementById('importErrors');
+    const file = fileInput.files[0];
+    
+    errorList.innerHTML = '';
+    if (!file) {
+        showStatusMessage('Please choose a CSV or JSON file to import.', true);
+        return;
+    }
+    
+    const isCsv = file.name.toLowerCase().endsWith('.csv') || file.type === 'text/csv';
+    
+    importBtn.disabled = true;
+    importBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Importing...';
+    
+    file.text()
+        .then(body => fetch(`/bulk/items?mode=${mode}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': isCsv ? 'text/csv' : 'application/json',
+            },
+            body: body
+        }))
         .then(response => response.json())
         .then(data => {
-            displayItems(data);
+            if (data.success) {
+                showStatusMessage(`Imported ${data.count} item(s) successfully!`);
+                fileInput.value = '';
+                refreshAfterEdit();
+            } else {
+                showStatusMessage(data.message || 'Import failed.', true);
+                errorList.innerHTML = (data.errors || []).map(error => {
+                    const where = error.row ? `Row ${error.row}: ` : '';
+                    const li = document.createElement('li');
+                    li.textContent = where + error.message;
+                    return li.outerHTML;
+                }).join('');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showStatusMessage('Error importing items. Please try again.', true);
+        })
+        .finally(() => {
+            importBtn.disabled = false;
+            importBtn.innerHTML = '<i class="fas fa-upload"></i> Import';
+        });
+}
+
+// Items are fetched a page at a time, ordered by price; "Load more" follows the cursor
+const LIST_PAGE_SIZE = 100;
+let listCursor = null;
+
+function fetchItemsPage(cursor) {
+    let url = `/list?limit=${LIST_PAGE_SIZE}`;
+    if (cursor) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+    return fetch(url).then(response => response.json());
+}
+
+function loadAllItems() {
+    fetchItemsPage(null)
+        .then(data => {
+            listCursor = data.next_cursor;
+            displayItems(data.items);
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showStatusMessage('Error loading items. Please try again.', true);
+        });
+}
+
+function loadMoreItems() {
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    loadMoreBtn.disabled = true;
+    loadMoreBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Loading...';
+    
+    fetchItemsPage(listCursor)
+        .then(data => {
+            listCursor = data.next_cursor;
+            document.querySelector('#itemsList .items-table tbody')
+                .insertAdjacentHTML('beforeend', data.items.map(renderItemRows).join(''));
+            updateLoadMoreButton();
         })
         .catch(error => {
             console.error('Error:', error);
             showStatusMessage('Error loading items. Please try again.', true);
+            loadMoreBtn.disabled = false;
+            loadMoreBtn.innerHTML = '<i class="fas fa-chevron-down"></i> Load more';
         });
 }
 
+function updateLoadMoreButton() {
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    loadMoreBtn.style.display = listCursor ? '' : 'none';
+    loadMoreBtn.disabled = false;
+    loadMoreBtn.innerHTML = '<i class="fas fa-chevron-down"></i> Load more';
+}
+
 function displayItems(items) {
     const itemsListDiv = document.getElementById('itemsList');
     
@@ -154,71 +326,90 @@ function displayItems(items) {
     `;
     
     items.forEach(item => {
-        const imageHtml = item.imageurl ? 
-            `<img src="${item.imageurl}" alt="${item.name}" class="item-image" onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">` : 
-            '';
-        
-        const imagePlaceholder = !item.imageurl ? 
-            `<div class="item-image-placeholder"><i class="fas fa-utensils"></i></div>` : 
-            `<div class="item-image-placeholder" style="display: none;"><i class="fas fa-utensils"></i></div>`;
-        
-        html += `
-            <tr id="item-${item.id}">
-                <td><span style="font-weight: 600; color: var(--gray-600);">#${item.id}</span></td>
-                <td>${imageHtml}${imagePlaceholder}</td>
-                <td><span class="item-name">${item.name}</span></td>
-                <td><span class="item-price">$${parseFloat(item.price).toFixed(2)}</span></td>
-                <td>
-                    <div class="item-actions">
-                        <button class="btn btn-warning" onclick="editItem(${item.id}, '${item.name.replace(/'/g, "\\'")}', ${item.price}, '${item.imageurl ? item.imageurl.replace(/'/g, "\\'") : ''}')">
-                            <i class="fas fa-edit"></i>
-                            Edit
-                        </button>
-                        <button class="btn btn-danger" onclick="deleteItem(${item.id}, '${item.name.replace(/'/g, "\\'")}')">
-                            <i class="fas fa-trash"></i>
-                            Delete
-                        </button>
-                    </div>
-                </td>
-            </tr>
-            <tr id="edit-form-${item.id}" class="edit-form">
-                <td colspan="5">
-                    <div class="edit-form-grid">
-                        <div class="form-group">
-                            <label>Name</label>
-                            <input type="text" id="editName-${item.id}" value="${item.name}">
-                        </div>
-                        <div class="form-group">
-                            <label>Price ($)</label>
-                            <input type="number" id="editPrice-${item.id}" value="${item.price}" step="0.01" min="0">
-                        </div>
-                        <div class="form-group">
-                            <label>Image URL</label>
-                            <input type="text" id="editImageUrl-${item.id}" value="${item.imageurl || ''}">
-                        </div>
-                    </div>
-                    <div class="edit-form-actions">
-                        <button class="btn btn-success" onclick="updateItem(${item.id})">
-                            <i class="fas fa-save"></i>
-                            Save Changes
-                        </button>
-                        <button class="btn btn-secondary" onclick="cancelEdit(${item.id})">
-                            <i class="fas fa-times"></i>
-                            Cancel
-                        </button>
-                    </div>
-                </td>
-            </tr>
-        `;
+        html += renderItemRows(item);
     });
     
     html += `
                 </tbody>
             </table>
         </div>
+        <div style="text-align: center; margin-top: var(--space-6);">
+            <button class="btn btn-secondary" id="loadMoreBtn"></button>
+        </div>
     `;
     
     itemsListDiv.innerHTML = html;
+    document.getElementById('loadMoreBtn').addEventListener('click', loadMoreItems);
+    updateLoadMoreButton();
+}
+
+// Changes with the image URL, so an edited image is not shown from the
+// browser's cache of /img/<id>
+function imageVersion(url) {
+    let hash = 0;
+    for (let i = 0; i < url.length; i++) {
+        hash = (hash * 31 + url.charCodeAt(i)) | 0;
+    }
+    return (hash >>> 0).toString(36);
+}
+
+function renderItemRows(item) {
+    const imageHtml = item.imageurl ? 
+        `<img src="/img/${item.id}?w=160&v=${imageVersion(item.imageurl)}" alt="${item.name}" class="item-image" loading="lazy" onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">` : 
+        '';
+    
+    const imagePlaceholder = !item.imageurl ? 
+        `<div class="item-image-placeholder"><i class="fas fa-utensils"></i></div>` : 
+        `<div class="item-image-placeholder" style="display: none;"><i class="fas fa-utensils"></i></div>`;
+    
+    return `
+        <tr id="item-${item.id}" data-id="${item.id}" data-price="${item.price}">
+            <td><span style="font-weight: 600; color: var(--gray-600);">#${item.id}</span></td>
+            <td>${imageHtml}${imagePlaceholder}</td>
+            <td><span class="item-name">${item.name}</span></td>
+            <td><span class="item-price">$${parseFloat(item.price).toFixed(2)}</span></td>
+            <td>
+                <div class="item-actions">
+                    <button class="btn btn-warning" onclick="editItem(${item.id}, '${item.name.replace(/'/g, "\\'")}', ${item.price}, '${item.imageurl ? item.imageurl.replace(/'/g, "\\'") : ''}')">
+                        <i class="fas fa-edit"></i>
+                        Edit
+                    </button>
+                    <button class="btn btn-danger" onclick="deleteItem(${item.id}, '${item.name.replace(/'/g, "\\'")}')">
+                        <i class="fas fa-trash"></i>
+                        Delete
+                    </button>
+                </div>
+            </td>
+        </tr>
+        <tr id="edit-form-${item.id}" class="edit-form">
+            <td colspan="5">
+                <div class="edit-form-grid">
+                    <div class="form-group">
+                        <label>Name</label>
+                        <input type="text" id="editName-${item.id}" value="${item.name}">
+                    </div>
+                    <div class="form-group">
+                        <label>Price ($)</label>
+                        <input type="number" id="editPrice-${item.id}" value="${item.price}" step="0.01" min="0">
+                    </div>
+                    <div class="form-group">
+                        <label>Image URL</label>
+                        <input type="text" id="editImageUrl-${item.id}" value="${item.imageurl || ''}">
+                    </div>
+                </div>
+                <div class="edit-form-actions">
+                    <button class="btn btn-success" onclick="updateItem(${item.id})">
+                        <i class="fas fa-save"></i>
+                        Save Changes
+                    </button>
+                    <button class="btn btn-secondary" onclick="cancelEdit(${item.id})">
+                        <i class="fas fa-times"></i>
+                        Cancel
+                    </button>
+                </div>
+            </td>
+        </tr>
+    `;
 }
 
 function editItem(id, name, price, imageurl) {
@@ -267,7 +458,8 @@ function updateItem(id) {
     saveBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Saving...';
     
     // Make API call
-    fetch(`/update/${id}`, {
+    // wait=1: with write-behind on, answer once the change is saved
+    fetch(`/update/${id}?wait=1`, {
         method: 'PUT',
         headers: {
             'Content-Type': 'application/json',
@@ -284,7 +476,7 @@ function updateItem(id) {
             // Hide edit form
             cancelEdit(id);
             // Refresh the list
-            loadAllItems();
+            refreshAfterEdit();
         } else {
             throw new Error('Failed to update item');
         }
@@ -308,14 +500,14 @@ function deleteItem(id, name) {
         deleteBtn.disabled = true;
         deleteBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Deleting...';
         
-        fetch(`/delete/${id}`, {
+        fetch(`/delete/${id}?wait=1`, {
             method: 'DELETE'
         })
         .then(response => {
             if (response.ok) {
                 showStatusMessage(`"${name}" deleted successfully!`);
                 // Refresh the list
-                loadAllItems();
+                refreshAfterEdit();
             } else {
                 throw new Error('Failed to delete item');
             }
@@ -0,0 +1,157 @@
+import concurrent.futures
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class AuthRejected(Exception):
+    """A login/signup turned away before reaching Supabase"""
+
+    status = 429
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimited(AuthRejected):
+    pass
+
+
+class Overloaded(AuthRejected):
+    pass
+
+
+class AuthTimeout(AuthRejected):
+    status = 504
+
+
+class TokenBuckets:
+    """In-memory token bucket per key: `burst` attempts, refilled at `rate` per second
+
+    Only the `max_keys` most recently used keys are tracked; an evicted key
+    starts again with a full bucket. Buckets are per process: under
+    gunicorn each worker counts on its own, so the effective limit is the
+    configured one times the number of workers.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key):
+        """Spend one token; returns 0 if allowed, else seconds until one is available"""
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+def credentials_key(action, email, password):
+    """Single-flight key; the password only ever appears hashed"""
+    digest = hashlib.sha256(f"{email.lower()}\0{password}".encode('utf-8')).hexdigest()
+    return f"{action}:{digest}"
+
+
+class AuthGateway:
+    """Admission control for the Supabase calls behind /login and /signup
+
+    `admit(ip, email)` applies the per-IP and per-email token buckets.
+    `call(key, fn)` runs `fn` on a bounded thread pool and waits up to
+    `timeout` seconds for it. At most `max_concurrency` calls run, with
+    `max_queue` more waiting; beyond that Overloaded is raised at once, so
+    request threads are not tied up behind a slow Supabase. Concurrent calls
+    with the same key (the same credentials) share one upstream call and
+    its result.
+    """
+
+    def __init__(self, max_concurrency=8, max_queue=32, timeout=10.0,
+                 ip_rate=5.0, ip_burst=100, email_rate=0.1, email_burst=5, clock=time.monotonic):
+        self.timeout = timeout
+        self.ip_buckets = TokenBuckets(ip_rate, ip_burst, clock=clock)
+        self.email_buckets = TokenBuckets(email_rate, email_burst, clock=clock)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_concurrency, thread_name_prefix='auth')
+        self._slots = threading.BoundedSemaphore(max_concurrency + max_queue)
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0
+        self.collapsed = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+        self.timeouts = 0
+
+    def admit(self, ip, email):
+        """Raise RateLimited if this client or account has used up its attempts"""
+        # A client over its own limit does not also spend the account's attempts
+        wait = self.ip_buckets.take(ip)
+        if not wait and email:
+            wait = self.email_buckets.take(email.lower())
+        if wait:
+            self.rate_limited += 1
+            raise RateLimited('Too many attempts. Please wait and try again.', math.ceil(wait))
+
+    def call(self, key, fn):
+        """Result of `fn()`, shared with concurrent calls for the same key"""
+        future = self._join_or_start(key, fn)
+        try:
+            return future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            self.timeouts += 1
+            raise AuthTimeout('Sign-in is taking too long. Please try again.')
+
+    def _join_or_start(self, key, fn):
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.collapsed += 1
+                return future
+            if not self._slots.acquire(blocking=False):
+                self.overloaded += 1
+                raise Overloaded('Too many sign-ins right now. Please try again in a moment.', 1)
+            # Registered before the call starts, so it cannot finish first
+            future = concurrent.futures.Future()
+            self._flights[key] = future
+            self.calls += 1
+        self._executor.submit(self._run, key, fn, future)
+        return future
+
+    def _run(self, key, fn, future):
+        try:
+            result, error = fn(), None
+        except BaseException as e:
+            result, error = None, e
+        with self._lock:
+            # Later calls with these credentials go upstream again
+            self._flights.pop(key, None)
+        self._slots.release()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._flights)
+        return {
+            'in_flight': in_flight,
+            'calls': self.calls,
+            'collapsed': self.collapsed,
+            'rate_limited': self.rate_limited,
+            'overloaded': self.overloaded,
+            'timeouts': self.timeouts,
+        }
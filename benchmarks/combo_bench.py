@@ -0,0 +1,68 @@
+"""Best-combo latency: the precomputed ComboTable vs. enumerating item pairs and triples
+
+Run from the repository root:  python benchmarks/combo_bench.py [sizes...]
+"""
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_combos import ComboTable, to_cents
+
+DEFAULT_SIZES = (100, 300, 1000)
+MAX_BUDGET = 5000
+MAX_ITEMS = 3
+# Enumeration of triples is only timed up to this many items
+ENUMERATE_LIMIT = 300
+
+
+def make_items(count, seed=42):
+    rng = random.Random(seed)
+    return [{"id": i, "price": round(rng.uniform(0.5, 30.0), 2)} for i in range(count)]
+
+
+def enumerate_best(items, budget):
+    best = 0
+    for count in range(1, MAX_ITEMS + 1):
+        for combo in itertools.combinations(items, count):
+            total = sum(to_cents(item["price"]) for item in combo)
+            if best < total <= budget:
+                best = total
+    return best
+
+
+def time_queries(query, budgets):
+    samples = []
+    for budget in budgets:
+        start = time.perf_counter()
+        query(budget)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main(sizes):
+    print(f"{'items':>6} {'build ms':>9} {'p50 us':>8} {'p99 us':>8} {'enumerate ms':>13}")
+    rng = random.Random(7)
+    budgets = [rng.randrange(100, MAX_BUDGET + 1) for _ in range(1000)]
+    for count in sizes:
+        items = make_items(count)
+        start = time.perf_counter()
+        table = ComboTable(items, MAX_BUDGET, MAX_ITEMS)
+        build = (time.perf_counter() - start) * 1000
+        p50, p99 = time_queries(table.best, budgets)
+        enumerate_ms = '-'
+        if count <= ENUMERATE_LIMIT:
+            start = time.perf_counter()
+            best = enumerate_best(items, budgets[0])
+            enumerate_ms = f"{(time.perf_counter() - start) * 1000:.0f}"
+            assert table.best(budgets[0])[0][0] == best
+        print(f"{count:>6} {build:>9.1f} {p50 * 1e6:>8.0f} {p99 * 1e6:>8.0f} {enumerate_ms:>13}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,463 @@
+"""Local stand-in for the Supabase REST and Auth APIs, for load tests
+
+Serves a seeded lunch_db table through the part of PostgREST the app uses
+(select with column lists, eq/neq/gt/gte/lt/lte/in/ilike/is filters,
+or/and, order, limit/offset, insert, upsert, update, delete), a read-only
+tenant_members table, and the Auth calls behind signup, login, get_user
+and logout. Each request first sleeps for
+`latency` seconds plus up to `jitter`, standing in for the round trip to a
+hosted project. Access tokens are HS256 JWTs signed with `jwt_secret`, so
+the app can verify them either remotely or locally (AUTH_VERIFY_MODE=local
+with SUPABASE_JWT_SECRET set to the same secret).
+
+    python benchmarks/fake_supabase.py --port 54321 --rows 1000 --latency 0.02
+
+then start the app with SUPABASE_URL=http://127.0.0.1:54321.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import jwt
+
+JWT_SECRET = 'fake-supabase-jwt-secret'
+# Seeded account the load test logs in with
+BENCH_EMAIL = 'bench@example.com'
+BENCH_PASSWORD = 'benchmark'
+TOKEN_LIFETIME = 3600
+DISHES = ('pizza', 'salad', 'soda', 'coffee', 'burrito', 'ramen', 'sandwich', 'soup', 'tea', 'curry')
+
+
+def make_rows(count, seed=42, tenants=0):
+    """`count` lunch_db rows with ids 1..count and prices from 0.50 to 30.00
+
+    With `tenants`, rows are dealt round-robin to tenant ids t0, t1, ...
+    """
+    rng = random.Random(seed)
+    rows = [
+        {
+            'id': item_id,
+            'name': f"{rng.choice(DISHES)} #{item_id}",
+            'price': round(rng.uniform(0.5, 30.0), 2),
+            'imageurl': None,
+        }
+        for item_id in range(1, count + 1)
+    ]
+    if tenants:
+        for row in rows:
+            row['tenant_id'] = f"t{row['id'] % tenants}"
+    return rows
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _split_top_level(text):
+    """Split 'a,and(b,c),d' on commas outside parentheses"""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part for part in parts if part]
+
+
+def _like_pattern(pattern):
+    """PostgREST like pattern (* or % wildcards, backslash escapes) as a regex"""
+    out, escaped = [], False
+    for char in pattern:
+        if escaped:
+            out.append(re.escape(char))
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in '*%':
+            out.append('.*')
+        elif char == '_':
+            out.append('.')
+        else:
+            out.append(re.escape(char))
+    return re.compile(''.join(out), re.IGNORECASE | re.DOTALL)
+
+
+def _coerce(value, like):
+    if isinstance(like, bool):
+        return value == 'true'
+    if isinstance(like, (int, float)):
+        return float(value)
+    return value
+
+
+def column_filter(column, expression):
+    """Predicate for one `column=op.value` filter"""
+    op, _, value = expression.partition('.')
+    negate = op == 'not'
+    if negate:
+        op, _, value = value.partition('.')
+
+    def compare(row):
+        current = row.get(column)
+        if op == 'is':
+            result = current is None if value == 'null' else current == (value == 'true')
+        elif current is None:
+            result = False
+        elif op == 'in':
+            result = current in {_coerce(v.strip('"'), current) for v in _split_top_level(value.strip('()'))}
+        elif op in ('like', 'ilike'):
+            result = _like_pattern(value).fullmatch(str(current)) is not None
+        else:
+            target = _coerce(value, current)
+            if op == 'eq':
+                result = current == target
+            elif op == 'neq':
+                result = current != target
+            elif op == 'gt':
+                result = current > target
+            elif op == 'gte':
+                result = current >= target
+            elif op == 'lt':
+                result = current < target
+            elif op == 'lte':
+                result = current <= target
+            else:
+                raise FilterError(f"unsupported operator {op}")
+        return not result if negate else result
+
+    return compare
+
+
+def logic_filter(combine, body):
+    """Predicate for `or=(...)` / `and(...)` trees"""
+    predicates = []
+    for term in _split_top_level(body):
+        if term.startswith(('and(', 'or(')):
+            name, _, rest = term.partition('(')
+            predicates.append(logic_filter(all if name == 'and' else any, rest[:-1]))
+        else:
+            column, _, expression = term.partition('.')
+            predicates.append(column_filter(column, expression))
+    return lambda row: combine(predicate(row) for predicate in predicates)
+
+
+def order_key(order):
+    """Sort steps for `order=price.asc,id.desc`, applied last to first"""
+    steps = []
+    for term in order.split(','):
+        column, *modifiers = term.split('.')
+        steps.append((column, 'desc' in modifiers))
+    return steps
+
+
+class FakeSupabase:
+    """In-memory lunch_db table and user store behind a threaded HTTP server"""
+
+    def __init__(self, rows=1000, latency=0.0, jitter=0.0, host='127.0.0.1', port=0,
+                 jwt_secret=JWT_SECRET, seed=42, tenants=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.jwt_secret = jwt_secret
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._rows = {row['id']: row for row in make_rows(rows, seed, tenants)}
+        self._next_id = rows + 1
+        self._users = {}
+        self._refresh_tokens = {}
+        self._members = []
+        # Status every auth endpoint answers with while set, e.g. 503 for an outage
+        self.auth_error_status = None
+        bench_user = self.add_user(BENCH_EMAIL, BENCH_PASSWORD)
+        # The load-test account may edit every seeded tenant
+        for tenant in range(tenants):
+            self.add_member(f"t{tenant}", bench_user)
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-supabase', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    # Auth
+
+    def add_user(self, email, password):
+        user = {
+            'id': str(uuid.uuid5(uuid.NAMESPACE_URL, email)),
+            'aud': 'authenticated',
+            'role': 'authenticated',
+            'email': email,
+            'app_metadata': {'provider': 'email'},
+            'user_metadata': {},
+            'created_at': '2024-01-01T00:00:00Z',
+        }
+        with self._lock:
+            self._users[email] = (password, user)
+        return user
+
+    def add_member(self, tenant, user):
+        """Let `user` edit `tenant` (a tenant_members row)"""
+        with self._lock:
+            self._members.append({'tenant_id': tenant, 'user_id': user['id']})
+
+    def issue_token(self, user):
+        now = int(time.time())
+        claims = {
+            'iss': f"{self.url}/auth/v1",
+            'aud': 'authenticated',
+            'sub': user['id'],
+            'email': user['email'],
+            'role': 'authenticated',
+            'iat': now,
+            'exp': now + TOKEN_LIFETIME,
+        }
+        return jwt.encode(claims, self.jwt_secret, algorithm='HS256')
+
+    def user_for_token(self, token):
+        try:
+            claims = jwt.decode(token, self.jwt_secret, algorithms=['HS256'], audience='authenticated')
+        except jwt.InvalidTokenError:
+            return None
+        entry = self._users.get(claims.get('email'))
+        return entry[1] if entry else None
+
+    def session_for(self, user):
+        refresh_token = uuid.uuid4().hex
+        with self._lock:
+            self._refresh_tokens[refresh_token] = user['email']
+        return {
+            'access_token': self.issue_token(user),
+            'token_type': 'bearer',
+            'expires_in': TOKEN_LIFETIME,
+            'expires_at': int(time.time()) + TOKEN_LIFETIME,
+            'refresh_token': refresh_token,
+            'user': user,
+        }
+
+    def refresh(self, refresh_token):
+        """New session for a refresh token, or None; like Supabase, each token is single-use"""
+        with self._lock:
+            email = self._refresh_tokens.pop(refresh_token, None)
+        entry = self._users.get(email)
+        return self.session_for(entry[1]) if entry else None
+
+    def revoke(self, email):
+        """Drop every refresh token issued to `email`"""
+        with self._lock:
+            for token in [t for t, owner in self._refresh_tokens.items() if owner == email]:
+                del self._refresh_tokens[token]
+
+    # PostgREST
+
+    def select(self, params, table='lunch_db'):
+        predicates, order, limit, offset, columns = [], None, None, 0, None
+        for name, value in params:
+            if name == 'select':
+                columns = None if value == '*' else value.split(',')
+            elif name == 'order':
+                order = value
+            elif name == 'limit':
+                limit = int(value)
+            elif name == 'offset':
+                offset = int(value)
+            elif name in ('or', 'and'):
+                predicates.append(logic_filter(any if name == 'or' else all, value[1:-1]))
+            else:
+                predicates.append(column_filter(name, value))
+        with self._lock:
+            source = self._members if table == 'tenant_members' else self._rows.values()
+            rows = [row for row in source if all(predicate(row) for predicate in predicates)]
+        if order:
+            for column, desc in reversed(order_key(order)):
+                rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        rows = rows[offset:offset + limit if limit is not None else None]
+        if columns is not None:
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return rows
+
+    def insert(self, items, upsert=False):
+        inserted = []
+        with self._lock:
+            for item in items:
+                row = dict(item)
+                if upsert and row.get('id') in self._rows:
+                    row = {**self._rows[row['id']], **row}
+                elif row.get('id') is None:
+                    row['id'] = self._next_id
+                    self._next_id += 1
+                else:
+                    self._next_id = max(self._next_id, row['id'] + 1)
+                self._rows[row['id']] = row
+                inserted.append(row)
+        return inserted
+
+    def update(self, params, values):
+        matched = {row['id'] for row in self.select(params)}
+        with self._lock:
+            updated = []
+            for item_id in matched:
+                if item_id in self._rows:
+                    self._rows[item_id] = {**self._rows[item_id], **values}
+                    updated.append(self._rows[item_id])
+        return updated
+
+    def delete(self, params):
+        matched = {row['id'] for row in self.select(params)}
+        with self._lock:
+            return [self._rows.pop(item_id) for item_id in matched if item_id in self._rows]
+
+    def update_menu_items(self, items, only_untenanted=False):
+        """The update_menu_items SQL function: updates rows that still exist, returns them"""
+        with self._lock:
+            updated = []
+            for item in items:
+                row = self._rows.get(item['id'])
+                if row is None or (only_untenanted and row.get('tenant_id') is not None):
+                    continue
+                self._rows[item['id']] = {**row, **item}
+                updated.append(self._rows[item['id']])
+        return updated
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status, body=None):
+                data = b'' if body is None else json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def read_json(self):
+                return json.loads(self.body) if self.body else None
+
+            def handle_any(self):
+                # Read the body up front so keep-alive connections stay in sync
+                self.body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                with fake._lock:
+                    fake.requests += 1
+                    delay = fake.latency + (fake._rng.uniform(0, fake.jitter) if fake.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+                url = urlparse(self.path)
+                params = parse_qsl(url.query, keep_blank_values=True)
+                parts = [part for part in url.path.split('/') if part]
+                try:
+                    if parts[:3] == ['rest', 'v1', 'rpc'] and parts[3:] == ['update_menu_items']:
+                        body = self.read_json() or {}
+                        return self.send_json(200, fake.update_menu_items(body['items'], body.get('only_untenanted')))
+                    if parts[:2] == ['rest', 'v1'] and len(parts) == 3:
+                        if parts[2] == 'tenant_members' and self.command in ('GET', 'HEAD'):
+                            return self.send_json(200, fake.select(params, 'tenant_members'))
+                        if parts[2] != 'lunch_db':
+                            return self.send_json(404, {'message': f"relation {parts[2]} does not exist"})
+                        return self.rest(params)
+                    if parts[:2] == ['auth', 'v1']:
+                        return self.auth('/'.join(parts[2:]), dict(params))
+                except (FilterError, ValueError, KeyError) as e:
+                    return self.send_json(400, {'message': str(e)})
+                self.send_json(404, {'message': 'not found'})
+
+            do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = handle_any
+
+            def rest(self, params):
+                if self.command in ('GET', 'HEAD'):
+                    return self.send_json(200, fake.select(params))
+                if self.command == 'POST':
+                    body = self.read_json()
+                    items = body if isinstance(body, list) else [body]
+                    upsert = 'merge-duplicates' in (self.headers.get('Prefer') or '')
+                    return self.send_json(201, fake.insert(items, upsert))
+                if self.command == 'PATCH':
+                    return self.send_json(200, fake.update(params, self.read_json()))
+                return self.send_json(200, fake.delete(params))
+
+            def auth(self, endpoint, params):
+                if fake.auth_error_status:
+                    return self.send_json(fake.auth_error_status, {'msg': 'Auth service unavailable'})
+                if endpoint == '.well-known/jwks.json':
+                    return self.send_json(200, {'keys': []})
+                if endpoint == 'user':
+                    token = (self.headers.get('Authorization') or '').removeprefix('Bearer ')
+                    user = fake.user_for_token(token)
+                    if user is None:
+                        return self.send_json(401, {'code': 401, 'msg': 'invalid JWT'})
+                    return self.send_json(200, user)
+                if endpoint == 'token' and params.get('grant_type') == 'password':
+                    body = self.read_json() or {}
+                    entry = fake._users.get(body.get('email'))
+                    if entry is None or entry[0] != body.get('password'):
+                        return self.send_json(400, {'error': 'invalid_grant',
+                                                    'error_description': 'Invalid login credentials'})
+                    return self.send_json(200, fake.session_for(entry[1]))
+                if endpoint == 'token' and params.get('grant_type') == 'refresh_token':
+                    refreshed = fake.refresh((self.read_json() or {}).get('refresh_token'))
+                    if refreshed is None:
+                        return self.send_json(400, {'error': 'invalid_grant',
+                                                    'error_description': 'Invalid Refresh Token: Refresh Token Not Found'})
+                    return self.send_json(200, refreshed)
+                if endpoint == 'signup':
+                    body = self.read_json() or {}
+                    if body.get('email') in fake._users:
+                        return self.send_json(422, {'code': 422, 'msg': 'User already registered'})
+                    return self.send_json(200, fake.add_user(body.get('email'), body.get('password')))
+                if endpoint == 'logout':
+                    return self.send_json(204)
+                return self.send_json(404, {'msg': 'not found'})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--rows', type=int, default=1000, help='seeded lunch_db rows')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds, at random')
+    parser.add_argument('--jwt-secret', default=JWT_SECRET)
+    parser.add_argument('--tenants', type=int, default=0, help='deal rows out to this many tenant ids (t0, t1, ...)')
+    args = parser.parse_args()
+    fake = FakeSupabase(args.rows, args.latency, args.jitter, args.host, args.port, args.jwt_secret,
+                        tenants=args.tenants)
+    print(f"Fake Supabase on {fake.url} ({args.rows} rows, {args.latency * 1000:.0f}ms latency)", flush=True)
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
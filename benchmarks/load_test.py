@@ -0,0 +1,335 @@
+"""Throughput and latency of the app against a local fake Supabase
+
+Starts benchmarks/fake_supabase.py with a seeded lunch_db and the app under
+gunicorn (gunicorn.conf.py) pointed at it. Then it drives each scenario at
+each concurrency level for a fixed time and reports requests/s and
+p50/p95/p99 latency. Results are written to a JSON file. Pass `--compare`
+with an earlier file to print the change next to each row.
+Run from the repository root:
+
+    python benchmarks/load_test.py --concurrency 1,8,32 --duration 10 --latency 0.02
+    python benchmarks/load_test.py --env AUTH_VERIFY_MODE=local --compare benchmarks/results/<earlier>.json
+
+Scenarios: search (GET /search/<price>), list (GET /list?limit=50),
+check-auth (GET /check-auth), add (GET /add/...), update (PUT /update/<id>)
+and delete (DELETE /delete/<id>). Authenticated ones send a token from
+POST /login. The load generator is a thread per client in this process,
+so it tops out at a few thousand requests/s. Pass `--app-url` to drive an
+app that is already running (and already points at a Supabase).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_supabase import BENCH_EMAIL, BENCH_PASSWORD, JWT_SECRET
+
+DEFAULT_SCENARIOS = ('search', 'list', 'check-auth', 'add', 'update', 'delete')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=30.0, process=None):
+    deadline = time.monotonic() + timeout
+    parsed = urlparse(url)
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{process.args[0]} exited with {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=2)
+            conn.request('GET', parsed.path or '/')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class Scenario:
+    """One kind of request; `request(client_id, n)` returns (method, path, body)"""
+
+    def __init__(self, name, request, auth=False):
+        self.name = name
+        self.request = request
+        self.auth = auth
+
+
+def make_scenarios(rows):
+    added = {'next': rows + 1}
+    lock = threading.Lock()
+
+    def search(client_id, n):
+        return 'GET', f"/search/{random.choice((2, 5, 10, 15, 30))}", None
+
+    def list_page(client_id, n):
+        return 'GET', '/list?limit=50', None
+
+    def check_auth(client_id, n):
+        return 'GET', '/check-auth', None
+
+    def add(client_id, n):
+        return 'GET', f"/add/bench-{client_id}-{n}/{random.randint(1, 30)}", None
+
+    def update(client_id, n):
+        item_id = random.randint(1, rows)
+        body = {'name': f"dish #{item_id}", 'price': round(random.uniform(0.5, 30.0), 2), 'imageurl': None}
+        return 'PUT', f"/update/{item_id}", body
+
+    def delete(client_id, n):
+        # Rows created by the add scenario, then ids past them (a no-op delete)
+        with lock:
+            item_id = added['next']
+            added['next'] += 1
+        return 'DELETE', f"/delete/{item_id}", None
+
+    return {scenario.name: scenario for scenario in (
+        Scenario('search', search),
+        Scenario('list', list_page, auth=True),
+        Scenario('check-auth', check_auth, auth=True),
+        Scenario('add', add, auth=True),
+        Scenario('update', update, auth=True),
+        Scenario('delete', delete, auth=True),
+    )}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def run_level(app_url, scenario, concurrency, duration, warmup, token):
+    """Drive one scenario with `concurrency` keep-alive clients; returns a result dict"""
+    parsed = urlparse(app_url)
+    headers = {'Content-Type': 'application/json'}
+    if scenario.auth:
+        headers['Authorization'] = f"Bearer {token}"
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    statuses = [{} for _ in range(concurrency)]
+    start_at = time.monotonic() + 0.2
+    record_from = start_at + warmup
+    stop_at = record_from + duration
+
+    def client(client_id):
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+        n = 0
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            if now < start_at:
+                time.sleep(start_at - now)
+                continue
+            method, path, body = scenario.request(client_id, n)
+            n += 1
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+                status = 'error'
+            elapsed = time.perf_counter() - started
+            if time.monotonic() < record_from:
+                continue
+            latencies[client_id].append(elapsed)
+            statuses[client_id][status] = statuses[client_id].get(status, 0) + 1
+            if status == 'error' or status >= 400:
+                errors[client_id] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples = sorted(value for values in latencies for value in values)
+    status_counts = {}
+    for counts in statuses:
+        for status, count in counts.items():
+            status_counts[str(status)] = status_counts.get(str(status), 0) + count
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'scenario': scenario.name,
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'requests': len(samples),
+        'errors': sum(errors),
+        'statuses': status_counts,
+        'rps': round(len(samples) / duration, 1),
+        'latency_ms': {
+            'mean': ms(sum(samples) / len(samples)) if samples else None,
+            'p50': ms(percentile(samples, 0.50)),
+            'p95': ms(percentile(samples, 0.95)),
+            'p99': ms(percentile(samples, 0.99)),
+            'max': ms(samples[-1]) if samples else None,
+        },
+    }
+
+
+def login(app_url, email, password):
+    parsed = urlparse(app_url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+    conn.request('POST', '/login', json.dumps({'email': email, 'password': password}),
+                 {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    body = json.loads(response.read() or b'{}')
+    conn.close()
+    if response.status != 200 or not body.get('access_token'):
+        raise RuntimeError(f"login failed ({response.status}): {body}")
+    return body['access_token']
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    previous = {}
+    for row in (baseline or {}).get('results', []):
+        previous[(row['scenario'], row['concurrency'])] = row
+    print(f"{'scenario':<12} {'conc':>5} {'requests':>9} {'errors':>7} {'rps':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}" + ('   vs baseline' if baseline else ''))
+    for row in results:
+        latency = row['latency_ms']
+        fmt = lambda value: f"{value:>8.2f}" if value is not None else f"{'-':>8}"
+        line = (f"{row['scenario']:<12} {row['concurrency']:>5} {row['requests']:>9} {row['errors']:>7} "
+                f"{row['rps']:>9.1f} {fmt(latency['p50'])} {fmt(latency['p95'])} {fmt(latency['p99'])}")
+        old = previous.get((row['scenario'], row['concurrency']))
+        if old and old['rps'] and old['latency_ms']['p95'] and latency['p95']:
+            line += (f"   rps {100 * (row['rps'] / old['rps'] - 1):+.0f}%"
+                     f", p95 {100 * (latency['p95'] / old['latency_ms']['p95'] - 1):+.0f}%")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app', default='budget_lunch:app', help='gunicorn app to start')
+    parser.add_argument('--app-url', help='drive an already running app instead of starting one')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (WEB_CONCURRENCY)')
+    parser.add_argument('--threads', type=int, default=8, help='threads per worker (GUNICORN_THREADS)')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra environment for the app, e.g. AUTH_VERIFY_MODE=local')
+    parser.add_argument('--rows', type=int, default=1000, help='seeded lunch_db rows')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake Supabase latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random fake Supabase latency')
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS))
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated client counts')
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds per level')
+    parser.add_argument('--warmup', type=float, default=1.0, help='unmeasured seconds before each level')
+    parser.add_argument('--email', default=BENCH_EMAIL)
+    parser.add_argument('--password', default=BENCH_PASSWORD)
+    parser.add_argument('--output', help='results file (default benchmarks/results/load_test_<time>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    scenarios = make_scenarios(args.rows)
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+    app_env = dict(item.split('=', 1) for item in args.env)
+
+    processes = []
+    metrics_dir = tempfile.mkdtemp(prefix='load_test_metrics_')
+    try:
+        app_url = args.app_url
+        if app_url is None:
+            fake_port, app_port = free_port(), free_port()
+            fake_url = f"http://127.0.0.1:{fake_port}"
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.join(ROOT, 'benchmarks', 'fake_supabase.py'), '--port', str(fake_port),
+                 '--rows', str(args.rows), '--latency', str(args.latency), '--jitter', str(args.jitter)],
+                stdout=subprocess.DEVNULL))
+            wait_for(f"{fake_url}/auth/v1/.well-known/jwks.json", process=processes[-1])
+            env = dict(os.environ, SUPABASE_URL=fake_url, SUPABASE_JWT_SECRET=JWT_SECRET, PORT=str(app_port),
+                       WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads),
+                       GUNICORN_LOG_LEVEL='warning', METRICS_DIR=metrics_dir,
+                       # Recycling a worker mid-run drops its connections and pays a cold start
+                       GUNICORN_MAX_REQUESTS='0')
+            env.update(app_env)
+            processes.append(subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--access-logfile', '/dev/null',
+                 args.app], cwd=ROOT, env=env))
+            app_url = f"http://127.0.0.1:{app_port}"
+            wait_for(f"{app_url}/hello", process=processes[-1])
+
+        token = login(app_url, args.email, args.password) if any(scenarios[n].auth for n in names) else None
+        results = []
+        for name in names:
+            for level in levels:
+                result = run_level(app_url, scenarios[name], level, args.duration, args.warmup, token)
+                results.append(result)
+                print(f"  {name} x{level}: {result['rps']:.1f} req/s, p95 {result['latency_ms']['p95']} ms",
+                      flush=True)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+    report = {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'config': {
+            'app': None if args.app_url else args.app,
+            'app_url': args.app_url,
+            'workers': args.workers,
+            'threads': args.threads,
+            'env': app_env,
+            'rows': args.rows,
+            'supabase_latency_s': args.latency,
+            'supabase_jitter_s': args.jitter,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_test_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print()
+    print_results(results, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
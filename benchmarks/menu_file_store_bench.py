@@ -0,0 +1,63 @@
+"""Open time, private memory and search latency of FileMenuStore by catalog size
+
+Each size is opened in a fresh process so the numbers show what a worker pays
+at startup. Run from the repository root:
+
+    python benchmarks/menu_file_store_bench.py [sizes...]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+PROBE = r'''
+import sys, time
+sys.path.insert(0, sys.argv[2])
+def rss(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+from menu_file_store import FileMenuStore
+before = rss('RssAnon')
+start = time.perf_counter()
+store = FileMenuStore(sys.argv[1], fsync=False)
+opened = time.perf_counter() - start
+private = rss('RssAnon') - before
+start = time.perf_counter()
+rows = store.search(1.0)
+search = time.perf_counter() - start
+print(opened * 1000, private, search * 1000, len(rows))
+'''
+
+
+def main(sizes):
+    from menu_file_store import FileMenuStore
+    from menu_store_bench import make_items
+
+    print(f"{'items':>9} {'files MB':>9} {'open ms':>8} {'open private MB':>16} {'search ms':>10} {'matched':>8}")
+    for count in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            store = FileMenuStore(directory, fsync=False)
+            store.extend(make_items(count))
+            store.close()
+            size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+            out = subprocess.run([sys.executable, '-c', PROBE, directory, ROOT],
+                                 check=True, capture_output=True, text=True).stdout.split()
+            opened, private, search, matched = float(out[0]), float(out[1]), float(out[2]), int(out[3])
+            print(f"{count:>9} {size / 1e6:>9.1f} {opened:>8.2f} {private:>16.2f} {search:>10.2f} {matched:>8}")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
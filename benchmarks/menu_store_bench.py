@@ -0,0 +1,73 @@
+"""Memory and search latency: MenuStore vs. the original list of dicts
+
+Run from the repository root:  python benchmarks/menu_store_bench.py [sizes...]
+"""
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_store import MenuStore, ListMenuStore
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+# Fraction of the catalog each search should match
+SELECTIVITIES = (0.001, 0.1, 0.5)
+VENDORS = 200
+DISHES = ('pizza', 'salad', 'soda', 'coffee', 'burrito', 'ramen', 'sandwich', 'soup', 'tea', 'curry')
+
+
+def make_items(count, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"{rng.choice(DISHES)} #{rng.randrange(count // 10 + 1)}",
+            "price": round(rng.uniform(0.5, 30.0), 2),
+            "imageurl": f"https://cdn.example.com/vendor{rng.randrange(VENDORS)}/{rng.choice(DISHES)}.jpg",
+        }
+        for _ in range(count)
+    ]
+
+
+def measure_build(build, items):
+    gc.collect()
+    tracemalloc.start()
+    store = build(items)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, current
+
+
+def time_search(store, price, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        store.search(price)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main(sizes):
+    print(f"{'items':>9} {'store':>9} {'memory MB':>10} " +
+          ' '.join(f"{f'search {s:.1%} ms':>16}" for s in SELECTIVITIES))
+    for count in sizes:
+        # Strings come from a decoded JSON payload in practice, so give each row its own copies
+        items = make_items(count)
+        prices = sorted(item["price"] for item in items)
+        thresholds = [prices[max(int(count * s) - 1, 0)] for s in SELECTIVITIES]
+        repeats = max(3, 200_000 // count)
+        for label, build in (("list", lambda rows: ListMenuStore(dict(row) for row in rows)),
+                             ("columnar", MenuStore)):
+            store, memory = measure_build(build, items)
+            timings = [time_search(store, price, repeats) * 1000 for price in thresholds]
+            print(f"{count:>9} {label:>9} {memory / 1e6:>10.1f} " +
+                  ' '.join(f"{t:>16.3f}" for t in timings))
+            del store
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,161 @@
+"""Cold-start report: how long a fresh worker takes to import the app, and where the time goes
+
+Each run starts a new interpreter with `-X importtime`, imports the app
+module and builds its `app`, the same work a gunicorn worker does after
+fork (there is no preload). The median is checked against a budget, so a
+new eager import shows up before it slows down deploys and scale-out.
+
+Run from the repository root:
+
+    python benchmarks/startup_report.py                      # budget_lunch
+    python benchmarks/startup_report.py budget_lunch_local_db --runs 10
+    python benchmarks/startup_report.py --first-request /search/5
+
+`--first-request` also times the first request against a local fake
+Supabase, which is where the lazily built clients are paid for.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Median milliseconds from a fresh interpreter to a built `app`. budget_lunch
+# measured about 330 ms once its Supabase clients were built lazily (1.2 s
+# before); the margin leaves room for slower disks and noisy neighbours.
+DEFAULT_BUDGET_MS = 600
+
+FIRST_REQUEST_MARKER = '-- first request --'
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+module = __import__(sys.argv[1])
+module.app
+result = {'import_ms': (time.perf_counter() - started) * 1000}
+if len(sys.argv) > 2:
+    print('-- first request --', file=sys.stderr, flush=True)
+    client = module.app.test_client()
+    started = time.perf_counter()
+    client.get(sys.argv[2]).close()
+    result['first_request_ms'] = (time.perf_counter() - started) * 1000
+print(json.dumps(result))
+"""
+
+
+def parse_importtime(stderr):
+    """[(self_us, cumulative_us, depth, module)] from -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return entries
+
+
+def run_once(module, env, first_request=None):
+    args = [sys.executable, '-X', 'importtime', '-c', CHILD, module]
+    if first_request:
+        args.append(first_request)
+    result = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    startup, _, first_request = result.stderr.partition(FIRST_REQUEST_MARKER)
+    timing = json.loads(result.stdout.strip().splitlines()[-1])
+    return timing, parse_importtime(startup), parse_importtime(first_request)
+
+
+def by_package(entries):
+    """Self time per top-level package, in ms"""
+    totals = defaultdict(float)
+    for self_us, _, _, name in entries:
+        totals[name.split('.')[0]] += self_us / 1000
+    return totals
+
+
+def direct_imports(entries, module):
+    """Cumulative ms of each module the app module imports itself"""
+    top, children = {}, {}
+    # importtime lists a module after everything it imported
+    for self_us, cumulative_us, depth, name in entries:
+        if depth == 1:
+            children[name] = cumulative_us / 1000
+        elif depth == 0:
+            if name == module:
+                top.update(children)
+                # The app module's own body (create_app, module-level setup)
+                top[f"{module} (own code)"] = self_us / 1000
+            children = {}
+    return top
+
+
+def lazy_imports(entries):
+    """Cumulative ms of each import first made while serving a request"""
+    return {name: cumulative_us / 1000 for _, cumulative_us, depth, name in entries if depth == 0}
+
+
+def print_table(title, rows, top):
+    print(f"\n{title}")
+    for name, ms in sorted(rows.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('module', nargs='?', default='budget_lunch')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='rows per breakdown')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='fail if the median import exceeds this')
+    parser.add_argument('--first-request', metavar='PATH',
+                        help='also time the first request to PATH against a local fake Supabase')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the app, e.g. MENU_FEED=realtime')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.update(item.split('=', 1) for item in args.env)
+    fake = None
+    if args.first_request:
+        from fake_supabase import FakeSupabase
+        fake = FakeSupabase(rows=1000).start()
+        env['SUPABASE_URL'] = fake.url
+        env['SUPABASE_HTTP2'] = '0'
+
+    try:
+        runs = [run_once(args.module, env, args.first_request) for _ in range(args.runs)]
+    finally:
+        if fake is not None:
+            fake.stop()
+
+    timings = [run[0] for run in runs]
+    import_ms = [timing['import_ms'] for timing in timings]
+    median = statistics.median(import_ms)
+    # The breakdown comes from the run closest to the median
+    _, entries, lazy_entries = min(runs, key=lambda run: abs(run[0]['import_ms'] - median))
+
+    print(f"{args.module}: import + create_app over {args.runs} runs")
+    print(f"  median {median:.0f} ms, min {min(import_ms):.0f} ms, max {max(import_ms):.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+    if args.first_request:
+        first = statistics.median(timing['first_request_ms'] for timing in timings)
+        print(f"  first GET {args.first_request}: median {first:.0f} ms (includes building Supabase clients)")
+    print_table('Imported by the app module (cumulative)', direct_imports(entries, args.module), args.top)
+    print_table('Self time by top-level package', by_package(entries), args.top)
+    if args.first_request:
+        print_table('Imported by the first request', lazy_imports(lazy_entries), args.top)
+
+    if median > args.budget_ms:
+        print(f"\nOver budget by {median - args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Tenant index cache: hit rate, loads and latency for thousands of tenants under skewed traffic
+
+Requests pick tenants from a Zipf-like distribution (a few busy campuses,
+a long tail of quiet ones), and each runs a /search-style lookup against
+the tenant's index. Loads are in-process, so the times show index work
+only; in production each miss also costs a Supabase round trip.
+
+Run from the repository root:  python benchmarks/tenant_bench.py [tenants] [requests]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_tenants import TenantMenus
+
+ROWS_PER_TENANT = 200
+# (max resident tenants, max resident rows)
+CAPS = ((100, 20_000), (500, 100_000), (2000, 400_000))
+
+
+def make_rows(tenant, count):
+    rng = random.Random(tenant)
+    return [{"id": i, "name": f"item {i}", "price": round(rng.uniform(0.5, 30.0), 2), "tenant_id": tenant}
+            for i in range(count)]
+
+
+def main(tenants, requests):
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(tenants)]
+    picks = rng.choices([f"t{i}" for i in range(tenants)], weights=weights, k=requests)
+    print(f"{tenants} tenants x {ROWS_PER_TENANT} rows, {requests} requests")
+    print(f"{'max tenants':>11} {'max rows':>9} {'hit %':>6} {'loads':>6} {'resident':>8} {'p50 us':>7} {'p99 us':>7}")
+    for max_tenants, max_rows in CAPS:
+        menus = TenantMenus(lambda tenant: make_rows(tenant, ROWS_PER_TENANT), max_tenants, max_rows)
+        samples = []
+        for tenant in picks:
+            start = time.perf_counter()
+            menus.get(tenant).index.search(10.0, limit=20)
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        stats = menus.stats()
+        print(f"{max_tenants:>11} {max_rows:>9} {stats['hits'] / requests:>6.1%} {stats['loads']:>6} "
+              f"{stats['resident']:>8} {statistics.median(samples) * 1e6:>7.0f} "
+              f"{samples[int(len(samples) * 0.99) - 1] * 1e6:>7.0f}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [5000, 20_000][len(args):]))
@@ -1,9 +1,15 @@
-from flask import Flask, render_template, send_from_directory, send_file, request
+from flask import Flask, Blueprint, render_template, send_from_directory, send_file, request, current_app, abort, jsonify
+from flask.json.provider import DefaultJSONProvider
 import os
+from static_assets import AssetPipeline
+from menu_store import MenuItem, MenuStore, ListMenuStore
+from menu_file_store import FileMenuStore
+from menu_query import MenuQuery, QueryError, QueryEngineCache
+from metrics import install_metrics
 
-app = Flask(__name__)
+bp = Blueprint('budget_lunch_local_db', __name__)
 
-lunch_db = [
+DEFAULT_MENU = [
     {
         "name" : "pizza",
         "price" : 6.99,
@@ -26,16 +32,38 @@ lunch_db = [
     }
 ]
 
-@app.route("/search/<price>")
+# The plain list of dicts by default; MENU_STORE=columnar keeps compact
+# MenuItem rows with a price index, MENU_STORE=file persists items in
+# MENU_STORE_PATH and shares them between worker processes
+MENU_STORE = os.environ.get('MENU_STORE', 'list')
+MENU_STORE_PATH = os.environ.get('MENU_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'lunch_menu'))
+
+def open_menu_store():
+    if MENU_STORE == 'list':
+        return ListMenuStore(DEFAULT_MENU)
+    if MENU_STORE == 'file':
+        return FileMenuStore(MENU_STORE_PATH, seed=DEFAULT_MENU,
+                             fsync=os.environ.get('MENU_STORE_FSYNC', '1') == '1')
+    return MenuStore(DEFAULT_MENU)
+
+lunch_db = open_menu_store()
+query_engines = QueryEngineCache()
+
+@bp.route("/search/<price>")
 def search_food_with_price(price):
-    price = float(price)
-    res = []
-    for food in lunch_db:
-        if food["price"] <= price:
-            res.append(food)
-    return res
+    return lunch_db.search(float(price))
 
-@app.route("/add/<name>/<price>")
+@bp.route("/query")
+def query_menu():
+    # Same engine and parameters as budget_lunch's /query; rows are read from the store by position
+    engine = query_engines.get(lunch_db.version, lambda: lunch_db)
+    return jsonify(engine.run(MenuQuery.from_args(request.args)))
+
+@bp.app_errorhandler(QueryError)
+def query_error(e):
+    return jsonify({'error': str(e)}), 400
+
+@bp.route("/add/<name>/<price>")
 def add_food_item(name, price):
     price = float(price)
     imageurl = request.args.get('imageurl')
@@ -48,31 +76,73 @@ def add_food_item(name, price):
 
 
 
-@app.route("/")
+@bp.route("/")
 def home():
-    return send_file('index.html')
+    return current_app.extensions['assets'].serve('index.html')
 
-@app.route("/add.html")
+@bp.route("/add.html")
 def server_add_html():
     return send_file('add.html')
 
 
-@app.route("/styles.css")
+@bp.route("/styles.css")
 def serve_css():
-    return send_file('styles.css', mimetype='text/css')
+    return current_app.extensions['assets'].serve('styles.css')
 
-@app.route("/script.js")
+@bp.route("/script.js")
 def serve_js():
-    return send_file('script.js', mimetype='application/javascript')
+    return current_app.extensions['assets'].serve('script.js')
 
-@app.route("/script_add.js")
+@bp.route("/menu_events.js")
+def serve_js_menu_events():
+    return current_app.extensions['assets'].serve('menu_events.js')
+
+@bp.route("/script_add.js")
 def serve_js_add():
     return send_file('script_add.js', mimetype='application/javascript')
 
+@bp.route("/assets/<path:filename>")
+def serve_fingerprinted_asset(filename):
+    response = current_app.extensions['assets'].serve_fingerprinted(filename)
+    if response is None:
+        abort(404)
+    return response
+
 
-@app.route("/hello")
+@bp.route("/hello")
 def show_hello_world():
     return "Welcome to CS4800 Software Engineering"
 
 
-app.run(host = "0.0.0.0", port = 5002)
+
+class MenuJSONProvider(DefaultJSONProvider):
+    """Encodes the MenuItem rows a columnar MENU_STORE returns as plain objects"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, MenuItem):
+            return o.as_dict()
+        return DefaultJSONProvider.default(o)
+
+
+def create_app():
+    """Build the Flask app. Importing this module never starts a server."""
+    app = Flask(__name__)
+    app.json = MenuJSONProvider(app)
+    # Fingerprint, compress and cache the front-end files once per process
+    app.extensions['assets'] = AssetPipeline(
+        app.root_path,
+        assets=('styles.css', 'script.js', 'menu_events.js'),
+        pages=('index.html',),
+    )
+    app.register_blueprint(bp)
+    install_metrics(app)
+    return app
+
+
+# WSGI entry point, e.g. `gunicorn -c gunicorn.conf.py budget_lunch_local_db:app`
+app = create_app()
+
+if __name__ == "__main__":
+    # Development server only; production runs under gunicorn (see deploy.sh)
+    app.run(host = "0.0.0.0", port = 5002)
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import math
+
+# Columns accepted by the bulk import and written by the export
+IMPORT_FIELDS = ('id', 'name', 'price', 'imageurl')
+EXPORT_FIELDS = IMPORT_FIELDS
+MAX_BULK_ROWS = 5000
+IMPORT_MODES = ('insert', 'upsert')
+
+
+class BulkValidationError(ValueError):
+    """A bulk request that was rejected as a whole; `errors` lists what was wrong"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid row(s)")
+        self.errors = errors
+
+    def to_dict(self):
+        return {'success': False, 'message': str(self), 'errors': self.errors}
+
+    def __reduce__(self):
+        # Rebuilt from `errors` when raised in a job process (see cpu_jobs)
+        return type(self), (self.errors,)
+
+
+def row_error(row, message, field=None):
+    error = {'row': row, 'message': message}
+    if field:
+        error['field'] = field
+    return error
+
+
+def read_records(body, content_type):
+    """Raw record dicts from a JSON or CSV request body"""
+    text = body.decode('utf-8-sig') if isinstance(body, bytes) else body
+    if 'csv' in (content_type or ''):
+        return list(csv.DictReader(io.StringIO(text)))
+    try:
+        data = json.loads(text)
+    except ValueError:
+        raise BulkValidationError([row_error(None, 'Body is not valid JSON')])
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list):
+        raise BulkValidationError([row_error(None, 'Expected a JSON array of items or {"items": [...]}')])
+    return data
+
+
+def validate_item(record, row, mode):
+    """(item, errors) for one record; row numbers start at 1"""
+    if not isinstance(record, dict):
+        return None, [row_error(row, 'Item must be an object')]
+    errors = []
+    unknown = [key for key in record if key not in IMPORT_FIELDS]
+    if unknown:
+        errors.append(row_error(row, f"Unknown fields: {', '.join(map(str, unknown))}"))
+
+    name = record.get('name')
+    if not isinstance(name, str) or not name.strip():
+        errors.append(row_error(row, 'name is required', 'name'))
+
+    price = record.get('price')
+    try:
+        price = float(price)
+        if not math.isfinite(price) or price < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append(row_error(row, 'price must be a non-negative number', 'price'))
+
+    imageurl = record.get('imageurl') or None
+    if imageurl is not None and not isinstance(imageurl, str):
+        errors.append(row_error(row, 'imageurl must be a string', 'imageurl'))
+
+    item_id = record.get('id')
+    if item_id in (None, ''):
+        item_id = None
+        if mode == 'upsert':
+            errors.append(row_error(row, 'id is required for upsert', 'id'))
+    elif mode == 'insert':
+        errors.append(row_error(row, 'id is only allowed with mode=upsert', 'id'))
+    else:
+        try:
+            item_id = int(item_id)
+        except (TypeError, ValueError):
+            errors.append(row_error(row, 'id must be an integer', 'id'))
+
+    if errors:
+        return None, errors
+    item = {'name': name.strip(), 'price': price, 'imageurl': imageurl}
+    if item_id is not None:
+        item['id'] = item_id
+    return item, []
+
+
+def parse_items(body, content_type, mode='insert', max_rows=MAX_BULK_ROWS):
+    """Validate a whole import batch up front
+
+    Returns the cleaned rows, or raises BulkValidationError listing every
+    bad row so nothing is written unless the entire batch is valid.
+    """
+    if mode not in IMPORT_MODES:
+        raise BulkValidationError([row_error(None, f"mode must be one of: {', '.join(IMPORT_MODES)}")])
+    records = read_records(body, content_type)
+    if not records:
+        raise BulkValidationError([row_error(None, 'No items to import')])
+    if len(records) > max_rows:
+        raise BulkValidationError([row_error(None, f"At most {max_rows} items per request")])
+
+    items, errors, seen_ids = [], [], set()
+    for row, record in enumerate(records, start=1):
+        item, item_errors = validate_item(record, row, mode)
+        if item is not None and 'id' in item:
+            if item['id'] in seen_ids:
+                item_errors = [row_error(row, f"Duplicate id {item['id']}", 'id')]
+            seen_ids.add(item['id'])
+        errors.extend(item_errors)
+        items.append(item)
+    if errors:
+        raise BulkValidationError(errors)
+    return items
+
+
+def parse_ids(data, max_rows=MAX_BULK_ROWS):
+    """Integer ids from a bulk delete body: {"ids": [...]} or a bare array"""
+    ids = data.get('ids') if isinstance(data, dict) else data
+    if not isinstance(ids, list) or not ids:
+        raise BulkValidationError([row_error(None, 'Expected a non-empty "ids" array')])
+    if len(ids) > max_rows:
+        raise BulkValidationError([row_error(None, f"At most {max_rows} ids per request")])
+    errors = []
+    for row, item_id in enumerate(ids, start=1):
+        if isinstance(item_id, bool) or not isinstance(item_id, int):
+            errors.append(row_error(row, 'id must be an integer', 'id'))
+    if errors:
+        raise BulkValidationError(errors)
+    return list(dict.fromkeys(ids))
+
+
+def csv_chunks(pages, fields=EXPORT_FIELDS):
+    """CSV text for `pages` of rows: a header, then one chunk per page"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
@@ -0,0 +1,233 @@
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+
+class JobRejected(Exception):
+    """A CPU job that was turned away or given up on"""
+
+    status = 503
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFull(JobRejected):
+    pass
+
+
+class JobTimeout(JobRejected):
+    status = 504
+
+
+class JobType:
+    """Limits for one kind of job: processes it may use at once, jobs waiting, seconds per job"""
+
+    def __init__(self, concurrency=1, max_queue=16, timeout=10.0):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+
+class Job:
+    """One submitted call; `result()` waits for it and `cancel()` gives it up"""
+
+    def __init__(self, pool, job_type, fn, args):
+        self.job_type = job_type
+        self.fn = fn
+        self.args = args
+        # Settled by the pool, never by the process pool's own future
+        self.future = concurrent.futures.Future()
+        self.queued_at = pool._clock()
+        self.started_at = None
+        self._pool = pool
+        self._process_future = None
+
+    def result(self, timeout=None):
+        """The call's result (or exception), waiting at most `timeout` seconds"""
+        try:
+            return self.future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self.cancel('timeout')
+            raise JobTimeout(f"{self.job_type} job took longer than {timeout:g}s")
+
+    def cancel(self, outcome='cancelled'):
+        return self._pool._cancel(self, outcome)
+
+
+class JobPool:
+    """Runs CPU-heavy calls in worker processes, so they do not hold the GIL in request threads
+
+    One process pool, created on first use in each (forked) app worker, is
+    shared by every job type in `types` ({name: JobType}). A type runs at
+    most `concurrency` jobs at once and queues `max_queue` more; a job
+    submitted beyond that raises QueueFull at once, so a burst of one kind
+    of work fails fast instead of tying up request threads or starving the
+    other types. `run()` waits `timeout` seconds (queueing
+    included) and then raise JobTimeout.
+
+    Cancelling a job (including by timeout) drops it if it is still queued.
+    A job already running in a process cannot be interrupted: it finishes,
+    its result is thrown away, and it keeps its type's slot until then.
+
+    `fn` and its arguments are pickled, so `fn` must be a module-level
+    function. With `processes=0` calls run inline in the caller's thread,
+    as if there were no pool. `on_finish(job_type, outcome, wait, run)` and
+    `on_depth(job_type, queued, running)` report to instrumentation.
+    """
+
+    def __init__(self, types, processes=0, preload=(), on_finish=None, on_depth=None, clock=time.monotonic):
+        self.types = types
+        self.processes = processes
+        self.preload = list(preload)
+        self._on_finish = on_finish
+        self._on_depth = on_depth
+        self._clock = clock
+        # Re-entrant: a process future that is already done runs its
+        # callback inside submit(), under the lock
+        self._lock = threading.RLock()
+        self._queues = {name: collections.deque() for name in types}
+        self._running = dict.fromkeys(types, 0)
+        self._outcomes = {name: collections.Counter() for name in types}
+        self._executor = None
+        self._pid = None
+
+    def _process_pool(self):
+        if self._executor is None or self._pid != os.getpid():
+            # A forked worker inherits the attribute but not the processes.
+            # forkserver starts jobs from a clean single-threaded process
+            # rather than forking this multi-threaded one.
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            context = multiprocessing.get_context(method)
+            if method == 'forkserver' and self.preload:
+                context.set_forkserver_preload(self.preload)
+            self._executor = concurrent.futures.ProcessPoolExecutor(self.processes, mp_context=context)
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, job_type, fn, *args):
+        """Queue `fn(*args)` as a `job_type` job; raises QueueFull if its queue is full"""
+        limits = self.types[job_type]
+        job = Job(self, job_type, fn, args)
+        with self._lock:
+            queue = self._queues[job_type]
+            if self._running[job_type] >= limits.concurrency and len(queue) >= limits.max_queue:
+                self._outcomes[job_type]['rejected'] += 1
+                self._finish(job_type, 'rejected')
+                raise QueueFull(f"Too many {job_type} jobs right now. Please try again in a moment.", 1)
+            queue.append(job)
+            self._dispatch(job_type)
+            self._depth_changed(job_type)
+        return job
+
+    def _dispatch(self, job_type):
+        queue = self._queues[job_type]
+        while queue and self._running[job_type] < self.types[job_type].concurrency:
+            job = queue.popleft()
+            self._running[job_type] += 1
+            job.started_at = self._clock()
+            executor = self._process_pool()
+            try:
+                job._process_future = executor.submit(job.fn, *job.args)
+            except (BrokenProcessPool, RuntimeError) as e:
+                # A crashed pool is replaced on the next submit
+                self._executor = None
+                job._process_future = concurrent.futures.Future()
+                job._process_future.set_exception(e)
+            job._process_future.add_done_callback(lambda done, job=job: self._completed(job, done))
+
+    def _completed(self, job, done):
+        with self._lock:
+            self._running[job.job_type] -= 1
+            self._dispatch(job.job_type)
+            self._depth_changed(job.job_type)
+        if done.cancelled():
+            return
+        error = done.exception()
+        if isinstance(error, BrokenProcessPool):
+            with self._lock:
+                self._executor = None
+        outcome = 'ok' if error is None else 'error'
+        try:
+            if error is None:
+                job.future.set_result(done.result())
+            else:
+                job.future.set_exception(error)
+        except concurrent.futures.InvalidStateError:
+            # Cancelled or timed out while running; already counted
+            return
+        with self._lock:
+            self._outcomes[job.job_type][outcome] += 1
+        self._finish(job.job_type, outcome, job.started_at - job.queued_at, self._clock() - job.started_at)
+
+    def _cancel(self, job, outcome):
+        with self._lock:
+            queue = self._queues[job.job_type]
+            queued = job in queue
+            if queued:
+                queue.remove(job)
+                self._depth_changed(job.job_type)
+            if not job.future.cancel():
+                return False
+            if job._process_future is not None:
+                # Only works while it waits in the process pool's own queue
+                job._process_future.cancel()
+            self._outcomes[job.job_type][outcome] += 1
+        self._finish(job.job_type, outcome)
+        return True
+
+    def _depth_changed(self, job_type):
+        if self._on_depth is not None:
+            self._on_depth(job_type, len(self._queues[job_type]), self._running[job_type])
+
+    def _finish(self, job_type, outcome, wait=None, run=None):
+        if self._on_finish is not None:
+            self._on_finish(job_type, outcome, wait, run)
+
+    def run(self, job_type, fn, *args):
+        """`fn(*args)` run as a `job_type` job, waiting up to the type's timeout"""
+        if not self.processes:
+            return self._run_inline(job_type, fn, args)
+        return self.submit(job_type, fn, *args).result(self.types[job_type].timeout)
+
+    def _run_inline(self, job_type, fn, args):
+        started = self._clock()
+        outcome = 'error'
+        try:
+            result = fn(*args)
+            outcome = 'ok'
+            return result
+        finally:
+            with self._lock:
+                self._outcomes[job_type][outcome] += 1
+            self._finish(job_type, outcome, 0.0, self._clock() - started)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            queued = [job for queue in self._queues.values() for job in queue]
+        for job in queued:
+            job.cancel()
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'types': {
+                    name: {
+                        'queued': len(self._queues[name]),
+                        'running': self._running[name],
+                        'concurrency': limits.concurrency,
+                        'max_queue': limits.max_queue,
+                        **self._outcomes[name],
+                    }
+                    for name, limits in self.types.items()
+                },
+            }
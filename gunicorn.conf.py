@@ -0,0 +1,60 @@
+##############################################################################
+# Budget Lunch Web App - Gunicorn configuration
+# Used by deploy.sh / manage.sh:  gunicorn -c gunicorn.conf.py <module>:app
+# Every setting can be overridden with the environment variable next to it.
+##############################################################################
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+
+# Listen address; deploy.sh exports PORT from the app file
+bind = f"0.0.0.0:{os.environ.get('PORT', '5002')}"
+
+# Worker processes x threads per worker. Threads let one worker keep serving
+# while another request waits on Supabase.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+# Keep-alive: seconds an idle client connection stays open between requests
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+# A worker silent for `timeout` seconds is killed and replaced. On HUP/TERM,
+# workers get `graceful_timeout` seconds to finish in-flight requests.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Recycle workers periodically so slow leaks cannot accumulate
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+# Log to stdout/stderr; deploy.sh redirects both into app.log
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# Each worker writes its /metrics counters here so any worker can report the
+# totals for all of them; emptied when the master starts
+os.environ.setdefault('METRICS_DIR', os.path.join(
+    tempfile.gettempdir(), f"budget_lunch_metrics_{os.environ.get('PORT', '5002')}"))
+
+# /metrics and /pool-stats are refused unless METRICS_TOKEN is set, so a
+# deployment does not serve them to the internet by accident
+os.environ.setdefault('METRICS_REQUIRE_TOKEN', '1')
+
+
+def on_starting(server):
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+    if not os.environ.get('METRICS_TOKEN') and os.environ['METRICS_REQUIRE_TOKEN'] == '1':
+        server.log.warning("METRICS_TOKEN is not set; /metrics and /pool-stats will answer 403")
+
+
+def post_worker_init(worker):
+    # One-time setup the app left out of its import (e.g. building Supabase
+    # clients) runs while the worker is already serving
+    warm_up = getattr(worker.wsgi, 'extensions', {}).get('warm_up')
+    if warm_up is not None:
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
@@ -0,0 +1,331 @@
+import concurrent.futures
+import hashlib
+import io
+import ipaddress
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+# File suffix of each cached content type (and back). No SVG: it can carry
+# scripts, which would then run on this site's origin.
+SUFFIXES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/avif': '.avif',
+}
+CONTENT_TYPES = {suffix: content_type for content_type, suffix in SUFFIXES.items()}
+
+
+class ImageFetchError(Exception):
+    """The origin image could not be fetched or decoded"""
+
+
+def resize_image(data, content_type, width, quality=80):
+    """(data, content_type) of an image scaled down to fit `width` x `width`
+
+    JPEG for opaque images and PNG otherwise; without Pillow the original
+    is returned. Module-level so it can run in a cpu_jobs process.
+    """
+    try:
+        # Imported on first use to keep worker boot fast
+        from PIL import Image, ImageOps
+    except ImportError:  # without Pillow, originals are cached and served as-is
+        return data, content_type
+    try:
+        image = Image.open(io.BytesIO(data))
+        # Lets the JPEG decoder scale down while decoding
+        image.draft('RGB', (width, width))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width, width))
+        output = io.BytesIO()
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            image.save(output, 'PNG', optimize=True)
+            return output.getvalue(), 'image/png'
+        image.convert('RGB').save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+        return output.getvalue(), 'image/jpeg'
+    except Exception as e:
+        raise ImageFetchError(f"Could not decode image: {e}") from e
+
+
+class ThumbnailCache:
+    """Size-bounded directory of thumbnails, evicting the least recently used
+
+    Files are named `<key><suffix>`; a hit bumps the file's mtime, so every
+    gunicorn worker sharing the directory sees the same recency. Once the
+    bytes written push the (per-worker estimate of the) total past
+    `max_bytes`, the directory is rescanned and the oldest files removed
+    until it is back under 90% of the limit.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Scanned on the first write, so creating a cache touches no files
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _scan(self):
+        """[(path, size, mtime)] of the cached files"""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith('.'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def get(self, key):
+        """(data, content_type) for `key`, or None"""
+        for suffix, content_type in CONTENT_TYPES.items():
+            path = os.path.join(self.directory, key + suffix)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return data, content_type
+        self.misses += 1
+        return None
+
+    def put(self, key, data, content_type):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, key + SUFFIXES[content_type])
+        # Written under a temporary name so readers never see a partial file
+        temporary = os.path.join(self.directory, f".{key}.{os.getpid()}.{threading.get_ident()}")
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        files = sorted(self._scan(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._size = total
+
+    def stats(self):
+        return {
+            'bytes': self._size or 0,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class PinnedTransport(httpx.HTTPTransport):
+    """Connects to the address that passed the check, not to a fresh lookup
+
+    Each request's host is resolved once; unless `allow_private` is set,
+    every address must be public. The connection then goes to that address
+    while the Host header and TLS (SNI and certificate check) keep the
+    URL's hostname, so DNS that changes its answer between the check and
+    the connect (rebinding) cannot point the fetch at an internal service.
+    """
+
+    def __init__(self, allow_private=False, resolve=socket.getaddrinfo, **kwargs):
+        # Pooled connections are keyed by address, so a connection kept open
+        # for one hostname could be reused for another on the same address
+        kwargs.setdefault('limits', httpx.Limits(max_keepalive_connections=0))
+        super().__init__(**kwargs)
+        self.allow_private = allow_private
+        self._resolve = resolve
+
+    def handle_request(self, request):
+        url = request.url
+        address = self._address(url)
+        extensions = dict(request.extensions)
+        if url.scheme == 'https':
+            extensions['sni_hostname'] = url.host
+        # request.headers already carries the original Host
+        pinned = httpx.Request(request.method, url.copy_with(host=address), headers=request.headers,
+                               stream=request.stream, extensions=extensions)
+        return super().handle_request(pinned)
+
+    def _address(self, url):
+        port = url.port or (443 if url.scheme == 'https' else 80)
+        try:
+            addresses = [info[4][0] for info in self._resolve(url.host, port, proto=socket.IPPROTO_TCP)]
+        except socket.gaierror as e:
+            raise ImageFetchError(f"{url}: {e}") from e
+        if not addresses:
+            raise ImageFetchError(f"{url}: no address")
+        if not self.allow_private:
+            for address in addresses:
+                if not ipaddress.ip_address(address).is_global:
+                    raise ImageFetchError(f"{url} resolves to a non-public address")
+        return addresses[0]
+
+
+class ImageProxy:
+    """Thumbnails of remote images, fetched once and kept in a ThumbnailCache
+
+    `thumbnail(url, width)` returns `(data, content_type, etag)`. Images are
+    scaled down to fit `width` x `width` (never up) and re-encoded, JPEG for
+    opaque images and PNG otherwise; without Pillow the original is kept.
+    Concurrent requests for the same URL and width share one fetch, and an
+    origin that failed is not asked again for `failure_ttl` seconds.
+
+    Resizing goes through `offload(resize_image, ...)` when given (e.g. a
+    cpu_jobs.JobPool's `run` for the 'image' type), else runs inline.
+
+    Only http(s) URLs are fetched, and unless `allow_private` is set, only
+    from hosts that resolve to public addresses (see PinnedTransport; every
+    redirect hop is checked again): the image URLs come from the menu
+    table, and must not turn the app into a way to reach internal services.
+    `resolve` replaces socket.getaddrinfo in tests.
+    """
+
+    def __init__(self, cache, timeout=5.0, max_source_bytes=10 * 1024 * 1024, quality=80,
+                 allow_private=False, failure_ttl=60.0, offload=None, resolve=socket.getaddrinfo,
+                 clock=time.monotonic):
+        self.cache = cache
+        self.timeout = timeout
+        self.max_source_bytes = max_source_bytes
+        self.quality = quality
+        self.allow_private = allow_private
+        self.failure_ttl = failure_ttl
+        self._offload = offload
+        self._resolve = resolve
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._failures = {}
+        self._http = None
+        self.fetches = 0
+        self.collapsed = 0
+        self.failures = 0
+
+    @staticmethod
+    def cache_key(url, width):
+        return hashlib.sha256(f"{width}\0{url}".encode('utf-8')).hexdigest()
+
+    def thumbnail(self, url, width):
+        key = self.cache_key(url, width)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return (*cached, key[:32])
+        with self._lock:
+            failed_until = self._failures.get(key)
+            if failed_until is not None:
+                if failed_until > self._clock():
+                    raise ImageFetchError(f"{url} failed recently")
+                del self._failures[key]
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = concurrent.futures.Future()
+            else:
+                self.collapsed += 1
+        if not leader:
+            try:
+                return (*future.result(self.timeout * 2), key[:32])
+            except concurrent.futures.TimeoutError:
+                raise ImageFetchError(f"{url}: timed out waiting for another fetch")
+        try:
+            data, content_type = self._produce(url, width)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                # Only the origin's failures are remembered, not e.g. a full job queue
+                if isinstance(e, ImageFetchError):
+                    self._failures[key] = self._clock() + self.failure_ttl
+                self._flights.pop(key, None)
+            future.set_exception(e)
+            raise
+        try:
+            self.cache.put(key, data, content_type)
+        except OSError as e:
+            # Still served, just fetched again next time
+            print(f"Thumbnail cache write error: {e}")
+        with self._lock:
+            self._flights.pop(key, None)
+        future.set_result((data, content_type))
+        return data, content_type, key[:32]
+
+    def _produce(self, url, width):
+        data, content_type = self._fetch(url)
+        if self._offload is None:
+            return resize_image(data, content_type, width, self.quality)
+        return self._offload(resize_image, data, content_type, width, self.quality)
+
+    def _client(self):
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    transport = PinnedTransport(self.allow_private, self._resolve)
+                    self._http = httpx.Client(timeout=self.timeout, follow_redirects=False, transport=transport)
+        return self._http
+
+    def _fetch(self, url):
+        # Redirects are followed here so every hop goes through the
+        # scheme check (the transport checks its address)
+        for _ in range(5):
+            self._check_url(url)
+            self.fetches += 1
+            try:
+                with self._client().stream('GET', url, headers={'Accept': 'image/*'}) as response:
+                    if response.is_redirect:
+                        url = str(response.url.join(response.headers['Location']))
+                        continue
+                    if response.status_code != 200:
+                        raise ImageFetchError(f"{url} returned {response.status_code}")
+                    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                    if content_type not in SUFFIXES:
+                        raise ImageFetchError(f"{url} is not a supported image ({content_type or 'no type'})")
+                    body = bytearray()
+                    for chunk in response.iter_bytes():
+                        body.extend(chunk)
+                        if len(body) > self.max_source_bytes:
+                            raise ImageFetchError(f"{url} is larger than {self.max_source_bytes} bytes")
+                    return bytes(body), content_type
+            except httpx.HTTPError as e:
+                raise ImageFetchError(f"{url}: {e}") from e
+        raise ImageFetchError(f"{url}: too many redirects")
+
+    def _check_url(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ImageFetchError(f"{url} is not an http(s) URL")
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._flights)
+        return {
+            'in_flight': in_flight,
+            'fetches': self.fetches,
+            'collapsed': self.collapsed,
+            'failures': self.failures,
+            'cache': self.cache.stats(),
+        }
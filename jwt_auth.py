@@ -0,0 +1,145 @@
+import hashlib
+import threading
+import time
+
+import jwt
+
+
+class VerifiedUser:
+    """User built from the claims of a locally verified access token"""
+
+    def __init__(self, claims):
+        self.id = claims.get('sub')
+        self.email = claims.get('email')
+        self.role = claims.get('role')
+        self.claims = claims
+
+    def __repr__(self):
+        return f"VerifiedUser(id={self.id!r}, email={self.email!r})"
+
+
+def token_key(token):
+    """Hash a token so raw credentials are never kept as cache keys"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def token_expiry(token):
+    """Read the exp claim without verifying the token (used only to bound cache lifetimes)"""
+    try:
+        claims = jwt.decode(token, options={'verify_signature': False})
+    except jwt.InvalidTokenError:
+        return None
+    exp = claims.get('exp')
+    return float(exp) if exp is not None else None
+
+
+class TokenCache:
+    """Short-TTL cache of verified token -> user, keyed by token hash"""
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        key = token_key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            return user
+
+    def put(self, token, user, token_exp=None):
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        expires_at = now + self.ttl
+        # Never cache a user past the expiry of the token itself
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        if expires_at <= now:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._purge(now)
+            if len(self._entries) >= self.max_entries:
+                # Still full of live entries: drop the oldest insertion
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[token_key(token)] = (user, expires_at)
+
+    def discard(self, token):
+        with self._lock:
+            self._entries.pop(token_key(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _purge(self, now):
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LocalJWTVerifier:
+    """Verify Supabase access tokens locally (signature, expiry, audience, issuer)
+
+    Asymmetric tokens (RS256/ES256/EdDSA) are checked against the project's JWKS,
+    which is cached and refreshed every `jwks_lifespan` seconds or when an
+    unknown key id shows up. Legacy HS256 tokens need the project JWT secret.
+    """
+
+    ASYMMETRIC_ALGORITHMS = ['RS256', 'ES256', 'EdDSA']
+
+    def __init__(self, supabase_url, api_key, audience='authenticated', jwt_secret=None,
+                 jwks_lifespan=600, leeway=10, jwks_client=None):
+        self.issuer = f"{supabase_url}/auth/v1"
+        self.audience = audience
+        self.jwt_secret = jwt_secret
+        self.leeway = leeway
+        self.jwks_client = jwks_client or jwt.PyJWKClient(
+            f"{self.issuer}/.well-known/jwks.json",
+            cache_keys=True,
+            cache_jwk_set=True,
+            lifespan=jwks_lifespan,
+            headers={'apikey': api_key},
+            timeout=5,
+        )
+
+    def verify(self, token):
+        """Return a VerifiedUser, or raise jwt.InvalidTokenError"""
+        header = jwt.get_unverified_header(token)
+        alg = header.get('alg')
+        if alg == 'HS256':
+            if not self.jwt_secret:
+                raise jwt.InvalidTokenError('HS256 token but no JWT secret configured')
+            key = self.jwt_secret
+            algorithms = ['HS256']
+        elif alg in self.ASYMMETRIC_ALGORITHMS:
+            try:
+                key = self.jwks_client.get_signing_key_from_jwt(token).key
+            except jwt.PyJWKClientError as e:
+                raise jwt.InvalidTokenError(f"No signing key for token: {e}")
+            algorithms = [alg]
+        else:
+            raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {alg}")
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=algorithms,
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={'require': ['exp', 'sub']},
+        )
+        return VerifiedUser(claims)
@@ -15,6 +15,9 @@ NC='\033[0m' # No Color
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PID_FILE="$SCRIPT_DIR/app.pid"
 LOG_FILE="$SCRIPT_DIR/app.log"
+VENV_PATH="$SCRIPT_DIR/venv"
+APP_FILE="${APP_FILE:-budget_lunch_local_db.py}"
+APP_MODULE="$(basename "$APP_FILE" .py)"
 
 # Function to check if app is running
 is_running() {
@@ -27,6 +30,65 @@ is_running() {
     return 1
 }
 
+# Summarize /metrics: request totals, per-route latency split into
+# Supabase (remote) time and our own, and per-call Supabase latency
+metrics_summary() {
+    local port="$1"
+    local auth=()
+    if [ -n "$METRICS_TOKEN" ]; then
+        auth=(-H "Authorization: Bearer $METRICS_TOKEN")
+    fi
+    local metrics
+    metrics=$(curl -s --max-time 3 "${auth[@]}" "http://127.0.0.1:$port/metrics") || return
+    echo "$metrics" | grep -q '^budget_lunch_http_requests_total' || return
+
+    echo -e "\n${BLUE}Request metrics (since start, all workers)${NC}"
+    echo "$metrics" | awk '
+        function label(s, name,    i, rest) {
+            i = index(s, name "=\"")
+            if (i == 0) return ""
+            rest = substr(s, i + length(name) + 2)
+            return substr(rest, 1, index(rest, "\"") - 1)
+        }
+        /^budget_lunch_http_requests_total\{/ {
+            total += $NF; by_class[substr(label($0, "status"), 1, 1) "xx"] += $NF
+        }
+        /^budget_lunch_http_requests_in_flight\{/ { in_flight += $NF }
+        /^budget_lunch_http_request_duration_seconds_sum\{/ { duration[label($0, "route")] += $NF }
+        /^budget_lunch_http_request_duration_seconds_count\{/ { count[label($0, "route")] += $NF }
+        /^budget_lunch_http_request_supabase_seconds_sum\{/ { remote[label($0, "route")] += $NF }
+        /^budget_lunch_supabase_request_duration_seconds_sum\{/ {
+            call = label($0, "service") " " label($0, "operation") " " label($0, "table"); call_time[call] += $NF
+        }
+        /^budget_lunch_supabase_request_duration_seconds_count\{/ {
+            call = label($0, "service") " " label($0, "operation") " " label($0, "table"); calls[call] += $NF; any_calls = 1
+        }
+        /^budget_lunch_supabase_requests_total\{/ {
+            outcome = label($0, "outcome")
+            if (outcome == "error" || outcome == "5xx") {
+                call = label($0, "service") " " label($0, "operation") " " label($0, "table"); call_errors[call] += $NF
+            }
+        }
+        END {
+            classes = ""
+            for (c in by_class) classes = classes " " c "=" by_class[c]
+            # The scrape itself is one of the in-flight requests
+            printf "  Requests: %d (%s ), in flight: %d\n", total, classes, in_flight - 1
+            printf "  %-28s %8s %10s %12s %10s\n", "Route", "Count", "Avg ms", "Supabase ms", "Own ms"
+            for (r in count) {
+                if (count[r] == 0) continue
+                avg = 1000 * duration[r] / count[r]; rem = 1000 * remote[r] / count[r]
+                printf "  %-28s %8d %10.1f %12.1f %10.1f\n", r, count[r], avg, rem, avg - rem
+            }
+            if (any_calls) {
+                printf "  %-28s %8s %10s %12s\n", "Supabase call", "Count", "Avg ms", "Errors"
+                for (c in calls) {
+                    printf "  %-28s %8d %10.1f %12d\n", c, calls[c], 1000 * call_time[c] / calls[c], call_errors[c]
+                }
+            }
+        }'
+}
+
 # Function to get status
 status() {
     echo -e "${BLUE}========================================${NC}"
@@ -37,6 +99,14 @@ status() {
         PID=$(cat "$PID_FILE")
         echo -e "${GREEN}✓ Application is RUNNING${NC}"
         echo -e "  PID: $PID"
+
+        # Server mode and worker processes
+        if ps -p "$PID" -o args= 2>/dev/null | grep -q gunicorn; then
+            WORKERS=$(pgrep -P "$PID" | wc -l)
+            echo -e "  Mode: gunicorn (master + $WORKERS workers)"
+        else
+            echo -e "  Mode: development server"
+        fi
         
         # Get port info
         PORT=$(lsof -Pan -p "$PID" -i 2>/dev/null | grep LISTEN | awk '{print $9}' | cut -d: -f2 | head -1)
@@ -50,12 +120,14 @@ status() {
             echo -e "  Started: $START_TIME"
         fi
         
-        # Memory usage
-        MEM=$(ps -p "$PID" -o rss= 2>/dev/null)
+        # Memory usage (master plus any workers)
+        MEM=$(ps -o rss= -p "$PID" $(pgrep -P "$PID" | sed 's/^/-p /') 2>/dev/null | awk '{sum += $1} END {print sum}')
         if [ ! -z "$MEM" ]; then
             MEM_MB=$((MEM / 1024))
             echo -e "  Memory: ${MEM_MB}MB"
         fi
+
+        metrics_summary "${PORT:-5002}"
     else
         echo -e "${RED}✗ Application is NOT running${NC}"
     fi
@@ -76,7 +148,11 @@ stop() {
         PID=$(cat "$PID_FILE")
         echo -e "Killing process $PID..."
         kill "$PID" 2>/dev/null || kill -9 "$PID" 2>/dev/null
-        sleep 2
+        # gunicorn lets in-flight requests finish before exiting
+        for i in $(seq 1 30); do
+            is_running || break
+            sleep 1
+        done
         
         if is_running; then
             echo -e "${RED}✗ Failed to stop application${NC}"
@@ -93,6 +169,57 @@ stop() {
     fi
 }
 
+# Function to start app without pulling or reinstalling
+start() {
+    if is_running; then
+        echo -e "${YELLOW}Application is already running (PID $(cat "$PID_FILE"))${NC}"
+        return 0
+    fi
+
+    echo -e "${YELLOW}Starting $APP_MODULE:app with gunicorn...${NC}"
+    cd "$SCRIPT_DIR"
+    if [ -d "$VENV_PATH" ]; then
+        source "$VENV_PATH/bin/activate"
+    fi
+    export PORT="${PORT:-$(grep -E "port\s*=\s*[0-9]+" "$APP_FILE" | grep -o '[0-9]\+' | head -1)}"
+    if [ "$APP_MODULE" == "budget_lunch_local_db" ] && [ "${MENU_STORE:-}" != "file" ]; then
+        export WEB_CONCURRENCY="${WEB_CONCURRENCY:-1}"
+    fi
+    nohup gunicorn -c "$SCRIPT_DIR/gunicorn.conf.py" "$APP_MODULE:app" > "$LOG_FILE" 2>&1 &
+    echo "$!" > "$PID_FILE"
+    # Wait until the app answers (up to 15s) instead of a fixed pause
+    for i in $(seq 1 75); do
+        is_running || break
+        curl -s -o /dev/null --max-time 1 "http://127.0.0.1:$PORT/" && break
+        sleep 0.2
+    done
+
+    if is_running; then
+        echo -e "${GREEN}✓ Application started (PID $(cat "$PID_FILE"), port $PORT)${NC}"
+    else
+        echo -e "${RED}✗ Application failed to start, check $LOG_FILE${NC}"
+        return 1
+    fi
+}
+
+# Function to gracefully reload gunicorn workers
+reload() {
+    if ! is_running; then
+        echo -e "${RED}Application is not running${NC}"
+        return 1
+    fi
+
+    PID=$(cat "$PID_FILE")
+    if ps -p "$PID" -o args= 2>/dev/null | grep -q gunicorn; then
+        echo -e "${YELLOW}Reloading workers of gunicorn master $PID...${NC}"
+        kill -HUP "$PID"
+        echo -e "${GREEN}✓ Reload signal sent${NC}"
+    else
+        echo -e "${YELLOW}Development server cannot reload gracefully, use restart${NC}"
+        return 1
+    fi
+}
+
 # Function to show logs
 logs() {
     if [ -f "$LOG_FILE" ]; then
@@ -120,9 +247,15 @@ case "$1" in
     status)
         status
         ;;
+    start)
+        start
+        ;;
     stop)
         stop
         ;;
+    reload)
+        reload
+        ;;
     logs)
         logs "$2"
         ;;
@@ -132,11 +265,13 @@ case "$1" in
     *)
         echo -e "${BLUE}Budget Lunch Management Script${NC}"
         echo ""
-        echo "Usage: $0 {status|stop|logs|restart}"
+        echo "Usage: $0 {status|start|stop|reload|logs|restart}"
         echo ""
         echo "Commands:"
         echo "  status   - Show application status"
+        echo "  start    - Start the application with gunicorn (APP_FILE selects the app)"
         echo "  stop     - Stop the application"
+        echo "  reload   - Gracefully reload gunicorn workers (no dropped requests)"
         echo "  logs     - Show last 50 lines of logs"
         echo "  logs -f  - Follow logs in real-time"
         echo "  restart  - Restart the application (runs deploy.sh)"
@@ -0,0 +1,148 @@
+import math
+import threading
+from collections import OrderedDict
+
+# Alternatives a single /combo request may ask for
+MAX_ALTERNATIVES = 10
+
+
+def to_cents(price):
+    return int(round(float(price) * 100))
+
+
+class ComboError(ValueError):
+    """Bad /combo parameter"""
+
+
+class ComboRequest:
+    """Budget (in cents), item count and number of alternatives for /combo"""
+
+    def __init__(self, budget, max_items, limit=1):
+        self.budget = budget
+        self.max_items = max_items
+        self.limit = limit
+
+    @classmethod
+    def from_args(cls, price, args, max_budget, max_items):
+        try:
+            budget = float(price)
+        except ValueError:
+            raise ComboError("budget must be a number")
+        if not math.isfinite(budget):
+            raise ComboError("budget must be a number")
+        if budget < 0:
+            raise ComboError("budget must not be negative")
+        if to_cents(budget) > max_budget:
+            raise ComboError(f"budget must be at most {max_budget / 100:.2f}")
+        items = cls._parse_int(args.get('items'), 'items', max_items, max_items)
+        limit = cls._parse_int(args.get('limit'), 'limit', 1, MAX_ALTERNATIVES)
+        return cls(to_cents(budget), items, limit)
+
+    @staticmethod
+    def _parse_int(value, name, default, maximum):
+        if value in (None, ''):
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            raise ComboError(f"{name} must be an integer")
+        if not 1 <= number <= maximum:
+            raise ComboError(f"{name} must be between 1 and {maximum}")
+        return number
+
+
+class ComboTable:
+    """Best combinations of distinct menu items for every budget up to `max_budget` cents
+
+    "Best" spends as much of the budget as possible, then uses the fewest
+    items. The table is a 0/1 knapsack over integer cents, held as bitsets:
+    bit s of `reach[k]` is set when some k distinct items cost exactly s
+    cents. Items are added one at a time, and the bitsets from before each
+    item are kept, so a query is the highest set bit at or below the
+    budget plus a walk back through those snapshots to recover the items.
+    Building costs one shift-and-or per item and item count.
+    """
+
+    def __init__(self, rows, max_budget, max_items=3):
+        self.max_budget = max_budget
+        self.max_items = max_items
+        mask = (1 << (max_budget + 1)) - 1
+        # Zero items cost exactly 0
+        reach = [1] + [0] * max_items
+        self._items = []
+        self._before = []
+        for row in rows:
+            if row.get('price') is None:
+                continue
+            cents = to_cents(row['price'])
+            # Free items would join every combo; they are left out
+            if cents <= 0 or cents > max_budget:
+                continue
+            self._items.append((cents, row))
+            # Ints are immutable, so unchanged bitsets are shared between snapshots
+            self._before.append(tuple(reach))
+            for count in range(max_items, 0, -1):
+                reach[count] |= (reach[count - 1] << cents) & mask
+        self._reach = reach
+
+    def best(self, budget, max_items=None, limit=1):
+        """Up to `limit` combos with distinct totals, most expensive first: [(total_cents, [rows])]"""
+        max_items = min(max_items or self.max_items, self.max_items)
+        window = (1 << (min(budget, self.max_budget) + 1)) - 1
+        totals = 0
+        for count in range(1, max_items + 1):
+            totals |= self._reach[count] & window
+        combos = []
+        while totals and len(combos) < limit:
+            total = totals.bit_length() - 1
+            count = next(count for count in range(1, max_items + 1) if self._reach[count] >> total & 1)
+            combos.append((total, self._backtrack(total, count)))
+            totals ^= 1 << total
+        return combos
+
+    def _backtrack(self, total, count):
+        picked = []
+        for i in range(len(self._items) - 1, -1, -1):
+            if not count:
+                break
+            cents, row = self._items[i]
+            if cents > total or self._before[i][count] >> total & 1:
+                # Reachable without this item
+                continue
+            picked.append(row)
+            total -= cents
+            count -= 1
+        picked.reverse()
+        return picked
+
+
+class ComboTableCache:
+    """Keeps the ComboTables of the last `max_tables` menu versions, building one for each new version
+
+    Versions are any hashable key, e.g. (*scope, version) for tenant menus
+    sharing one cache; the least recently used table is dropped first.
+    `build(rows, max_budget, max_items)` makes the table; budget_lunch runs
+    it as a cpu_jobs 'combo' job.
+    """
+
+    def __init__(self, max_budget, max_items, build=ComboTable, max_tables=1):
+        self.max_budget = max_budget
+        self.max_items = max_items
+        self.max_tables = max_tables
+        self._build = build
+        self._lock = threading.Lock()
+        self._tables = OrderedDict()
+        self.builds = 0
+
+    def get(self, version, load_rows):
+        with self._lock:
+            table = self._tables.get(version)
+            if table is None:
+                table = self._build(load_rows(), self.max_budget, self.max_items)
+                self._tables[version] = table
+                self.builds += 1
+                while len(self._tables) > self.max_tables:
+                    self._tables.popitem(last=False)
+            else:
+                self._tables.move_to_end(version)
+            return table
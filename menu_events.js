@@ -0,0 +1,74 @@
+// Live menu changes from /events/menu (server-sent events), shared by the
+// home and admin pages. Each page patches its rendered list in place from
+// item-level diffs and reloads it when told to resync.
+
+// Pages served under /t/<tenant>/ talk to that tenant's routes
+const MENU_BASE = (window.location.pathname.match(/^\/t\/[a-z0-9][a-z0-9_-]*/) || [''])[0];
+
+// Reconnect delay after the server closed the stream (e.g. its stream limit)
+const MENU_EVENTS_RETRY_MS = 30000;
+
+function subscribeMenuEvents(handlers) {
+    // `live` is true while changes are arriving; pages fall back to
+    // reloading their lists after their own edits when it is false
+    const state = { live: false };
+    if (!window.EventSource) {
+        return state;
+    }
+    let lastEventId = null;
+    let opened = false;
+
+    function connect() {
+        const url = `${MENU_BASE}/events/menu` + (lastEventId ? `?last_event_id=${encodeURIComponent(lastEventId)}` : '');
+        const source = new EventSource(url);
+        const track = listener => event => {
+            lastEventId = event.lastEventId || lastEventId;
+            listener(JSON.parse(event.data));
+        };
+
+        source.onopen = () => {
+            opened = true;
+            state.live = true;
+        };
+        source.addEventListener('ready', track(() => {}));
+        source.addEventListener('resync', track(() => handlers.onResync()));
+        ['insert', 'update', 'delete'].forEach(type => {
+            source.addEventListener(type, track(change => handlers.onChange(change)));
+        });
+        source.onerror = () => {
+            state.live = false;
+            // Network errors are retried by EventSource itself; an HTTP error
+            // closes the source. Give up if it never opened (e.g. an app
+            // without /events/menu), otherwise try again later.
+            if (source.readyState === EventSource.CLOSED && opened) {
+                setTimeout(connect, MENU_EVENTS_RETRY_MS);
+            }
+        };
+    }
+
+    connect();
+    return state;
+}
+
+function compareMenuItems(a, b) {
+    return (a.price - b.price) || (a.id - b.id);
+}
+
+// Inserts `html` for `item` before the first rendered element (matched by
+// `selector`, carrying data-price/data-id) that sorts after it. An item that
+// sorts past everything rendered is left for "load more" while more pages
+// remain. Returns whether it was inserted.
+function insertMenuItemHtml(container, selector, item, html, hasMore) {
+    for (const node of container.querySelectorAll(selector)) {
+        const rendered = { price: parseFloat(node.dataset.price), id: parseInt(node.dataset.id, 10) };
+        if (compareMenuItems(item, rendered) < 0) {
+            node.insertAdjacentHTML('beforebegin', html);
+            return true;
+        }
+    }
+    if (hasMore) {
+        return false;
+    }
+    container.insertAdjacentHTML('beforeend', html);
+    return true;
+}
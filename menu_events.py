@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# A change touching more rows than this is sent as a resync instead of a diff
+MAX_EVENT_ITEMS = 500
+
+
+def sse_message(event, data, event_id=None):
+    """One text/event-stream message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class MenuEventLog:
+    """Numbered ring buffer of recent menu changes, for /events/menu
+
+    MenuIndex reports every insert, update and delete through `publish()`.
+    Each change gets the next version number; the last `capacity` changes
+    are kept so a client that reconnects with Last-Event-ID can catch up.
+    Event ids carry a per-process epoch, so an id from another worker (or
+    from before a restart) is recognised and answered with a resync.
+    """
+
+    def __init__(self, capacity=1024, max_items=MAX_EVENT_ITEMS):
+        self.max_items = max_items
+        self._token = os.urandom(4).hex()
+        self._events = deque(maxlen=capacity)
+        self._version = 0
+        self._cond = threading.Condition()
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def epoch(self):
+        # Forked workers share the token but not their sequence of changes
+        return f"{self._token}{os.getpid():x}"
+
+    def event_id(self, version):
+        return f"{self.epoch}-{version}"
+
+    def parse_event_id(self, event_id):
+        """Version from a Last-Event-ID issued by this process, else None"""
+        epoch, _, version = (event_id or '').rpartition('-')
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def publish(self, change, payload):
+        """Record a change: 'insert'/'update' with rows, 'delete' with ids"""
+        if not payload:
+            return
+        with self._cond:
+            self._version += 1
+            if len(payload) > self.max_items:
+                event = {'type': 'resync', 'version': self._version}
+            else:
+                key = 'ids' if change == 'delete' else 'items'
+                event = {'type': change, 'version': self._version, key: list(payload)}
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def since(self, version):
+        """Events after `version`, or None if they are no longer all buffered"""
+        with self._cond:
+            if version == self._version:
+                return []
+            oldest = self._events[0]['version'] if self._events else self._version + 1
+            if version > self._version or version < oldest - 1:
+                return None
+            return [event for event in self._events if event['version'] > version]
+
+    def wait(self, version, timeout):
+        """Block until there is a change after `version`; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._version != version, timeout)
+
+
+def event_stream(log, last_event_id=None, heartbeat=15.0, max_duration=300.0, on_idle=None,
+                 clock=time.monotonic):
+    """text/event-stream body: diffs after `last_event_id`, then live ones
+
+    A new client gets a `ready` event carrying the current version. A client
+    whose Last-Event-ID is unknown or has fallen out of the buffer gets a
+    `resync` event and should reload. Idle periods send a comment every
+    `heartbeat` seconds (after calling `on_idle`), and the stream ends after
+    `max_duration` seconds so the thread is released; EventSource
+    reconnects on its own with Last-Event-ID.
+    """
+    deadline = clock() + max_duration
+    version = log.parse_event_id(last_event_id)
+    if version is None or log.since(version) is None:
+        version = log.version
+        event = 'ready' if last_event_id is None else 'resync'
+        yield sse_message(event, {'version': version}, log.event_id(version))
+    while clock() < deadline:
+        events = log.since(version)
+        if events is None:
+            version = log.version
+            yield sse_message('resync', {'version': version}, log.event_id(version))
+        elif events:
+            for event in events:
+                yield sse_message(event['type'], event, log.event_id(event['version']))
+            version = events[-1]['version']
+        elif not log.wait(version, min(heartbeat, max(deadline - clock(), 0))):
+            if on_idle is not None:
+                on_idle()
+            yield ': keep-alive\n\n'
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import threading
+import time
+
+
+class MenuChangeFeed:
+    """Keeps a MenuIndex coherent with writes made by other nodes
+
+    A background thread holds a subscription to lunch_db change events and
+    applies each INSERT, UPDATE and DELETE to the index as it arrives.
+    `subscribe(on_ready, on_change)` is an async callable that connects,
+    calls `on_ready()` once events are flowing, passes each event to
+    `on_change()` and returns (or raises) when the connection drops.
+
+    While the feed is live the index only does a full reload every
+    `live_staleness` seconds, as a safety net. When it drops, the index goes
+    back to reloading every `poll_staleness` seconds (polling; `replace()`
+    only bumps the version when the rows really changed) until the feed is
+    back. Every (re)subscribe invalidates the index, so events missed while
+    disconnected are picked up by the next read.
+    """
+
+    def __init__(self, index, subscribe, live_staleness=300.0, poll_staleness=None,
+                 retry_delay=1.0, max_retry_delay=30.0):
+        self.index = index
+        self.subscribe = subscribe
+        self.live_staleness = live_staleness
+        self.poll_staleness = index.max_staleness if poll_staleness is None else poll_staleness
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.connected = False
+        self.events = 0
+        self.connects = 0
+        self.last_event_at = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._task = None
+        self._thread = None
+
+    def start(self):
+        """Start the subscriber thread once per process (safe to call on every request)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A forked worker inherits the attributes but not the thread
+            self.connected = False
+            self._loop = asyncio.new_event_loop()
+            self._task = self._loop.create_task(self._run())
+            self._thread = threading.Thread(target=self._run_loop, name='menu-feed', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            # The Realtime client leaves push timers behind; let them unwind
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+
+    def stop(self, timeout=5.0):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._loop.call_soon_threadsafe(self._task.cancel)
+            self._thread.join(timeout)
+            self._pid = None
+            self._went_down()
+
+    async def _run(self):
+        delay = self.retry_delay
+        while True:
+            try:
+                await self.subscribe(self._ready, self.apply)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Menu change feed error: {e}")
+            if self.connected:
+                delay = self.retry_delay
+            self._went_down()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def _ready(self):
+        self.connected = True
+        self.connects += 1
+        self.index.max_staleness = self.live_staleness
+        self.index.invalidate()
+
+    def _went_down(self):
+        self.connected = False
+        self.index.max_staleness = self.poll_staleness
+
+    def apply(self, event):
+        """Apply one change event: {'type': ..., 'record': {...}, 'old_record': {...}}"""
+        change = event.get('type')
+        if change in ('INSERT', 'UPDATE'):
+            self.index.apply_upsert([event['record']])
+        elif change == 'DELETE':
+            self.index.apply_delete([event['old_record']['id']])
+        else:
+            return
+        self.events += 1
+        self.last_event_at = time.time()
+
+    def stats(self):
+        return {
+            'connected': self.connected,
+            'connects': self.connects,
+            'events': self.events,
+            'last_event_at': self.last_event_at,
+        }
+
+
+def realtime_subscriber(supabase_url, supabase_key, table='lunch_db', schema='public'):
+    """MenuChangeFeed `subscribe` callable backed by Supabase Realtime"""
+
+    async def subscribe(on_ready, on_change):
+        # Imported here: only workers with MENU_FEED=realtime need it
+        from realtime import AsyncRealtimeClient, RealtimeSubscribeStates
+
+        # The client's own reconnect would rejoin silently and hide the gap,
+        # so it is off and MenuChangeFeed reconnects (and resyncs) instead
+        client = AsyncRealtimeClient(f"{supabase_url}/realtime/v1", supabase_key, auto_reconnect=False)
+        await client.connect()
+        failed = asyncio.Event()
+
+        def on_status(state, error):
+            if state == RealtimeSubscribeStates.SUBSCRIBED:
+                on_ready()
+            else:
+                print(f"Menu change feed {state.value}: {error}")
+                failed.set()
+
+        try:
+            channel = client.channel(f"{schema}:{table}")
+            channel.on_postgres_changes('*', table=table, schema=schema,
+                                        callback=lambda payload: on_change(payload['data']))
+            await channel.subscribe(on_status)
+            # The listen task ends when the socket closes
+            failure = asyncio.ensure_future(failed.wait())
+            try:
+                await asyncio.wait({client._listen_task, failure}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                failure.cancel()
+        finally:
+            await client.close()
+
+    return subscribe
+
+
+class LocalChangePublisher:
+    """In-process stand-in for the Realtime server, for tests and local runs
+
+    `subscribe` has the signature MenuChangeFeed expects; `publish()` fans an
+    event out to every live subscriber and `disconnect()` drops them all, as
+    a network failure would.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = []
+
+    async def subscribe(self, on_ready, on_change):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        entry = (loop, queue)
+        with self._lock:
+            self._queues.append(entry)
+        try:
+            on_ready()
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                on_change(event)
+        finally:
+            with self._lock:
+                if entry in self._queues:
+                    self._queues.remove(entry)
+
+    def subscribers(self):
+        with self._lock:
+            return len(self._queues)
+
+    def _send(self, item):
+        with self._lock:
+            targets = list(self._queues)
+            if item is None:
+                self._queues.clear()
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def publish(self, change, record=None, old_record=None):
+        self._send({'type': change, 'record': record or {}, 'old_record': old_record or {}})
+
+    def disconnect(self):
+        self._send(None)
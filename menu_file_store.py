@@ -0,0 +1,332 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from heapq import merge
+from itertools import islice
+from operator import itemgetter
+
+LOG_NAME = 'menu.log'
+INDEX_NAME = 'menu.idx'
+INDEX_MAGIC = b'BLMI'
+INDEX_VERSION = 1
+
+# Log record: crc32 of the rest, price, name length, imageurl length (-1 for None),
+# followed by the UTF-8 name and imageurl bytes
+RECORD = struct.Struct('<IdIi')
+RECORD_BODY = struct.Struct('<dIi')
+# Index file: header, then (price, log offset) sorted by price, then the log
+# offsets again in log (insertion) order for positional access
+INDEX_HEADER = struct.Struct('<4sIQQ')
+INDEX_ENTRY = struct.Struct('<dQ')
+OFFSET = struct.Struct('<Q')
+
+# Fold the unindexed log tail into the index once it holds this many records,
+# or 1/INDEX_REBUILD_FRACTION of the indexed ones, whichever is larger
+INDEX_REBUILD_MIN = 1024
+INDEX_REBUILD_FRACTION = 8
+WRITE_CHUNK = 4096
+
+
+def encode_record(item):
+    name = item['name'].encode('utf-8')
+    imageurl = item.get('imageurl')
+    url = b'' if imageurl is None else imageurl.encode('utf-8')
+    body = RECORD_BODY.pack(float(item['price']), len(name), -1 if imageurl is None else len(url)) + name + url
+    return struct.pack('<I', zlib.crc32(body)) + body
+
+
+def decode_record(buf, offset, end):
+    """(price, name, imageurl, next_offset), or None for a short or corrupt record"""
+    if offset + RECORD.size > end:
+        return None
+    crc, price, name_len, url_len = RECORD.unpack_from(buf, offset)
+    start = offset + RECORD.size
+    stop = start + name_len + max(url_len, 0)
+    if stop > end or zlib.crc32(buf[offset + 4:stop]) != crc:
+        return None
+    name = buf[start:start + name_len].decode('utf-8')
+    imageurl = None if url_len < 0 else buf[start + name_len:stop].decode('utf-8')
+    return price, name, imageurl, stop
+
+
+def write_packed(f, packer, rows):
+    rows = iter(rows)
+    while True:
+        chunk = b''.join(packer.pack(*row) for row in islice(rows, WRITE_CHUNK))
+        if not chunk:
+            return
+        f.write(chunk)
+
+
+class FileMenuStore:
+    """Persistent menu for budget_lunch_local_db, shared by worker processes
+
+    Items are appended to `menu.log` (CRC-checked records, written under an
+    exclusive flock). `menu.idx` is a price-sorted index over the log that
+    every process maps read-only, so the page cache holds one shared copy
+    and opening the store costs the same whatever the catalog size. Records
+    appended since the index was written (the "tail") are kept in a small
+    per-process list and folded into a new index, swapped in atomically,
+    once the tail grows past INDEX_REBUILD_MIN. A missing or damaged index
+    is rebuilt by replaying the log; a torn final record is truncated.
+
+    It has the same interface as menu_store.MenuStore.
+    """
+
+    def __init__(self, directory, seed=(), fsync=True, rebuild_min=INDEX_REBUILD_MIN):
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, LOG_NAME)
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.fsync = fsync
+        self.rebuild_min = rebuild_min
+        self._lock = threading.RLock()
+        self._log_fd = os.open(self.log_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._log_map = None
+        self._log_mapped = 0
+        self._index_map = None
+        self._index_ino = None
+        self._count = 0
+        self._covered = 0
+        # (price, offset) of records past the index, in log order
+        self._tail = []
+        self._scanned_to = 0
+
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            if not self._open_index():
+                self._rebuild_index(replay=True)
+            self._scan_tail()
+            self._truncate_torn_tail()
+            if self._needs_rebuild():
+                self._rebuild_index()
+            if seed and self._count + len(self._tail) == 0:
+                self._append_records(b''.join(encode_record(item) for item in seed))
+
+    @contextmanager
+    def _file_lock(self, operation):
+        fcntl.flock(self._log_fd, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._log_fd, fcntl.LOCK_UN)
+
+    def _log_size(self):
+        return os.fstat(self._log_fd).st_size
+
+    def _map_log(self, size):
+        if size > self._log_mapped:
+            if self._log_map is not None:
+                self._log_map.close()
+            self._log_map = mmap.mmap(self._log_fd, size, access=mmap.ACCESS_READ)
+            self._log_mapped = size
+
+    def _open_index(self):
+        """Map the index file; False if it is missing or does not match the log"""
+        try:
+            fd = os.open(self.index_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            stat = os.fstat(fd)
+            if stat.st_size < INDEX_HEADER.size:
+                return False
+            index_map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        magic, version, count, covered = INDEX_HEADER.unpack_from(index_map, 0)
+        expected_size = INDEX_HEADER.size + count * (INDEX_ENTRY.size + OFFSET.size)
+        if (magic, version) != (INDEX_MAGIC, INDEX_VERSION) or stat.st_size != expected_size \
+                or covered > self._log_size():
+            index_map.close()
+            return False
+        if self._index_map is not None:
+            self._index_map.close()
+        self._index_map = index_map
+        self._index_ino = stat.st_ino
+        self._count = count
+        self._covered = covered
+        self._tail = []
+        self._scanned_to = covered
+        return True
+
+    def _reopen_index(self):
+        """Map the index file again if another process replaced it; False if it is unusable"""
+        try:
+            index_ino = os.stat(self.index_path).st_ino
+        except FileNotFoundError:
+            index_ino = None
+        return index_ino == self._index_ino or self._open_index()
+
+    def _refresh(self):
+        """Pick up an index swapped in, or records appended, by another process"""
+        if not self._reopen_index():
+            # Exclusive for the rest of the caller's locked section. flock
+            # drops a shared lock before waiting for the exclusive one, so
+            # another process may have rebuilt the index in between: look again.
+            fcntl.flock(self._log_fd, fcntl.LOCK_UN)
+            fcntl.flock(self._log_fd, fcntl.LOCK_EX)
+            if not self._reopen_index():
+                self._rebuild_index(replay=True)
+        self._scan_tail()
+
+    def _scan_tail(self):
+        end = self._log_size()
+        if end:
+            self._map_log(end)
+        if end <= self._scanned_to:
+            return
+        offset = self._scanned_to
+        while True:
+            record = decode_record(self._log_map, offset, end)
+            if record is None:
+                break
+            self._tail.append((record[0], offset))
+            offset = record[3]
+        self._scanned_to = offset
+
+    def _truncate_torn_tail(self):
+        """Drop a partial record left by a writer that crashed (exclusive lock held)"""
+        if self._log_size() > self._scanned_to:
+            os.ftruncate(self._log_fd, self._scanned_to)
+
+    def _needs_rebuild(self):
+        return len(self._tail) >= max(self.rebuild_min, self._count // INDEX_REBUILD_FRACTION)
+
+    def _index_entries(self):
+        end = INDEX_HEADER.size + self._count * INDEX_ENTRY.size
+        return INDEX_ENTRY.iter_unpack(self._index_map[INDEX_HEADER.size:end]) if self._count else iter(())
+
+    def _index_offsets(self):
+        start = INDEX_HEADER.size + self._count * INDEX_ENTRY.size
+        return map(itemgetter(0), OFFSET.iter_unpack(self._index_map[start:])) if self._count else iter(())
+
+    def _rebuild_index(self, replay=False):
+        """Write a new index covering the whole log (exclusive lock held)"""
+        if replay:
+            self._count, self._covered, self._tail, self._scanned_to = 0, 0, [], 0
+            self._scan_tail()
+            self._truncate_torn_tail()
+        entries = list(merge(self._index_entries(), sorted(self._tail)))
+        offsets = list(self._index_offsets()) + [offset for _, offset in self._tail]
+
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(entries), self._scanned_to))
+            write_packed(f, INDEX_ENTRY, entries)
+            write_packed(f, OFFSET, ((offset,) for offset in offsets))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        if not self._open_index():
+            raise RuntimeError(f"Rebuilt menu index {self.index_path} is unreadable")
+
+    def _append_records(self, data):
+        """Append encoded records (exclusive lock held)"""
+        self._truncate_torn_tail()
+        os.write(self._log_fd, data)
+        if self.fsync:
+            os.fsync(self._log_fd)
+        self._scan_tail()
+        if self._needs_rebuild():
+            self._rebuild_index()
+
+    def append(self, item):
+        self.extend([item])
+
+    def extend(self, items):
+        data = b''.join(encode_record(item) for item in items)
+        if not data:
+            return
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh()
+            self._append_records(data)
+
+    def clear(self):
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            os.ftruncate(self._log_fd, 0)
+            self._rebuild_index(replay=True)
+
+    def _item(self, offset):
+        price, name, imageurl, _ = decode_record(self._log_map, offset, self._scanned_to)
+        return {'name': name, 'price': price, 'imageurl': imageurl}
+
+    def _count_at_most(self, max_price):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if INDEX_ENTRY.unpack_from(self._index_map, INDEX_HEADER.size + mid * INDEX_ENTRY.size)[0] <= max_price:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def search(self, max_price):
+        """Items priced at or below max_price, in insertion order"""
+        max_price = float(max_price)
+        if max_price != max_price:  # NaN matches nothing, as with a plain <= scan
+            return []
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._refresh()
+            matched = self._count_at_most(max_price)
+            end = INDEX_HEADER.size + matched * INDEX_ENTRY.size
+            offsets = sorted(map(itemgetter(1), INDEX_ENTRY.iter_unpack(self._index_map[INDEX_HEADER.size:end])))
+            offsets += [offset for price, offset in self._tail if price <= max_price]
+            return [self._item(offset) for offset in offsets]
+
+    def _offset(self, position):
+        if position < self._count:
+            start = INDEX_HEADER.size + self._count * INDEX_ENTRY.size
+            return OFFSET.unpack_from(self._index_map, start + position * OFFSET.size)[0]
+        return self._tail[position - self._count][1]
+
+    def copy(self):
+        """Plain list of item dicts, in insertion order"""
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._refresh()
+            items, offset = [], 0
+            while offset < self._scanned_to:
+                price, name, imageurl, offset = decode_record(self._log_map, offset, self._scanned_to)
+                items.append({'name': name, 'price': price, 'imageurl': imageurl})
+            return items
+
+    def __getitem__(self, index):
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._refresh()
+            positions = range(self._count + len(self._tail))
+            if isinstance(index, slice):
+                return [self._item(self._offset(position)) for position in positions[index]]
+            return self._item(self._offset(positions[index]))
+
+    def __iter__(self):
+        return iter(self.copy())
+
+    @property
+    def version(self):
+        """Changes whenever any process appends to or clears the store"""
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._refresh()
+            return self._index_ino, self._scanned_to
+
+    def __len__(self):
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._refresh()
+            return self._count + len(self._tail)
+
+    def __eq__(self, other):
+        if isinstance(other, FileMenuStore):
+            other = other.copy()
+        return self.copy() == other
+
+    __hash__ = None
+
+    def close(self):
+        with self._lock:
+            for mapped in (self._log_map, self._index_map):
+                if mapped is not None:
+                    mapped.close()
+            self._log_map = self._index_map = None
+            os.close(self._log_fd)
@@ -0,0 +1,178 @@
+import bisect
+import threading
+import time
+
+
+class MenuIndex:
+    """Price-sorted in-process copy of the lunch_db table
+
+    Rows are loaded once through `loader` and kept sorted by (price, id) so
+    that "everything at or below a price" is a binary search plus a slice.
+    Writes made through this process patch the index directly; writes made
+    elsewhere show up after at most `max_staleness` seconds, when the next
+    read reloads the table, or as soon as a menu_feed.MenuChangeFeed
+    delivers them.
+
+    `accepts(row)`, if given, limits the index to part of the table: other
+    rows are left out of loads, and an upsert of one (a row that moved out)
+    drops it like a delete.
+    """
+
+    def __init__(self, loader, max_staleness=30.0, clock=time.monotonic, accepts=None):
+        self._loader = loader
+        self._accepts = accepts
+        self.max_staleness = max_staleness
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._keys = []
+        self._rows = []
+        self._by_id = {}
+        self._loaded_at = None
+        self._loaded_once = False
+        self._listeners = []
+        self.version = 0
+
+    def add_listener(self, listener):
+        """Call `listener(change, payload)` for every change, under the index lock
+
+        `change` is 'insert' or 'update' with the new rows, or 'delete' with
+        the removed ids. Changes found by a reload are reported the same way.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, change, payload):
+        if payload:
+            for listener in self._listeners:
+                listener(change, payload)
+
+    @staticmethod
+    def _key(row):
+        return (float(row['price']), row.get('id') or 0)
+
+    def is_stale(self):
+        if self._loaded_at is None:
+            return True
+        return self._clock() - self._loaded_at > self.max_staleness
+
+    def ensure_fresh(self):
+        """Reload first if the loaded copy is older than max_staleness"""
+        with self._lock:
+            if self.is_stale():
+                self.reload()
+
+    def reload(self):
+        """Reload the whole table from the loader"""
+        self.replace(self._loader())
+
+    def replace(self, rows):
+        """Replace the indexed rows with a freshly loaded copy of the table"""
+        rows = [row for row in rows if row.get('price') is not None and self._accepted(row)]
+        rows.sort(key=self._key)
+        with self._lock:
+            if rows != self._rows:
+                if self._loaded_once and self._listeners:
+                    self._notify_diff(rows)
+                self._rows = rows
+                self._keys = [self._key(row) for row in rows]
+                self._by_id = {row['id']: key for row, key in zip(rows, self._keys) if 'id' in row}
+                self.version += 1
+            self._loaded_at = self._clock()
+            self._loaded_once = True
+
+    def _notify_diff(self, rows):
+        old = {row['id']: row for row in self._rows if 'id' in row}
+        new = {row['id']: row for row in rows if 'id' in row}
+        self._notify('insert', [row for item_id, row in new.items() if item_id not in old])
+        self._notify('update', [row for item_id, row in new.items() if item_id in old and old[item_id] != row])
+        self._notify('delete', [item_id for item_id in old if item_id not in new])
+
+    def _accepted(self, row):
+        return self._accepts is None or self._accepts(row)
+
+    def invalidate(self):
+        """Force the next read to reload the table"""
+        with self._lock:
+            self._loaded_at = None
+
+    def search(self, max_price, after=None, limit=None):
+        """Return rows with price <= max_price, cheapest first
+
+        `after` resumes from a (price, id) key, as in keyset pagination, and
+        `limit` caps the number of rows returned.
+        """
+        with self._lock:
+            self.ensure_fresh()
+            start = bisect.bisect_right(self._keys, after) if after is not None else 0
+            end = bisect.bisect_right(self._keys, (max_price, float('inf')))
+            if limit is not None:
+                end = min(end, start + limit)
+            return self._rows[start:end]
+
+    def get(self, item_id):
+        """The row with this id, or None"""
+        with self._lock:
+            self.ensure_fresh()
+            key = self._by_id.get(item_id)
+            if key is None:
+                return None
+            return self._rows[bisect.bisect_left(self._keys, key)]
+
+    def all(self):
+        with self._lock:
+            self.ensure_fresh()
+            return list(self._rows)
+
+    def apply_upsert(self, rows):
+        """Insert or replace rows written through this process"""
+        with self._lock:
+            if self._loaded_at is None:
+                # Nothing loaded yet: the next read picks the rows up anyway
+                return
+            inserted, updated, dropped = [], [], []
+            for row in rows:
+                if not self._accepted(row):
+                    if self._remove_id(row.get('id')) is not None:
+                        dropped.append(row['id'])
+                    continue
+                if row.get('price') is None:
+                    continue
+                old = self._remove_id(row.get('id'))
+                key = self._key(row)
+                pos = bisect.bisect_right(self._keys, key)
+                self._keys.insert(pos, key)
+                self._rows.insert(pos, row)
+                if row.get('id') is not None:
+                    self._by_id[row['id']] = key
+                if old is None:
+                    inserted.append(row)
+                elif old != row:
+                    updated.append(row)
+            if inserted or updated or dropped:
+                # Echoes of rows already held (e.g. our own write coming back
+                # through a change feed) leave the version alone
+                self.version += 1
+                self._notify('insert', inserted)
+                self._notify('update', updated)
+                self._notify('delete', dropped)
+
+    def apply_delete(self, item_ids):
+        """Drop rows deleted through this process"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            deleted = [item_id for item_id in item_ids if self._remove_id(item_id) is not None]
+            if deleted:
+                self.version += 1
+                self._notify('delete', deleted)
+
+    def _remove_id(self, item_id):
+        """Drop the row with this id; returns it, or None if there was none"""
+        key = self._by_id.pop(item_id, None)
+        if key is None:
+            return None
+        pos = bisect.bisect_left(self._keys, key)
+        del self._keys[pos]
+        return self._rows.pop(pos)
+
+    def __len__(self):
+        return len(self._rows)
@@ -0,0 +1,243 @@
+import heapq
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from pagination import DEFAULT_PAGE_SIZE, PaginationError, parse_fields, parse_limit
+
+SORTS = ('price', '-price', 'name', '-name')
+# Upper bound for "every string starting with prefix" ranges over sorted strings
+PREFIX_END = '\U0010ffff'
+# Relative cost of filtering and heap-selecting one candidate versus testing
+# one row while walking an index that is already in the requested order
+HEAP_COST = 2
+# Token match sets kept per engine, for repeated and type-ahead queries
+TOKEN_CACHE_SIZE = 256
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.casefold())
+
+
+class QueryError(ValueError):
+    """Bad /query parameter"""
+
+
+def parse_price(value, name):
+    if value in (None, ''):
+        return None
+    try:
+        price = float(value)
+    except ValueError:
+        raise QueryError(f"{name} must be a number")
+    if math.isnan(price):
+        raise QueryError(f"{name} must be a number")
+    return price
+
+
+class MenuQuery:
+    """Filters, sort and limit parsed from /query's query string"""
+
+    def __init__(self, min_price=None, max_price=None, prefix=None, tokens=(), sort='price',
+                 limit=DEFAULT_PAGE_SIZE, fields=None):
+        self.min_price = min_price
+        self.max_price = max_price
+        self.prefix = prefix
+        self.tokens = list(tokens)
+        self.sort = sort
+        self.limit = limit
+        self.fields = fields
+
+    @classmethod
+    def from_args(cls, args):
+        sort = args.get('sort') or 'price'
+        if sort not in SORTS:
+            raise QueryError(f"sort must be one of: {', '.join(SORTS)}")
+        try:
+            limit = parse_limit(args.get('limit'))
+            fields = parse_fields(args.get('fields'))
+        except PaginationError as e:
+            raise QueryError(str(e))
+        return cls(
+            min_price=parse_price(args.get('min_price'), 'min_price'),
+            max_price=parse_price(args.get('max_price'), 'max_price'),
+            prefix=(args.get('prefix') or '').strip().casefold() or None,
+            tokens=tokenize(args.get('q') or ''),
+            sort=sort,
+            limit=limit or DEFAULT_PAGE_SIZE,
+            fields=fields,
+        )
+
+    def select_columns(self):
+        return ','.join(self.fields) if self.fields else '*'
+
+    def project(self, rows):
+        if self.fields is None:
+            return list(rows)
+        return [{field: row.get(field) for field in self.fields} for row in rows]
+
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_').replace('*', '\\*')
+
+
+def apply_menu_query(query, menu_query):
+    """Push a MenuQuery down into a PostgREST select
+
+    Token search becomes one case-insensitive substring match per token, so
+    it can match slightly more than the in-memory token-prefix index.
+    """
+    if menu_query.min_price is not None:
+        query = query.gte('price', menu_query.min_price)
+    if menu_query.max_price is not None:
+        query = query.lte('price', menu_query.max_price)
+    if menu_query.prefix:
+        query = query.ilike('name', f"{escape_like(menu_query.prefix)}*")
+    for token in menu_query.tokens:
+        query = query.ilike('name', f"*{escape_like(token)}*")
+    # Ties break the same way as in QueryEngine: every key follows the sort direction
+    desc = menu_query.sort.startswith('-')
+    if menu_query.sort.lstrip('-') == 'name':
+        query = query.order('name', desc=desc)
+    return query.order('price', desc=desc).order('id', desc=desc).limit(menu_query.limit)
+
+
+class QueryEngine:
+    """Precomputed indexes answering MenuQuery over an immutable row snapshot
+
+    Holds price order (for min/max ranges and price sorting), case-folded name
+    order (for prefixes and name sorting) and an inverted index of name tokens
+    (for q=, where each query token matches indexed tokens by prefix). A query
+    starts from whichever index narrows it most and checks the rest per row.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        prices, names, postings = array('d'), [], {}
+        for position, row in enumerate(rows):
+            prices.append(float(row['price']))
+            name = (row.get('name') or '').casefold()
+            names.append(name)
+            for token in set(tokenize(name)):
+                postings.setdefault(token, array('l')).append(position)
+        self._prices = prices
+        self._names = names
+        self._price_order = array('l', sorted(range(len(prices)), key=prices.__getitem__))
+        self._sorted_prices = array('d', (prices[position] for position in self._price_order))
+        self._name_order = array('l', sorted(range(len(names)), key=lambda position: (names[position], prices[position])))
+        self._sorted_names = [names[position] for position in self._name_order]
+        self._postings = postings
+        self._tokens = sorted(postings)
+        self._token_cache = {}
+
+    def __len__(self):
+        return len(self._prices)
+
+    def _price_range(self, query):
+        lo = 0 if query.min_price is None else bisect_left(self._sorted_prices, query.min_price)
+        hi = len(self) if query.max_price is None else bisect_right(self._sorted_prices, query.max_price)
+        return lo, max(lo, hi)
+
+    def _name_range(self, query):
+        if not query.prefix:
+            return 0, len(self)
+        return (bisect_left(self._sorted_names, query.prefix),
+                bisect_left(self._sorted_names, query.prefix + PREFIX_END))
+
+    def _token_matches(self, query):
+        """Positions whose name has a token starting with every query token, or None"""
+        if not query.tokens:
+            return None
+        key = tuple(sorted(set(query.tokens)))
+        cached = self._token_cache.get(key)
+        if cached is not None:
+            return cached
+        matches = []
+        for token in query.tokens:
+            lo = bisect_left(self._tokens, token)
+            hi = bisect_left(self._tokens, token + PREFIX_END)
+            positions = set()
+            for indexed in self._tokens[lo:hi]:
+                positions.update(self._postings[indexed])
+            matches.append(positions)
+        matches.sort(key=len)
+        result = frozenset(set.intersection(*matches))
+        if len(self._token_cache) >= TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache[key] = result
+        return result
+
+    def run(self, query):
+        """Matching rows, sorted and limited, as projected dicts"""
+        price_lo, price_hi = self._price_range(query)
+        name_lo, name_hi = self._name_range(query)
+        token_matches = self._token_matches(query)
+        prices, names = self._prices, self._names
+
+        def matches(position):
+            price = prices[position]
+            if query.min_price is not None and price < query.min_price:
+                return False
+            if query.max_price is not None and price > query.max_price:
+                return False
+            if query.prefix and not names[position].startswith(query.prefix):
+                return False
+            return token_matches is None or position in token_matches
+
+        by_name = query.sort.lstrip('-') == 'name'
+        descending = query.sort.startswith('-')
+        if by_name:
+            order, order_lo, order_hi = self._name_order, name_lo, name_hi
+        else:
+            order, order_lo, order_hi = self._price_order, price_lo, price_hi
+        smallest = min(price_hi - price_lo, name_hi - name_lo,
+                       len(token_matches) if token_matches is not None else len(self))
+
+        # Walking the ordered index stops after `limit` matches; if filters are
+        # independent that takes about limit / selectivity rows
+        ordered_size = order_hi - order_lo
+        walk_cost = ordered_size if smallest == 0 else min(ordered_size, query.limit * ordered_size / smallest)
+        if walk_cost <= smallest * HEAP_COST:
+            slots = range(order_hi - 1, order_lo - 1, -1) if descending else range(order_lo, order_hi)
+            positions = []
+            for slot in slots:
+                position = order[slot]
+                if matches(position):
+                    positions.append(position)
+                    if len(positions) == query.limit:
+                        break
+        else:
+            if token_matches is not None and len(token_matches) == smallest:
+                candidates = token_matches
+            elif name_hi - name_lo == smallest:
+                candidates = self._name_order[name_lo:name_hi]
+            else:
+                candidates = self._price_order[price_lo:price_hi]
+            if by_name:
+                key = lambda position: (names[position], prices[position], position)
+            else:
+                key = lambda position: (prices[position], position)
+            select = heapq.nlargest if descending else heapq.nsmallest
+            positions = select(query.limit, filter(matches, candidates), key=key)
+
+        return query.project(self.rows[position] for position in positions)
+
+
+class QueryEngineCache:
+    """Keeps one QueryEngine per data version, rebuilding it when the version moves"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = object()
+        self._engine = None
+
+    def get(self, version, load_rows):
+        with self._lock:
+            if self._engine is None or version != self._version:
+                self._engine = QueryEngine(load_rows())
+                self._version = version
+            return self._engine
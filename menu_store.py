@@ -0,0 +1,223 @@
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+from operator import itemgetter
+
+# Keys of a MenuItem, in the order its JSON lists them
+ITEM_FIELDS = ('name', 'price', 'imageurl')
+# String id stored for a missing (None) value; slot 0 of every StringTable
+NO_STRING = 0
+# Extending by more than this many items re-sorts the price index in one pass
+# instead of inserting each item into it
+BULK_REBUILD_THRESHOLD = 64
+# Searches matching more than 1/N of the rows scan the rows instead of
+# sorting the matched slice of the index back into insertion order
+SCAN_FRACTION = 16
+
+
+class StringTable:
+    """Interned strings addressed by small integer ids
+
+    Repeated names and image URLs (very common in vendor catalogs) are stored
+    once and shared by every row that uses them.
+    """
+
+    __slots__ = ('_strings', '_ids')
+
+    def __init__(self):
+        self._strings = [None]
+        self._ids = {}
+
+    def intern(self, value):
+        if value is None:
+            return NO_STRING
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(sys.intern(value))
+            self._ids[value] = string_id
+        return string_id
+
+    def lookup(self, string_id):
+        return self._strings[string_id]
+
+    def __len__(self):
+        return len(self._strings) - 1
+
+
+class MenuItem(Mapping):
+    """One menu row: a read-only mapping with `name`, `price` and `imageurl` slots
+
+    Compares equal to the item dict it was made from and reads like one
+    (`item['price']`, `item.get('imageurl')`), at a fraction of a dict's
+    size. `as_dict()` gives the plain dict for JSON encoding.
+    """
+
+    __slots__ = ('name', 'price', 'imageurl')
+
+    def __init__(self, name, price, imageurl=None):
+        self.name = name
+        self.price = price
+        self.imageurl = imageurl
+
+    def __getitem__(self, key):
+        if key in ITEM_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(ITEM_FIELDS)
+
+    def __len__(self):
+        return len(ITEM_FIELDS)
+
+    def as_dict(self):
+        return {'name': self.name, 'price': self.price, 'imageurl': self.imageurl}
+
+    def __repr__(self):
+        return f"MenuItem({self.name!r}, {self.price!r}, {self.imageurl!r})"
+
+
+class MenuStore:
+    """Compact, append-only menu for budget_lunch_local_db
+
+    Rows are MenuItem records (names and image URLs interned through a
+    StringTable) in insertion order, built once when they are added. A
+    price-sorted array of row positions sits beside them, so search() is a
+    bisect for narrow results and a scan of the rows for wide ones, and
+    either way hands back the stored records rather than building a row
+    per hit. It behaves like the list of
+    dicts it replaces: len(), indexing, iteration, append, extend, clear
+    and copy all speak MenuItems, which compare equal to item dicts.
+    """
+
+    __slots__ = ('_rows', '_strings', '_sorted_prices', '_order', '_lock', 'version')
+
+    def __init__(self, items=()):
+        self._lock = threading.RLock()
+        # Bumped by every change, so derived indexes know when to rebuild
+        self.version = 0
+        self.clear()
+        self.extend(items)
+
+    def clear(self):
+        with self._lock:
+            self._rows = []
+            self._strings = StringTable()
+            # Row positions ordered by (price, position), and their prices
+            self._order = array('l')
+            self._sorted_prices = array('d')
+            self.version += 1
+
+    def _append_row(self, item):
+        strings = self._strings
+        row = MenuItem(strings.lookup(strings.intern(item['name'])), float(item['price']),
+                       strings.lookup(strings.intern(item.get('imageurl'))))
+        self._rows.append(row)
+
+    def _insert_sorted(self, position):
+        price = self._rows[position].price
+        # bisect_right keeps equal prices in insertion order
+        slot = bisect_right(self._sorted_prices, price)
+        self._sorted_prices.insert(slot, price)
+        self._order.insert(slot, position)
+
+    def _rebuild_index(self):
+        rows = self._rows
+        self._order = array('l', sorted(range(len(rows)), key=lambda position: rows[position].price))
+        self._sorted_prices = array('d', (rows[position].price for position in self._order))
+
+    def append(self, item):
+        with self._lock:
+            self._append_row(item)
+            self._insert_sorted(len(self._rows) - 1)
+            self.version += 1
+
+    def extend(self, items):
+        items = list(items)
+        with self._lock:
+            start = len(self._rows)
+            for item in items:
+                self._append_row(item)
+            if len(items) > BULK_REBUILD_THRESHOLD:
+                self._rebuild_index()
+            else:
+                for position in range(start, len(self._rows)):
+                    self._insert_sorted(position)
+            self.version += 1
+
+    def search(self, max_price):
+        """Items priced at or below max_price, in insertion order"""
+        max_price = float(max_price)
+        if max_price != max_price:  # NaN matches nothing, as with a plain <= scan
+            return []
+        with self._lock:
+            rows = self._rows
+            count = bisect_right(self._sorted_prices, max_price)
+            if count == len(rows):
+                return rows[:]
+            if count * SCAN_FRACTION > len(rows):
+                return [row for row in rows if row.price <= max_price]
+            if count == 0:
+                return []
+            if count == 1:
+                return [rows[self._order[0]]]
+            return list(itemgetter(*sorted(self._order[:count]))(rows))
+
+    def copy(self):
+        """Plain list of the rows"""
+        with self._lock:
+            return self._rows[:]
+
+    def __getitem__(self, index):
+        with self._lock:
+            return self._rows[index]
+
+    def __iter__(self):
+        return iter(self.copy())
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __eq__(self, other):
+        if isinstance(other, MenuStore):
+            other = other.copy()
+        return self.copy() == other
+
+    __hash__ = None
+
+    def memory_bytes(self):
+        """Approximate bytes held by the rows, the price index and the string table"""
+        columns = (self._rows, self._order, self._sorted_prices)
+        total = sum(sys.getsizeof(column) for column in columns)
+        total += sum(sys.getsizeof(row) + sys.getsizeof(row.price) for row in self._rows)
+        total += sys.getsizeof(self._strings._strings) + sys.getsizeof(self._strings._ids)
+        total += sum(sys.getsizeof(string) for string in self._strings._strings)
+        return total
+
+
+class ListMenuStore(list):
+    """The original list-of-dicts layout with the MenuStore search interface
+
+    `version` tracks append, extend and clear only.
+    """
+
+    version = 0
+
+    def append(self, item):
+        super().append(item)
+        self.version += 1
+
+    def extend(self, items):
+        super().extend(items)
+        self.version += 1
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+    def search(self, max_price):
+        max_price = float(max_price)
+        return [item for item in self if item['price'] <= max_price]
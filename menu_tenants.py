@@ -0,0 +1,182 @@
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from menu_index import MenuIndex
+from menu_query import QueryEngineCache
+
+# Tenant ids appear in URLs and PostgREST filters, so they are kept plain
+TENANT_ID = re.compile(r'[a-z0-9][a-z0-9_-]{0,62}')
+
+
+def valid_tenant(tenant):
+    return TENANT_ID.fullmatch(tenant) is not None
+
+
+class TenantMenu:
+    """One tenant's MenuIndex and the query engines built over it"""
+
+    def __init__(self, tenant, epoch):
+        self.tenant = tenant
+        # Versions restart when an evicted tenant is loaded again; the epoch
+        # keeps keys made from (scope, version) from matching the old copy's
+        self.scope = (tenant, epoch)
+        self.index = None
+        self.query_engines = QueryEngineCache()
+        # MenuEventLog for /t/<tenant>/events/menu, made when the first stream opens
+        self.events = None
+        # Rows returned by the last load
+        self.rows = 0
+
+
+class TenantMenus:
+    """Per-tenant MenuIndexes, keeping only the recently used tenants in memory
+
+    `get(tenant)` returns the tenant's TenantMenu, creating it on first use;
+    its index loads `loader(tenant)` lazily and then goes stale, reloads and
+    bumps its version on its own, so a change to one tenant leaves every
+    other tenant's caches valid. Tenants are kept in least recently used
+    order and the oldest are dropped once more than `max_tenants` are held
+    or their last loads add up to more than `max_rows` rows. The tenant
+    just asked for is never dropped, however large it is.
+
+    `apply_upsert`, `apply_delete`, `invalidate` and `max_staleness` fan
+    out to the resident indexes, so writes (and a MenuChangeFeed) can treat
+    this like a single MenuIndex. Rows are routed by their `tenant_id`;
+    deletes carry only ids and go to every resident tenant.
+    """
+
+    def __init__(self, loader, max_tenants=1000, max_rows=200_000, max_staleness=30.0, clock=time.monotonic):
+        self._loader = loader
+        self.max_tenants = max_tenants
+        self.max_rows = max_rows
+        self._max_staleness = max_staleness
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._menus = OrderedDict()
+        self._epochs = itertools.count(1)
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, tenant):
+        with self._lock:
+            menu = self._menus.get(tenant)
+            if menu is not None:
+                self._menus.move_to_end(tenant)
+                self.hits += 1
+                return menu
+            self.misses += 1
+            menu = TenantMenu(tenant, next(self._epochs))
+            menu.index = MenuIndex(lambda: self._load(menu), self._max_staleness, self._clock)
+            self._menus[tenant] = menu
+            self._trim()
+            return menu
+
+    def _load(self, menu):
+        rows = self._loader(menu.tenant)
+        with self._lock:
+            self.loads += 1
+            if self._menus.get(menu.tenant) is menu:
+                self.rows += len(rows) - menu.rows
+                menu.rows = len(rows)
+                self._trim()
+            else:
+                # Evicted while loading; the request that asked still gets the rows
+                menu.rows = len(rows)
+        return rows
+
+    def _trim(self):
+        while len(self._menus) > 1 and (len(self._menus) > self.max_tenants or self.rows > self.max_rows):
+            _, menu = self._menus.popitem(last=False)
+            self.rows -= menu.rows
+            self.evictions += 1
+
+    def resident(self):
+        with self._lock:
+            return list(self._menus.values())
+
+    def apply_upsert(self, rows):
+        by_tenant = {}
+        for row in rows:
+            by_tenant.setdefault(row.get('tenant_id'), []).append(row)
+        with self._lock:
+            targets = [(self._menus[tenant], tenant_rows)
+                       for tenant, tenant_rows in by_tenant.items() if tenant in self._menus]
+        for menu, tenant_rows in targets:
+            menu.index.apply_upsert(tenant_rows)
+
+    def apply_delete(self, item_ids):
+        for menu in self.resident():
+            menu.index.apply_delete(item_ids)
+
+    def invalidate(self):
+        for menu in self.resident():
+            menu.index.invalidate()
+
+    @property
+    def max_staleness(self):
+        return self._max_staleness
+
+    @max_staleness.setter
+    def max_staleness(self, seconds):
+        self._max_staleness = seconds
+        for menu in self.resident():
+            menu.index.max_staleness = seconds
+
+    def stats(self):
+        with self._lock:
+            resident = len(self._menus)
+        return {
+            'resident': resident,
+            'rows': self.rows,
+            'max_tenants': self.max_tenants,
+            'max_rows': self.max_rows,
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'evictions': self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._menus)
+
+
+class TenantMembers:
+    """Short-TTL cache of who may edit which tenant
+
+    `lookup(tenant, user_id)` says whether the user is one of the tenant's
+    members; answers (yes and no) are kept for `ttl` seconds, so a removed
+    member loses access within that time.
+    """
+
+    def __init__(self, lookup, ttl=30.0, max_entries=10000, clock=time.monotonic):
+        self._lookup = lookup
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.lookups = 0
+
+    def is_member(self, tenant, user_id):
+        if not user_id:
+            return False
+        key = (tenant, user_id)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        member = bool(self._lookup(tenant, user_id))
+        with self._lock:
+            self.lookups += 1
+            self._entries[key] = (member, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return member
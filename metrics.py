@@ -0,0 +1,506 @@
+import contextvars
+import fcntl
+import glob
+import hmac
+import json
+import math
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from flask import Response, abort, current_app, request
+from werkzeug.exceptions import HTTPException
+
+# Seconds; covers cached index hits through slow Supabase round trips
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Worker snapshots are written at most this often (seconds)
+FLUSH_INTERVAL = 1.0
+# Counters of exited workers are folded into this file in the metrics directory
+RETIRED_SNAPSHOT = 'retired.json'
+UNMATCHED_ROUTE = '<unmatched>'
+
+# Seconds spent waiting on Supabase by the current request, summed over calls
+_remote_time = contextvars.ContextVar('supabase_remote_time', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Labelled samples of one metric; subclasses define how samples combine"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(labels): self._copy(value) for labels, value in self._samples.items()}
+
+    @staticmethod
+    def _copy(value):
+        return list(value) if isinstance(value, list) else value
+
+    def render(self, samples):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(samples.items()):
+            lines.extend(self._render_sample(json.loads(labels), value))
+        return lines
+
+    def _render_sample(self, labels, value):
+        yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._samples[labels] = self._samples.get(labels, 0) + amount
+
+    @staticmethod
+    def merge(total, value):
+        return value if total is None else total + value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._samples[labels] = self._samples.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._samples[labels] = value
+
+    @staticmethod
+    def merge(total, value):
+        return value if total is None else total + value
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; each sample is [bucket counts..., sum, count]"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            sample = self._samples.get(labels)
+            if sample is None:
+                sample = self._samples[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[i] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    @staticmethod
+    def merge(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+    def _render_sample(self, labels, value):
+        names = self.labelnames + ('le',)
+        for bound, count in zip(self.buckets, value):
+            yield f"{self.name}_bucket{_format_labels(names, list(labels) + [_format_value(bound)])} {count}"
+        yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(float(value[-2]))}"
+        yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {value[-1]}"
+
+
+class MetricsRegistry:
+    """Metrics for this process, optionally merged with sibling workers
+
+    With `directory` set (gunicorn.conf.py sets METRICS_DIR), each worker
+    writes a JSON snapshot of its samples there at most once per
+    FLUSH_INTERVAL, and render() adds up every worker's snapshot. Counters
+    and histograms from workers that have exited still count; gauges only
+    come from live workers. An exited worker's file is folded into one
+    RETIRED_SNAPSHOT on the next render, so recycled workers do not leave a
+    file each. The directory is emptied when gunicorn starts.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._metrics = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty = False
+        self._flusher = None
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def mark_dirty(self):
+        """Note that samples changed, so the background flusher writes them out"""
+        if self.directory is None:
+            return
+        self._dirty = True
+        if self._flusher is None or self._flusher[0] != os.getpid():
+            with self._lock:
+                if self._flusher is None or self._flusher[0] != os.getpid():
+                    thread = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+                    self._flusher = (os.getpid(), thread)
+                    thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            if self._dirty:
+                self.flush()
+
+    def flush(self):
+        """Write this worker's snapshot for siblings to read"""
+        if self.directory is None:
+            return
+        with self._flush_lock:
+            self._dirty = False
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{os.getpid()}.json")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+
+    def _snapshots(self):
+        """(snapshot, is_live) for every worker, this one read live"""
+        if self.directory is None:
+            return [(self.snapshot(), True)]
+        self.flush()
+        if any(not self._live(path) for path in self._worker_files()):
+            self._retire()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            snapshot = _read_snapshot(path)
+            if snapshot is not None:
+                snapshots.append((snapshot, self._live(path)))
+        return snapshots
+
+    def _worker_files(self):
+        return [path for path in glob.glob(os.path.join(self.directory, '*.json'))
+                if os.path.basename(path) != RETIRED_SNAPSHOT]
+
+    @staticmethod
+    def _live(path):
+        name = os.path.basename(path)
+        if name == RETIRED_SNAPSHOT:
+            return False
+        pid = int(name.split('.')[0])
+        return pid == os.getpid() or _pid_alive(pid)
+
+    def _retire(self):
+        """Fold the files of exited workers into RETIRED_SNAPSHOT"""
+        # Every worker may render at once; the lock keeps a file from being folded twice
+        with open(os.path.join(self.directory, '.retire.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead = [path for path in self._worker_files() if not self._live(path)]
+            if not dead:
+                return
+            retired_path = os.path.join(self.directory, RETIRED_SNAPSHOT)
+            merged = self._merge({}, [(_read_snapshot(retired_path) or {}, False)])
+            merged = self._merge(merged, [(_read_snapshot(path) or {}, False) for path in dead])
+            tmp_path = f"{retired_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, retired_path)
+            for path in dead:
+                os.remove(path)
+
+    def _merge(self, merged, snapshots):
+        """Add (snapshot, is_live) pairs into `merged`, skipping gauges of dead workers"""
+        kinds = {metric.name: metric for metric in self._metrics}
+        for snapshot, live in snapshots:
+            for name, samples in snapshot.items():
+                metric = kinds.get(name)
+                if metric is None or (metric.kind == 'gauge' and not live):
+                    continue
+                totals = merged.setdefault(name, {})
+                for labels, value in samples.items():
+                    totals[labels] = metric.merge(totals.get(labels), value)
+        return merged
+
+    def collect(self):
+        """{metric name: {labels json: merged value}} across workers"""
+        return self._merge({metric.name: {} for metric in self._metrics}, self._snapshots())
+
+    def render(self):
+        """Prometheus text exposition format"""
+        merged = self.collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(merged[metric.name]))
+        return '\n'.join(lines) + '\n'
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = MetricsRegistry(os.environ.get('METRICS_DIR') or None)
+
+http_requests = registry.counter(
+    'budget_lunch_http_requests_total', 'HTTP requests by route, method and status code',
+    ('route', 'method', 'status'))
+http_duration = registry.histogram(
+    'budget_lunch_http_request_duration_seconds', 'Time from request start to the last byte sent, by route',
+    ('route',))
+http_remote = registry.histogram(
+    'budget_lunch_http_request_supabase_seconds',
+    'Time a request spent waiting on Supabase (summed over its calls), by route; '
+    'duration minus this is time spent in the app',
+    ('route',))
+http_in_flight = registry.gauge(
+    'budget_lunch_http_requests_in_flight', 'Requests being handled, by route', ('route',))
+supabase_duration = registry.histogram(
+    'budget_lunch_supabase_request_duration_seconds', 'Supabase HTTP call latency by service, operation and table',
+    ('service', 'operation', 'table'))
+supabase_requests = registry.counter(
+    'budget_lunch_supabase_requests_total', 'Supabase HTTP calls by service, operation, table and outcome',
+    ('service', 'operation', 'table', 'outcome'))
+errors = registry.counter(
+    'budget_lunch_errors_total', 'Errors handled without failing the request, by source', ('source',))
+auth_rejections = registry.counter(
+    'budget_lunch_auth_rejections_total',
+    'Logins and signups turned away before reaching Supabase (rate_limited, overloaded, timeout)',
+    ('reason',))
+
+jobs = registry.counter(
+    'budget_lunch_jobs_total',
+    'CPU jobs by type and outcome (ok, error, timeout, cancelled, rejected)', ('type', 'outcome'))
+job_wait = registry.histogram(
+    'budget_lunch_job_wait_seconds', 'Time CPU jobs spent queued before a process took them, by type', ('type',))
+job_duration = registry.histogram(
+    'budget_lunch_job_run_seconds', 'Time CPU jobs spent running, by type', ('type',))
+job_queue_depth = registry.gauge(
+    'budget_lunch_job_queue_depth', 'CPU jobs waiting for a process, by type', ('type',))
+jobs_running = registry.gauge(
+    'budget_lunch_jobs_running', 'CPU jobs running in a process, by type', ('type',))
+
+
+REST_OPERATIONS = {'GET': 'select', 'HEAD': 'select', 'PATCH': 'update', 'DELETE': 'delete'}
+AUTH_OPERATIONS = {'user': 'get_user', 'signup': 'sign_up', 'token': 'sign_in', 'logout': 'sign_out'}
+
+
+def supabase_operation(method, url, prefer=''):
+    """(service, operation, table) for a Supabase HTTP call"""
+    parts = [part for part in urlparse(str(url)).path.split('/') if part]
+    if len(parts) >= 4 and parts[:3] == ['rest', 'v1', 'rpc']:
+        return 'rest', 'rpc', parts[3]
+    if len(parts) >= 3 and parts[:2] == ['rest', 'v1']:
+        if method == 'POST':
+            operation = 'upsert' if 'merge-duplicates' in (prefer or '') else 'insert'
+        else:
+            operation = REST_OPERATIONS.get(method, method.lower())
+        return 'rest', operation, parts[2]
+    if len(parts) >= 3 and parts[:2] == ['auth', 'v1']:
+        return 'auth', AUTH_OPERATIONS.get(parts[2], parts[2]), ''
+    return 'other', method.lower(), ''
+
+
+def record_supabase_call(request, seconds, error=None, status_code=None):
+    """Transport hook: time one Supabase call, and add it to the current request's remote time"""
+    service, operation, table = supabase_operation(request.method, request.url, request.headers.get('prefer'))
+    if error is not None:
+        outcome = 'error'
+    else:
+        outcome = f"{status_code // 100}xx" if status_code else 'ok'
+    supabase_duration.observe(seconds, service, operation, table)
+    supabase_requests.inc(service, operation, table, outcome)
+    remote = _remote_time.get()
+    if remote is not None:
+        remote[0] += seconds
+    registry.mark_dirty()
+
+
+def record_error(source):
+    errors.inc(source)
+    registry.mark_dirty()
+
+
+def record_auth_rejection(reason):
+    auth_rejections.inc(reason)
+    registry.mark_dirty()
+
+
+def record_job(job_type, outcome, wait=None, run=None):
+    """cpu_jobs.JobPool `on_finish` hook; wait/run are None for jobs that never ran to the end"""
+    jobs.inc(job_type, outcome)
+    if wait is not None:
+        job_wait.observe(wait, job_type)
+    if run is not None:
+        job_duration.observe(run, job_type)
+    registry.mark_dirty()
+
+
+def record_job_depth(job_type, queued, running):
+    """cpu_jobs.JobPool `on_depth` hook"""
+    job_queue_depth.set(queued, job_type)
+    jobs_running.set(running, job_type)
+    registry.mark_dirty()
+
+
+class MetricsMiddleware:
+    """WSGI middleware timing every request, including streamed bodies
+
+    The route label is the matched URL rule (e.g. /search/<price>), so label
+    cardinality stays bounded. Duration runs until the response iterable is
+    closed, i.e. after the last byte of a streamed body.
+    """
+
+    def __init__(self, wsgi_app, url_map):
+        self.wsgi_app = wsgi_app
+        self.url_map = url_map
+
+    def _route(self, environ):
+        try:
+            rule, _ = self.url_map.bind_to_environ(environ).match(return_rule=True)
+            return rule.rule
+        except HTTPException:
+            return UNMATCHED_ROUTE
+
+    def __call__(self, environ, start_response):
+        route = self._route(environ)
+        method = environ.get('REQUEST_METHOD', 'GET')
+        status = ['500']
+        remote = [0.0]
+        token = _remote_time.set(remote)
+        started = time.perf_counter()
+        http_in_flight.inc(route)
+
+        def capture_status(status_line, headers, exc_info=None):
+            status[0] = status_line.split(' ', 1)[0]
+            return start_response(status_line, headers, exc_info)
+
+        def finish():
+            http_in_flight.dec(route)
+            http_requests.inc(route, method, status[0])
+            http_duration.observe(time.perf_counter() - started, route)
+            http_remote.observe(remote[0], route)
+            registry.mark_dirty()
+            try:
+                _remote_time.reset(token)
+            except ValueError:
+                # The server closed the body from another context
+                pass
+
+        try:
+            body = self.wsgi_app(environ, capture_status)
+        except BaseException:
+            finish()
+            raise
+        return _ClosingIterator(body, finish)
+
+
+class _ClosingIterator:
+    """Pass a WSGI body through, calling `on_close` once it has been sent"""
+
+    def __init__(self, body, on_close):
+        self._body = body
+        self._iterator = iter(body)
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            self._on_close()
+
+
+def require_metrics_token(f):
+    """Decorator for operator endpoints: the app's METRICS_TOKEN, if set, as a Bearer token
+
+    With METRICS_REQUIRE_TOKEN (set by gunicorn.conf.py) and no token, the
+    endpoint is refused outright rather than served to anyone.
+    """
+    def decorated_function(*args, **kwargs):
+        token = current_app.config.get('METRICS_TOKEN')
+        if not token and current_app.config.get('METRICS_REQUIRE_TOKEN'):
+            abort(403)
+        # Constant-time, so response timing does not give the token away
+        sent = request.headers.get('Authorization', '').encode()
+        if token and not hmac.compare_digest(sent, f"Bearer {token}".encode()):
+            abort(401)
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+
+def install_metrics(app):
+    """Wrap `app` in MetricsMiddleware and serve GET /metrics
+
+    METRICS_TOKEN, if set, must be sent as a Bearer token to read /metrics
+    (and any view wrapped in require_metrics_token); see that decorator for
+    METRICS_REQUIRE_TOKEN.
+    """
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app, app.url_map)
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+    app.config.setdefault('METRICS_REQUIRE_TOKEN', os.environ.get('METRICS_REQUIRE_TOKEN') == '1')
+
+    @require_metrics_token
+    def metrics_endpoint():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
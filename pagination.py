@@ -0,0 +1,147 @@
+import base64
+import json
+
+from streaming import STREAM_FORMATS
+
+# Columns clients may ask for with ?fields=
+MENU_FIELDS = ('id', 'name', 'price', 'imageurl')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """Bad limit, cursor, fields or stream query parameter"""
+
+
+def encode_cursor(row):
+    """Opaque cursor pointing just past `row` in (price, id) order"""
+    raw = json.dumps([row['price'], row['id']], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (price, id) a cursor points past"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        price, item_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return float(price), int(item_id)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+
+def parse_limit(value):
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be at least 1')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_fields(value):
+    """Requested columns from a comma-separated fields= value, or None for all"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in MENU_FIELDS]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_stream(value):
+    if not value:
+        return None
+    if value not in STREAM_FORMATS:
+        raise PaginationError(f"stream must be one of: {', '.join(STREAM_FORMATS)}")
+    return value
+
+
+class PageRequest:
+    """limit / cursor / fields / stream parsed from a request's query string"""
+
+    def __init__(self, limit=None, after=None, fields=None, stream=None):
+        self.limit = limit
+        self.after = after
+        self.fields = fields
+        self.stream = stream
+
+    @classmethod
+    def from_args(cls, args):
+        cursor = args.get('cursor')
+        page = cls(
+            limit=parse_limit(args.get('limit')),
+            after=decode_cursor(cursor) if cursor else None,
+            fields=parse_fields(args.get('fields')),
+            stream=parse_stream(args.get('stream')),
+        )
+        if page.stream and (page.limit is not None or page.after is not None):
+            raise PaginationError('stream cannot be combined with limit or cursor')
+        if page.after is not None and page.limit is None:
+            page.limit = DEFAULT_PAGE_SIZE
+        return page
+
+    def cache_key(self):
+        return (self.limit, self.after, tuple(self.fields) if self.fields else None)
+
+    @property
+    def paginated(self):
+        return self.limit is not None
+
+    def select_columns(self):
+        """PostgREST select= list; keeps the cursor columns even when not requested"""
+        if self.fields is None:
+            return '*'
+        columns = list(self.fields)
+        for column in ('id', 'price'):
+            if self.paginated and column not in columns:
+                columns.append(column)
+        return ','.join(columns)
+
+    def project(self, rows):
+        if self.fields is None:
+            return list(rows)
+        return [{field: row.get(field) for field in self.fields} for row in rows]
+
+    def response(self, rows):
+        """Response body for rows fetched with limit + 1 to detect a next page
+
+        Unpaginated requests keep the original plain-array shape.
+        """
+        if not self.paginated:
+            return self.project(rows)
+        next_cursor = None
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            next_cursor = encode_cursor(rows[-1])
+        return {'items': self.project(rows), 'next_cursor': next_cursor}
+
+
+def apply_keyset(query, page):
+    """Add (price, id) keyset ordering, cursor filter and limit + 1 to a PostgREST select"""
+    if not page.paginated:
+        return query
+    query = query.order('price').order('id').limit(page.limit + 1)
+    if page.after is not None:
+        price, item_id = page.after
+        query = query.or_(f"price.gt.{price},and(price.eq.{price},id.gt.{item_id})")
+    return query
+
+
+def iter_pages(fetch, page_size=DEFAULT_PAGE_SIZE, fields=None):
+    """Walk a whole result set in (price, id) order, one keyset page at a time
+
+    `fetch(page)` returns up to page.limit + 1 rows after page.after, like
+    apply_keyset queries or MenuIndex.search. Yields projected row lists.
+    """
+    page = PageRequest(limit=page_size, fields=fields)
+    while True:
+        rows = fetch(page)
+        yield page.project(rows[:page_size])
+        if len(rows) <= page_size:
+            return
+        last = rows[page_size - 1]
+        page.after = (float(last['price']), int(last['id']))
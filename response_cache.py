@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+# Rough per-entry bookkeeping cost on top of the body itself
+ENTRY_OVERHEAD = 256
+
+
+class CachedResponse:
+    """A serialized response body with its strong ETag"""
+
+    __slots__ = ('body', 'etag', 'size')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.size = len(body) + ENTRY_OVERHEAD
+
+    def to_response(self, cache_control, mimetype='application/json'):
+        """Full response, or an empty 304 if the client's tag still matches"""
+        response = Response(mimetype=mimetype)
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = cache_control
+        if request.if_none_match.contains(self.etag):
+            response.status_code = 304
+        else:
+            response.set_data(self.body)
+        return response
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of response bodies bounded by total size in bytes
+
+    Keys should include whatever version the cached data depends on, so a
+    write never has to find and purge old entries: they simply stop being
+    asked for and fall off the LRU end.
+    """
+
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body):
+        entry = CachedResponse(body)
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -10,6 +10,11 @@ document.addEventListener('DOMContentLoaded', function() {
             performSearch();
         }
     });
+    document.getElementById('nameFilter').addEventListener('keypress', function(e) {
+        if (e.key === 'Enter') {
+            performSearch();
+        }
+    });
 
     // Add loading state to search button
     const searchButton = document.getElementById('search');
@@ -32,6 +37,9 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Add smooth scroll for anchor links
     addSmoothScrolling();
+
+    // Keep the shown results current as the menu changes
+    subscribeMenuEvents({ onChange: applyMenuChange, onResync: refreshResults });
 });
 
 // Create and add scroll-to-top button
@@ -92,6 +100,39 @@ function addSmoothScrolling() {
     });
 }
 
+// Results are fetched a page at a time; "Show more" follows the cursor
+const SEARCH_PAGE_SIZE = 24;
+let searchState = { budget: null, nameFilter: '', sort: 'price', cursor: null, count: 0 };
+
+// A name filter or a non-default sort goes through /query, which returns one
+// sorted page of up to QUERY_LIMIT rows with no cursor
+const QUERY_LIMIT = 200;
+
+function isQuerySearch(state) {
+    return Boolean(state.nameFilter) || state.sort !== 'price';
+}
+
+function fetchSearchPage(state, cursor) {
+    const { budget, nameFilter, sort } = state;
+    let url;
+    if (isQuerySearch(state)) {
+        url = `${MENU_BASE}/query?max_price=${encodeURIComponent(budget)}&sort=${encodeURIComponent(sort)}` +
+            `&limit=${QUERY_LIMIT}&fields=id,name,price,imageurl`;
+        if (nameFilter) {
+            url += `&q=${encodeURIComponent(nameFilter)}`;
+        }
+    } else {
+        url = `${MENU_BASE}/search/${budget}?limit=${SEARCH_PAGE_SIZE}&fields=id,name,price,imageurl`;
+        if (cursor) {
+            url += `&cursor=${encodeURIComponent(cursor)}`;
+        }
+    }
+    return fetch(url)
+        .then(response => response.json())
+        // /query and the local-db app's /search answer with a bare array
+        .then(data => Array.isArray(data) ? { items: data, next_cursor: null } : data);
+}
+
 function performSearch() {
     const budget = document.getElementById('price').value;
     const searchButton = document.getElementById('search');
@@ -106,11 +147,17 @@ function performSearch() {
     // Show loading state
     setLoadingState(true);
     
-    fetch(`/search/${budget}`)
-        .then(response => response.json())
+    const state = {
+        budget: budget,
+        nameFilter: document.getElementById('nameFilter').value.trim(),
+        sort: document.getElementById('sortBy').value,
+    };
+    fetchSearchPage(state, null)
         .then(data => {
-            displayResults(data, budget);
-            showNotification(`Found ${data.length} meal${data.length !== 1 ? 's' : ''} within your budget!`, 'success');
+            searchState = { ...state, cursor: data.next_cursor, count: data.items.length };
+            displayResults(data.items, budget);
+            const found = `${data.items.length}${data.next_cursor ? '+' : ''}`;
+            showNotification(`Found ${found} meal${data.items.length !== 1 ? 's' : ''} within your budget!`, 'success');
         })
         .catch(error => {
             console.error('Error:', error);
@@ -130,9 +177,115 @@ function performSearch() {
         });
 }
 
+function loadMoreResults() {
+    const loadMoreButton = document.getElementById('loadMore');
+    loadMoreButton.disabled = true;
+    loadMoreButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i> <span>Loading...</span>';
+    
+    fetchSearchPage(searchState, searchState.cursor)
+        .then(data => {
+            const grid = document.querySelector('#result .food-grid');
+            grid.insertAdjacentHTML('beforeend', data.items.map((food, i) => renderFoodItem(food, i)).join(''));
+            searchState.count += data.items.length;
+            searchState.cursor = data.next_cursor;
+            updateResultsFooter();
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showNotification('Error loading more results. Please try again.', 'error');
+            loadMoreButton.disabled = false;
+            loadMoreButton.innerHTML = '<i class="fas fa-chevron-down"></i> <span>Show more</span>';
+        });
+}
+
+// Re-run the current search quietly, e.g. after a resync event
+function refreshResults() {
+    if (searchState.budget === null) {
+        return;
+    }
+    const state = searchState;
+    fetchSearchPage(state, null)
+        .then(data => {
+            if (searchState !== state) {
+                return;
+            }
+            searchState = { ...state, cursor: data.next_cursor, count: data.items.length };
+            displayResults(data.items, state.budget, false);
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+// Patch the shown results from an insert/update/delete event. Filtered or
+// re-sorted (/query) results are simply fetched again.
+function applyMenuChange(change) {
+    if (searchState.budget === null) {
+        return;
+    }
+    const grid = document.querySelector('#result .food-grid');
+    if (isQuerySearch(searchState) || !grid) {
+        refreshResults();
+        return;
+    }
+    const ids = change.type === 'delete' ? change.ids : change.items.map(item => item.id);
+    ids.forEach(id => {
+        const card = grid.querySelector(`.food-item[data-id="${id}"]`);
+        if (card) {
+            card.remove();
+            searchState.count -= 1;
+        }
+    });
+    if (change.type !== 'delete') {
+        change.items
+            .filter(item => item.price <= parseFloat(searchState.budget))
+            .forEach(item => {
+                if (insertMenuItemHtml(grid, '.food-item', item, renderFoodItem(item, 0), !!searchState.cursor)) {
+                    searchState.count += 1;
+                }
+            });
+    }
+    updateResultsFooter();
+}
+
+function updateResultsFooter() {
+    const count = searchState.count;
+    document.querySelector('#result .results-count').textContent =
+        `${count}${searchState.cursor ? '+' : ''} delicious option${count !== 1 ? 's' : ''} found`;
+    
+    const loadMoreButton = document.getElementById('loadMore');
+    if (searchState.cursor) {
+        loadMoreButton.style.display = '';
+        loadMoreButton.disabled = false;
+        loadMoreButton.innerHTML = '<i class="fas fa-chevron-down"></i> <span>Show more</span>';
+    } else {
+        loadMoreButton.style.display = 'none';
+    }
+}
+
 // Remove addItem function as it's not needed in the main page
 
-function displayResults(foods, budget) {
+// Thumbnails come resized from the app's /img proxy; rows without an id
+// (the local-DB app) still link the original
+function foodImageSrc(food) {
+    return food.id !== undefined ? `${MENU_BASE}/img/${food.id}?w=320` : food.imageurl;
+}
+
+function renderFoodItem(food, index) {
+    const imageHtml = food.imageurl ? 
+        `<img src="${foodImageSrc(food)}" alt="${food.name}" class="food-image" loading="lazy" onerror="this.style.display='none'">` : 
+        `<div class="food-image-placeholder"><i class="fas fa-utensils"></i></div>`;
+    
+    return `
+        <div class="food-item" data-id="${food.id}" data-price="${food.price}" style="--item-index: ${index};">
+            ${imageHtml}
+            <div class="food-details">
+                <div class="food-name">${food.name}</div>
+                <div class="food-price">$${parseFloat(food.price).toFixed(2)}</div>
+            </div>
+        </div>
+    `;
+}
+
+function displayResults(foods, budget, scroll = true) {
     const resultDiv = document.getElementById('result');
     
     if (foods.length === 0) {
@@ -151,34 +304,29 @@ function displayResults(foods, budget) {
     let html = `
         <div class="results-header">
             <h2>🍽️ Meals within your budget of $${budget}</h2>
-            <p class="results-count">${foods.length} delicious option${foods.length !== 1 ? 's' : ''} found</p>
+            <p class="results-count"></p>
         </div>
         <div class="food-grid">
     `;
     
     foods.forEach((food, index) => {
-        const imageHtml = food.imageurl ? 
-            `<img src="${food.imageurl}" alt="${food.name}" class="food-image" onerror="this.style.display='none'">` : 
-            `<div class="food-image-placeholder"><i class="fas fa-utensils"></i></div>`;
-        
-        html += `
-            <div class="food-item" style="--item-index: ${index};">
-                ${imageHtml}
-                <div class="food-details">
-                    <div class="food-name">${food.name}</div>
-                    <div class="food-price">$${parseFloat(food.price).toFixed(2)}</div>
-                </div>
-            </div>
-        `;
+        html += renderFoodItem(food, index);
     });
     
-    html += `</div>`;
+    html += `</div>
+        <div class="load-more">
+            <button class="search-button" id="loadMore"></button>
+        </div>`;
     resultDiv.innerHTML = html;
+    document.getElementById('loadMore').addEventListener('click', loadMoreResults);
+    updateResultsFooter();
     
     // Smooth scroll to results
-    setTimeout(() => {
-        resultDiv.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
-    }, 100);
+    if (scroll) {
+        setTimeout(() => {
+            resultDiv.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+        }, 100);
+    }
 }
 
 function setLoadingState(isLoading) {
@@ -0,0 +1,46 @@
+import time
+
+from jwt_auth import VerifiedUser
+
+
+class SessionRefreshUnavailable(Exception):
+    """Supabase could not renew a session right now; the session is kept for a retry"""
+
+    status = 503
+    retry_after = 5
+
+
+class SignedSession:
+    """Signed-in user kept in Flask's session cookie, checked without Supabase
+
+    `issue()` stores the user's id and email with an expiry `ttl` seconds
+    out. Flask signs the session cookie with SECRET_KEY, so `user()` can
+    trust those fields until the expiry without any remote call. Once it
+    passes, the session has to be renewed from its Supabase refresh token,
+    which also catches sessions revoked since.
+    """
+
+    KEY = 'auth_user'
+
+    def __init__(self, ttl=300.0, clock=time.time):
+        self.ttl = ttl
+        self._clock = clock
+
+    def issue(self, session, user_id, email):
+        session[self.KEY] = {'id': user_id, 'email': email, 'exp': self._clock() + self.ttl}
+
+    def user(self, session):
+        """The session's user while its expiry has not passed, else None"""
+        data = session.get(self.KEY)
+        if not data or data.get('exp', 0) <= self._clock():
+            return None
+        return VerifiedUser({'sub': data.get('id'), 'email': data.get('email'), 'exp': data['exp']})
+
+    def expires_in(self, session):
+        data = session.get(self.KEY)
+        if not data:
+            return None
+        return max(data.get('exp', 0) - self._clock(), 0)
+
+    def clear(self, session):
+        session.pop(self.KEY, None)
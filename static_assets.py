@@ -0,0 +1,152 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from email.utils import formatdate
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped without the package
+    brotli = None
+
+# Fingerprinted URLs never change content, so browsers may keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Unfingerprinted URLs (pages, legacy /styles.css ...) must be revalidated
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Compressing tiny files costs more than it saves
+MIN_COMPRESS_SIZE = 512
+
+
+class StaticAsset:
+    """One file held in memory with its precompressed variants and validators"""
+
+    def __init__(self, name, body, mtime):
+        self.name = name
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if self.mimetype == 'text/javascript':
+            self.mimetype = 'application/javascript'
+        self.last_modified = int(mtime)
+        self.set_body(body)
+
+    def set_body(self, body):
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.etag = self.digest[:16]
+        self.variants = {'identity': body}
+        # Compressed on first request for each encoding: brotli at quality 11
+        # over every asset would take a few hundred ms of each worker's boot
+        self.encodings = ('identity',)
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.encodings = ('br', 'gzip', 'identity') if brotli is not None else ('gzip', 'identity')
+
+    def variant(self, encoding):
+        data = self.variants.get(encoding)
+        if data is None:
+            if encoding == 'br':
+                data = brotli.compress(self.body, quality=11)
+            else:
+                data = gzip.compress(self.body, compresslevel=9, mtime=0)
+            # Racing threads compute the same bytes; either copy may stay
+            self.variants[encoding] = data
+        return data
+
+    @property
+    def fingerprinted_name(self):
+        stem, ext = os.path.splitext(self.name)
+        return f"{stem}.{self.digest[:12]}{ext}"
+
+
+class AssetPipeline:
+    """Fingerprints assets at startup and serves them with HTTP caching
+
+    `assets` (CSS/JS) get content-hashed URLs under /assets/; `pages` (HTML)
+    are rewritten to reference those URLs. Everything is read and hashed
+    at startup and compressed once on first request, then served from memory with ETag/Last-Modified
+    validators, 304s for conditional requests and gzip/brotli negotiation.
+    """
+
+    URL_PREFIX = '/assets/'
+
+    def __init__(self, root, assets=(), pages=()):
+        self.root = root
+        self.assets = {}
+        self.fingerprinted = {}
+        for name in assets:
+            asset = self._load(name)
+            self.assets[name] = asset
+            self.fingerprinted[asset.fingerprinted_name] = asset
+        for name in pages:
+            page = self._load(name)
+            page.set_body(self._rewrite(page.body))
+            # The page changes whenever an asset it references does, since
+            # its fingerprinted URLs change with it
+            page.last_modified = max([page.last_modified] + [
+                asset.last_modified for asset in self.fingerprinted.values()
+                if self.url_for(asset.name).encode() in page.body])
+            self.assets[name] = page
+
+    def _load(self, name):
+        path = os.path.join(self.root, name)
+        with open(path, 'rb') as f:
+            body = f.read()
+        return StaticAsset(name, body, os.path.getmtime(path))
+
+    def url_for(self, name):
+        return self.URL_PREFIX + self.assets[name].fingerprinted_name
+
+    def _rewrite(self, html):
+        for asset in self.fingerprinted.values():
+            for quote in (b'"', b"'"):
+                html = html.replace(quote + b'/' + asset.name.encode() + quote,
+                                    quote + self.url_for(asset.name).encode() + quote)
+        return html
+
+    def serve(self, name, cache_control=REVALIDATE_CACHE_CONTROL):
+        """Response for an asset or page by its original file name"""
+        return self._respond(self.assets[name], cache_control)
+
+    def serve_fingerprinted(self, filename):
+        """Response for /assets/<filename>, or None if the fingerprint is unknown"""
+        asset = self.fingerprinted.get(filename)
+        if asset is None:
+            return None
+        return self._respond(asset, IMMUTABLE_CACHE_CONTROL)
+
+    def _respond(self, asset, cache_control):
+        encoding = self._choose_encoding(asset)
+        # Each encoding is a different representation, so it gets its own tag
+        etag = asset.etag if encoding == 'identity' else f"{asset.etag}-{encoding}"
+
+        response = Response(mimetype=asset.mimetype)
+        response.set_etag(etag)
+        response.headers['Last-Modified'] = formatdate(asset.last_modified, usegmt=True)
+        response.headers['Cache-Control'] = cache_control
+        response.headers['Vary'] = 'Accept-Encoding'
+
+        if self._not_modified(etag, asset.last_modified):
+            response.status_code = 304
+            return response
+
+        response.set_data(asset.variant(encoding))
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def _choose_encoding(asset):
+        accepted = request.accept_encodings
+        for encoding in ('br', 'gzip'):
+            if encoding in asset.encodings and accepted[encoding]:
+                return encoding
+        return 'identity'
+
+    @staticmethod
+    def _not_modified(etag, last_modified):
+        if request.if_none_match:
+            return request.if_none_match.contains(etag)
+        if request.if_modified_since:
+            return request.if_modified_since.timestamp() >= last_modified
+        return False
@@ -0,0 +1,49 @@
+import json
+
+from flask import Response, stream_with_context
+
+# ?stream= values and the content type each one is sent as
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def json_array_chunks(pages):
+    """One JSON array across `pages` of rows, yielded a page at a time"""
+    yield '['
+    first = True
+    for rows in pages:
+        if not rows:
+            continue
+        chunk = ','.join(json.dumps(row) for row in rows)
+        yield chunk if first else ',' + chunk
+        first = False
+    yield ']'
+
+
+def ndjson_chunks(pages):
+    """One JSON document per line, yielded a page at a time"""
+    for rows in pages:
+        if rows:
+            yield ''.join(json.dumps(row) + '\n' for row in rows)
+
+
+def chunked_response(chunks, mimetype, filename=None):
+    """Streamed response for an iterable of text chunks"""
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    # Keep nginx from buffering the whole body before passing it on
+    response.headers['X-Accel-Buffering'] = 'no'
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+def stream_response(pages, stream_format, filename=None):
+    """Chunked response that encodes each page as soon as it has been fetched
+
+    Only one page of rows is alive at a time, so memory is bounded by the
+    page size and the first bytes go out after the first page.
+    """
+    encode = ndjson_chunks if stream_format == 'ndjson' else json_array_chunks
+    return chunked_response(encode(pages), STREAM_FORMATS[stream_format], filename)
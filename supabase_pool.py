@@ -0,0 +1,228 @@
+import contextlib
+import threading
+import time
+
+import httpx
+
+
+class PoolStats:
+    """Request counters for one connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.pool_timeouts = 0
+
+    def start(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finish(self, error=None):
+        with self._lock:
+            self.in_flight -= 1
+            if error is not None:
+                self.errors += 1
+                if isinstance(error, httpx.PoolTimeout):
+                    self.pool_timeouts += 1
+
+
+class PooledTransport(httpx.BaseTransport):
+    """HTTP transport that counts requests and applies per-call timeout overrides
+
+    `observer(request, seconds, error=None, status_code=None)`, if given, is
+    called after every request with its latency (see metrics.record_supabase_call).
+    """
+
+    def __init__(self, transport, stats, overrides, observer=None):
+        self._transport = transport
+        self.stats = stats
+        self._overrides = overrides
+        self._observer = observer
+
+    def handle_request(self, request):
+        timeout = getattr(self._overrides, 'timeout', None)
+        if timeout is not None:
+            request.extensions['timeout'] = httpx.Timeout(timeout).as_dict()
+        self.stats.start()
+        started = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception as e:
+            self.stats.finish(e)
+            if self._observer is not None:
+                self._observer(request, time.perf_counter() - started, error=e)
+            raise
+        self.stats.finish()
+        if self._observer is not None:
+            self._observer(request, time.perf_counter() - started, status_code=response.status_code)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+    @property
+    def connection_pool(self):
+        # httpcore's pool is private to httpx.HTTPTransport; None if that changes
+        return getattr(self._transport, '_pool', None)
+
+
+class SupabasePool:
+    """Thread-safe Supabase access over bounded, keep-alive HTTP/2 connection pools
+
+    Offers the `table()` and `auth` entry points the routes use on a supabase
+    Client. PostgREST and Auth each get their own httpx pool: the PostgREST
+    client rewrites its http client's base URL and headers, so the two cannot
+    share one. The auth client never persists or auto-refreshes sessions,
+    because a sign-in on a shared client would otherwise leak one user's
+    session into every other request on the worker.
+    """
+
+    def __init__(self, supabase_url, supabase_key, max_connections=20, max_keepalive_connections=10,
+                 keepalive_expiry=30.0, timeout=10.0, connect_timeout=5.0, pool_timeout=5.0, http2=True,
+                 observer=None):
+        self.supabase_url = supabase_url
+        self.supabase_key = supabase_key
+        self.max_connections = max_connections
+        self._overrides = threading.local()
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout, pool=pool_timeout)
+        self.http2 = http2
+        self.observer = observer
+        self.headers = {
+            'apiKey': supabase_key,
+            'Authorization': f"Bearer {supabase_key}",
+        }
+        # Clients are built on first use: the postgrest and auth packages
+        # (pydantic models) and the TLS setup would otherwise add most of a
+        # second to every worker's boot
+        self._build_lock = threading.RLock()
+        self._rest_http = None
+        self._auth_http = None
+        self._postgrest = None
+        self._auth = None
+        # PooledTransport of each http client, for pool_stats()
+        self._transports = {}
+
+    def _built(self, name, build):
+        """The client in attribute `name`, built by `build()` on first use"""
+        client = getattr(self, name)
+        if client is None:
+            with self._build_lock:
+                client = getattr(self, name)
+                if client is None:
+                    client = build()
+                    setattr(self, name, client)
+        return client
+
+    @property
+    def rest_http(self):
+        return self._built('_rest_http', lambda: self._make_http_client('rest'))
+
+    @property
+    def auth_http(self):
+        return self._built('_auth_http', lambda: self._make_http_client('auth'))
+
+    @property
+    def postgrest(self):
+        return self._built('_postgrest', self._make_postgrest)
+
+    @property
+    def auth(self):
+        return self._built('_auth', self._make_auth)
+
+    def _make_postgrest(self):
+        from postgrest import SyncPostgrestClient
+        return SyncPostgrestClient(
+            f"{self.supabase_url}/rest/v1",
+            headers=self.headers,
+            http_client=self.rest_http,
+        )
+
+    def _make_auth(self):
+        from supabase_auth import SyncGoTrueClient
+        return SyncGoTrueClient(
+            url=f"{self.supabase_url}/auth/v1",
+            headers=self.headers,
+            auto_refresh_token=False,
+            persist_session=False,
+            http_client=self.auth_http,
+        )
+
+    def _make_http_client(self, name):
+        transport = PooledTransport(
+            httpx.HTTPTransport(http2=self.http2, limits=self.limits),
+            PoolStats(),
+            self._overrides,
+            self.observer,
+        )
+        self._transports[name] = transport
+        return httpx.Client(transport=transport, timeout=self.timeout, http2=self.http2)
+
+    def table(self, table_name):
+        return self.postgrest.from_(table_name)
+
+    def rpc(self, function_name, params):
+        return self.postgrest.rpc(function_name, params)
+
+    def refresh_session(self, refresh_token):
+        """Exchange a refresh token for a new session (AuthResponse)
+
+        Unlike auth.refresh_session(), the result is not stored on the
+        shared auth client, which holds no user session. That takes
+        supabase_auth's private _refresh_access_token, so the package is
+        pinned in requirements.txt.
+        """
+        refresh = getattr(self.auth, '_refresh_access_token', None)
+        if refresh is None:
+            raise RuntimeError("supabase_auth has no _refresh_access_token; check its pinned version")
+        return refresh(refresh_token)
+
+    @contextlib.contextmanager
+    def call_timeout(self, seconds):
+        """Override the timeout of every Supabase call made by this thread inside the block"""
+        previous = getattr(self._overrides, 'timeout', None)
+        self._overrides.timeout = seconds
+        try:
+            yield
+        finally:
+            self._overrides.timeout = previous
+
+    def pool_stats(self):
+        """Connection and request counters per pool, including saturation"""
+        # Builds the clients, so both pools are listed
+        self.rest_http
+        self.auth_http
+        return {name: self._stats_for(self._transports[name]) for name in ('rest', 'auth')}
+
+    def _stats_for(self, transport):
+        stats = transport.stats
+        counts = {'max_connections': self.max_connections}
+        pool = transport.connection_pool
+        if pool is not None:
+            connections = pool.connections
+            counts['connections'] = len(connections)
+            counts['idle_connections'] = sum(1 for connection in connections if connection.is_idle())
+            counts['http2_connections'] = sum(1 for connection in connections if 'HTTP/2' in connection.info())
+        return {
+            **counts,
+            'in_flight': stats.in_flight,
+            'peak_in_flight': stats.peak_in_flight,
+            'requests': stats.requests,
+            'errors': stats.errors,
+            'pool_timeouts': stats.pool_timeouts,
+            'saturation': round(stats.in_flight / self.max_connections, 3),
+        }
+
+    def close(self):
+        for http_client in (self._rest_http, self._auth_http):
+            if http_client is not None:
+                http_client.close()
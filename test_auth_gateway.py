@@ -0,0 +1,185 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from auth_gateway import AuthGateway, AuthTimeout, Overloaded, RateLimited, TokenBuckets, credentials_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBuckets(unittest.TestCase):
+
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        buckets = TokenBuckets(rate=0.5, burst=2, clock=clock)
+        self.assertEqual(buckets.take('a'), 0)
+        self.assertEqual(buckets.take('a'), 0)
+        self.assertAlmostEqual(buckets.take('a'), 2.0)
+        self.assertEqual(buckets.take('b'), 0)
+        clock.now = 2.0
+        self.assertEqual(buckets.take('a'), 0)
+
+    def test_only_recent_keys_are_kept(self):
+        buckets = TokenBuckets(rate=1, burst=1, max_keys=2, clock=FakeClock())
+        for key in ('a', 'b', 'c'):
+            buckets.take(key)
+        self.assertEqual(list(buckets._buckets), ['b', 'c'])
+
+
+class TestAuthGateway(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.gateway = AuthGateway(max_concurrency=1, max_queue=1, timeout=5, ip_rate=1, ip_burst=3,
+                                   email_rate=1, email_burst=2, clock=self.clock)
+
+    def test_per_email_and_per_ip_limits(self):
+        self.gateway.admit('1.1.1.1', 'A@example.com')
+        self.gateway.admit('2.2.2.2', 'a@example.com')
+        with self.assertRaises(RateLimited) as raised:
+            self.gateway.admit('3.3.3.3', 'a@example.com')
+        self.assertEqual(raised.exception.retry_after, 1)
+        self.gateway.admit('1.1.1.1', 'b@example.com')
+        self.gateway.admit('1.1.1.1', 'c@example.com')
+        with self.assertRaises(RateLimited):
+            self.gateway.admit('1.1.1.1', 'd@example.com')
+        # The limited IP did not spend d@example.com's attempts
+        self.assertEqual(self.gateway.email_buckets.take('d@example.com'), 0)
+
+    def test_duplicate_calls_share_one_upstream_call(self):
+        release = threading.Event()
+        calls = []
+
+        def sign_in():
+            calls.append(1)
+            release.wait(5)
+            return 'session'
+
+        key = credentials_key('login', 'a@example.com', 'pw')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.gateway.call(key, sign_in)))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while self.gateway.stats()['collapsed'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['session'] * 3)
+        self.assertEqual(len(calls), 1)
+        # Finished calls are not reused
+        self.assertEqual(self.gateway.call(key, lambda: 'fresh'), 'fresh')
+
+    def test_errors_reach_every_caller(self):
+        def fail():
+            raise ValueError('Invalid login credentials')
+        with self.assertRaises(ValueError):
+            self.gateway.call('k', fail)
+
+    def test_overload_is_rejected_without_waiting(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=self.gateway.call, args=('k1', slow))
+        worker.start()
+        started.wait(5)
+        queued = threading.Thread(target=self.gateway.call, args=('k2', lambda: None))
+        queued.start()
+        deadline = time.monotonic() + 5
+        while self.gateway.stats()['in_flight'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with self.assertRaises(Overloaded):
+            self.gateway.call('k3', lambda: None)
+        release.set()
+        worker.join()
+        queued.join()
+        self.assertEqual(self.gateway.call('k3', lambda: 'ok'), 'ok')
+
+    def test_timeout(self):
+        gateway = AuthGateway(timeout=0.05)
+        release = threading.Event()
+        with self.assertRaises(AuthTimeout):
+            gateway.call('k', lambda: release.wait(5))
+        release.set()
+
+    def test_credentials_key_hides_password(self):
+        key = credentials_key('login', 'A@example.com', 'hunter2')
+        self.assertNotIn('hunter2', key)
+        self.assertEqual(key, credentials_key('login', 'a@example.com', 'hunter2'))
+        self.assertNotEqual(key, credentials_key('login', 'a@example.com', 'hunter3'))
+
+
+class TestLoginRateLimit(unittest.TestCase):
+
+    def test_login_returns_429_with_retry_after(self):
+        import budget_lunch
+        from fake_supabase import BENCH_EMAIL, BENCH_PASSWORD, FakeSupabase
+        from supabase_pool import SupabasePool
+        fake = FakeSupabase(rows=1).start()
+        pool = SupabasePool(fake.url, 'anon', http2=False)
+        gateway = AuthGateway(email_rate=0.01, email_burst=2)
+        try:
+            with patch.object(budget_lunch, 'supabase', pool), patch.object(budget_lunch, 'auth_gateway', gateway):
+                client = budget_lunch.app.test_client()
+                credentials = {'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}
+                self.assertEqual(client.post('/login', json=credentials).status_code, 200)
+                wrong = client.post('/login', json={'email': BENCH_EMAIL, 'password': 'nope'})
+                self.assertEqual(wrong.status_code, 401)
+                limited = client.post('/login', json=credentials)
+                self.assertEqual(limited.status_code, 429)
+                self.assertEqual(limited.headers['Retry-After'], '100')
+                self.assertFalse(limited.json['success'])
+        finally:
+            pool.close()
+            fake.stop()
+
+    def login_statuses(self, app, attempts):
+        import budget_lunch
+        from fake_supabase import BENCH_EMAIL, FakeSupabase
+        from supabase_pool import SupabasePool
+        fake = FakeSupabase(rows=1).start()
+        pool = SupabasePool(fake.url, 'anon', http2=False)
+        gateway = AuthGateway(ip_rate=0.01, ip_burst=1)
+        try:
+            with patch.object(budget_lunch, 'supabase', pool), patch.object(budget_lunch, 'auth_gateway', gateway):
+                client = app.test_client()
+                wrong = {'email': BENCH_EMAIL, 'password': 'nope'}
+                return [client.post('/login', json=wrong, headers={'X-Forwarded-For': ip},
+                                    environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code for ip in attempts]
+        finally:
+            pool.close()
+            fake.stop()
+
+    def test_forwarded_for_is_ignored_by_default(self):
+        import budget_lunch
+        # A client connecting directly cannot get a fresh bucket by forging the header
+        self.assertEqual(self.login_statuses(budget_lunch.app, ['203.0.113.5', '198.51.100.7']), [401, 429])
+
+    def test_clients_behind_the_proxy_get_their_own_bucket(self):
+        import budget_lunch
+        with patch.dict(os.environ, {'PROXY_HOPS': '1'}):
+            app = budget_lunch.create_app()
+        # Every request arrives from nginx on 127.0.0.1
+        statuses = self.login_statuses(app, ['203.0.113.5', '203.0.113.5', '198.51.100.7'])
+        self.assertEqual(statuses, [401, 429, 401])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import unittest
+
+from bulk_io import BulkValidationError, parse_items, parse_ids, csv_chunks
+
+
+class TestParseItems(unittest.TestCase):
+
+    def test_json_array(self):
+        items = parse_items(b'[{"name": " Soup ", "price": "4.5"}]', 'application/json')
+        self.assertEqual(items, [{'name': 'Soup', 'price': 4.5, 'imageurl': None}])
+
+    def test_json_items_object(self):
+        items = parse_items(json.dumps({'items': [{'name': 'Tea', 'price': 1}]}), 'application/json')
+        self.assertEqual(items[0]['price'], 1.0)
+
+    def test_csv(self):
+        body = 'name,price,imageurl\nSoup,4.5,\nPizza,6,http://img/p.png\n'.encode()
+        items = parse_items(body, 'text/csv; charset=utf-8')
+        self.assertEqual([item['name'] for item in items], ['Soup', 'Pizza'])
+        self.assertIsNone(items[0]['imageurl'])
+        self.assertEqual(items[1]['imageurl'], 'http://img/p.png')
+
+    def test_reports_every_bad_row(self):
+        body = 'name,price\nSoup,4.5\n,3\nTea,-1\nCake,abc\n'
+        with self.assertRaises(BulkValidationError) as ctx:
+            parse_items(body, 'text/csv')
+        self.assertEqual([(e['row'], e['field']) for e in ctx.exception.errors],
+                         [(2, 'name'), (3, 'price'), (4, 'price')])
+
+    def test_upsert_requires_unique_ids(self):
+        with self.assertRaises(BulkValidationError) as ctx:
+            parse_items('[{"name": "a", "price": 1}, {"id": 2, "name": "b", "price": 1},'
+                        ' {"id": 2, "name": "c", "price": 1}]', 'application/json', mode='upsert')
+        self.assertEqual([(e['row'], e['field']) for e in ctx.exception.errors], [(1, 'id'), (3, 'id')])
+
+    def test_insert_rejects_ids(self):
+        with self.assertRaises(BulkValidationError):
+            parse_items('[{"id": 1, "name": "a", "price": 1}]', 'application/json')
+
+    def test_rejects_bad_body(self):
+        for body in ('not json', '{"foo": 1}', '[]'):
+            with self.assertRaises(BulkValidationError):
+                parse_items(body, 'application/json')
+
+    def test_row_limit(self):
+        body = json.dumps([{'name': 'a', 'price': 1}] * 3)
+        with self.assertRaises(BulkValidationError):
+            parse_items(body, 'application/json', max_rows=2)
+
+
+class TestParseIds(unittest.TestCase):
+
+    def test_dedupes(self):
+        self.assertEqual(parse_ids({'ids': [3, 1, 3]}), [3, 1])
+
+    def test_rejects_non_integers(self):
+        for data in ({'ids': []}, {'ids': [1, 'x']}, {'ids': [True]}, None):
+            with self.assertRaises(BulkValidationError):
+                parse_ids(data)
+
+
+class TestCsvExport(unittest.TestCase):
+
+    rows = [{'id': 1, 'name': 'Soup, hot', 'price': 4.5, 'imageurl': None, 'extra': 'x'}]
+
+    def test_csv_round_trips_through_upsert(self):
+        body = ''.join(csv_chunks([self.rows]))
+        self.assertTrue(body.startswith('id,name,price,imageurl'))
+        items = parse_items(body, 'text/csv', mode='upsert')
+        self.assertEqual(items, [{'id': 1, 'name': 'Soup, hot', 'price': 4.5, 'imageurl': None}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import math
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from bulk_io import BulkValidationError, parse_items
+from cpu_jobs import JobPool, JobTimeout, JobType, QueueFull
+
+
+class TestJobPool(unittest.TestCase):
+
+    def setUp(self):
+        self.finished = []
+        self.depths = []
+        self.pool = JobPool(
+            {'slow': JobType(concurrency=1, max_queue=1, timeout=5), 'fast': JobType(concurrency=1, timeout=5)},
+            processes=2,
+            on_finish=lambda *event: self.finished.append(event),
+            on_depth=lambda *depth: self.depths.append(depth),
+        )
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def outcomes(self, job_type):
+        return [event[1] for event in self.finished if event[0] == job_type]
+
+    def test_runs_in_another_process(self):
+        self.assertNotEqual(self.pool.run('fast', os.getpid), os.getpid())
+        [(job_type, outcome, wait, run)] = self.finished
+        self.assertEqual((job_type, outcome), ('fast', 'ok'))
+        self.assertGreaterEqual(wait, 0)
+        self.assertGreater(run, 0)
+
+    def test_errors_come_back_intact(self):
+        with self.assertRaises(ValueError):
+            self.pool.run('fast', math.sqrt, -1)
+        with self.assertRaises(BulkValidationError) as caught:
+            self.pool.run('fast', parse_items, b'name,price\n,x\n', 'text/csv', 'insert')
+        self.assertEqual(len(caught.exception.errors), 2)
+        self.assertEqual(str(caught.exception), '2 invalid row(s)')
+        self.assertEqual(self.outcomes('fast'), ['error', 'error'])
+
+    def test_full_queue_rejects_only_its_type(self):
+        running = self.pool.submit('slow', time.sleep, 0.5)
+        queued = self.pool.submit('slow', time.sleep, 0)
+        with self.assertRaises(QueueFull):
+            self.pool.submit('slow', time.sleep, 0)
+        self.assertEqual(self.pool.run('fast', abs, -3), 3)
+        self.assertEqual(self.pool.stats()['types']['slow']['queued'], 1)
+        running.result(5)
+        queued.result(5)
+        self.assertIn(('slow', 1, 1), self.depths)
+        self.assertEqual(self.pool.stats()['types']['slow']['rejected'], 1)
+
+    def test_cancel_drops_a_queued_job(self):
+        running = self.pool.submit('slow', time.sleep, 0.3)
+        queued = self.pool.submit('slow', os.getpid)
+        self.assertTrue(queued.cancel())
+        self.assertTrue(queued.future.cancelled())
+        running.result(5)
+        stats = self.pool.stats()['types']['slow']
+        self.assertEqual((stats['queued'], stats['running'], stats['cancelled'], stats['ok']), (0, 0, 1, 1))
+
+    def test_timeout(self):
+        self.pool.types['slow'].timeout = 0.2
+        with self.assertRaises(JobTimeout):
+            self.pool.run('slow', time.sleep, 1)
+        self.assertEqual(self.outcomes('slow'), ['timeout'])
+        # The process keeps its slot until the abandoned job is done
+        self.assertEqual(self.pool.stats()['types']['slow']['running'], 1)
+
+    def test_inline_without_processes(self):
+        pool = JobPool({'fast': JobType()}, on_finish=lambda *event: self.finished.append(event))
+        self.assertEqual(pool.run('fast', os.getpid), os.getpid())
+        self.assertEqual(self.outcomes('fast'), ['ok'])
+
+
+class TestJobRoutes(unittest.TestCase):
+    """Bulk import through the job pool, against the local fake Supabase"""
+
+    def setUp(self):
+        import budget_lunch
+        from auth_gateway import AuthGateway
+        from fake_supabase import BENCH_EMAIL, BENCH_PASSWORD, FakeSupabase
+        from supabase_pool import SupabasePool
+        self.app_module = budget_lunch
+        self.fake = FakeSupabase(rows=3).start()
+        self.pool = SupabasePool(self.fake.url, 'anon', http2=False)
+        self.jobs = JobPool({'bulk_import': JobType(concurrency=1, max_queue=0, timeout=5)}, processes=1)
+        self.patches = [
+            patch.object(budget_lunch, 'supabase', self.pool),
+            patch.object(budget_lunch, 'auth_gateway', AuthGateway()),
+            patch.object(budget_lunch, 'job_pool', self.jobs),
+        ]
+        for p in self.patches:
+            p.start()
+        budget_lunch.menu_index.invalidate()
+        self.client = budget_lunch.app.test_client()
+        login = self.client.post('/login', json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+        self.headers = {'Authorization': f"Bearer {login.json['access_token']}", 'Content-Type': 'text/csv'}
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.jobs.shutdown()
+        self.app_module.menu_index.invalidate()
+        self.pool.close()
+        self.fake.stop()
+
+    def test_bulk_import_is_parsed_in_a_job(self):
+        response = self.client.post('/bulk/items', data=b'name,price\nbagel,1.25\n', headers=self.headers)
+        self.assertEqual(response.json['count'], 1)
+        response = self.client.post('/bulk/items', data=b'name,price\n,x\n', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json['errors']), 2)
+        self.assertEqual(self.jobs.stats()['types']['bulk_import']['ok'], 1)
+
+    def test_busy_pool_returns_503(self):
+        busy = self.jobs.submit('bulk_import', time.sleep, 0.5)
+        response = self.client.post('/bulk/items', data=b'name,price\nbagel,1.25\n', headers=self.headers)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        busy.result(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
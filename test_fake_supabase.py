@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+import budget_lunch
+from fake_supabase import BENCH_EMAIL, BENCH_PASSWORD, FakeSupabase
+from supabase_pool import SupabasePool
+
+
+class TestFakeSupabase(unittest.TestCase):
+    """The load-test stand-in answers the app's PostgREST and Auth calls like Supabase"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeSupabase(rows=50).start()
+        cls.pool = SupabasePool(cls.fake.url, 'anon', http2=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        cls.fake.stop()
+
+    def test_keyset_select(self):
+        table = self.pool.table('lunch_db')
+        first = table.select('id,price').order('price').order('id').limit(5).execute().data
+        self.assertEqual(len(first), 5)
+        self.assertEqual(first, sorted(first, key=lambda row: (row['price'], row['id'])))
+        last = first[-1]
+        after = (table.select('id,price').order('price').order('id').limit(5)
+                 .or_(f"price.gt.{last['price']},and(price.eq.{last['price']},id.gt.{last['id']})")
+                 .execute().data)
+        self.assertTrue(all((row['price'], row['id']) > (last['price'], last['id']) for row in after))
+
+    def test_filters(self):
+        table = self.pool.table('lunch_db')
+        rows = table.select('*').lte('price', 10).execute().data
+        self.assertTrue(rows and all(row['price'] <= 10 for row in rows))
+        self.assertEqual([row['id'] for row in table.select('id').in_('id', [3, 4]).order('id').execute().data], [3, 4])
+        self.assertTrue(all('#' in row['name'] for row in table.select('name').ilike('name', '*#1*').execute().data))
+
+    def test_writes(self):
+        table = self.pool.table('lunch_db')
+        row = table.insert({'name': 'test soup', 'price': 4.5, 'imageurl': None}).execute().data[0]
+        updated = table.update({'price': 5.0}).eq('id', row['id']).execute().data
+        self.assertEqual(updated[0]['price'], 5.0)
+        self.assertEqual(len(table.delete().eq('id', row['id']).execute().data), 1)
+        self.assertEqual(table.select('*').eq('id', row['id']).execute().data, [])
+
+    def test_auth(self):
+        session = self.pool.auth.sign_in_with_password({'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+        self.assertEqual(self.pool.auth.get_user(session.session.access_token).user.email, BENCH_EMAIL)
+        with self.assertRaises(Exception):
+            self.pool.auth.sign_in_with_password({'email': BENCH_EMAIL, 'password': 'wrong'})
+
+    def test_app_against_fake(self):
+        with patch.object(budget_lunch, 'supabase', self.pool):
+            budget_lunch.token_cache.clear()
+            budget_lunch.menu_index.invalidate()
+            client = budget_lunch.app.test_client()
+            login = client.post('/login', json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+            self.assertEqual(login.status_code, 200)
+            headers = {'Authorization': f"Bearer {login.json['access_token']}"}
+
+            self.assertTrue(client.get('/check-auth', headers=headers).json['authenticated'])
+            self.assertEqual(len(client.get('/list?limit=10', headers=headers).json['items']), 10)
+            self.assertEqual(client.get('/add/bench%20stew/0.25', headers=headers).status_code, 200)
+            cheapest = client.get('/search/0.25').json
+            self.assertIn('bench stew', [row['name'] for row in cheapest])
+            item_id = next(row['id'] for row in cheapest if row['name'] == 'bench stew')
+            self.assertEqual(client.delete(f'/delete/{item_id}', headers=headers).status_code, 200)
+            self.assertNotIn(item_id, [row['id'] for row in client.get('/search/0.25').json])
+        budget_lunch.menu_index.invalidate()
+
+
+if __name__ == '__main__':
+    unittest.main()
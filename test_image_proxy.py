@@ -0,0 +1,254 @@
+import io
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import httpx
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from image_proxy import ImageFetchError, ImageProxy, ThumbnailCache
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def make_jpeg(width, height):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 80, 40)).save(output, 'JPEG')
+    return output.getvalue()
+
+
+class OriginStub:
+    """Local HTTP server standing in for the third-party image hosts"""
+
+    def __init__(self):
+        self.files = {}
+        self.delay = 0.0
+        self.requests = 0
+        self.hosts = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                stub.hosts.append(self.headers['Host'])
+                time.sleep(stub.delay)
+                if self.path not in stub.files:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body, content_type = stub.files[self.path]
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestThumbnailCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ThumbnailCache(os.path.join(self.directory, 'thumbs'), max_bytes=250)
+        for age, key in enumerate(('a', 'b')):
+            cache.put(key, b'x' * 100, 'image/jpeg')
+            os.utime(os.path.join(cache.directory, key + '.jpg'), (1000 + age, 1000 + age))
+        # Reading 'a' makes 'b' the least recently used
+        self.assertEqual(cache.get('a'), (b'x' * 100, 'image/jpeg'))
+        cache.put('c', b'y' * 100, 'image/png')
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), (b'y' * 100, 'image/png'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_nothing_is_written_until_a_put(self):
+        ThumbnailCache(os.path.join(self.directory, 'thumbs')).get('missing')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'thumbs')))
+
+
+class TestImageProxy(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.origin = OriginStub()
+        self.proxy = ImageProxy(ThumbnailCache(self.directory), allow_private=True)
+
+    def tearDown(self):
+        self.origin.stop()
+        shutil.rmtree(self.directory)
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_thumbnail_is_resized_and_cached(self):
+        self.origin.files['/pizza.jpg'] = (make_jpeg(1080, 720), 'image/jpeg')
+        data, content_type, etag = self.proxy.thumbnail(self.origin.url('/pizza.jpg'), 320)
+        self.assertEqual(content_type, 'image/jpeg')
+        self.assertEqual(Image.open(io.BytesIO(data)).size, (320, 213))
+        self.assertEqual(self.proxy.thumbnail(self.origin.url('/pizza.jpg'), 320), (data, content_type, etag))
+        self.assertEqual(self.origin.requests, 1)
+        # Another width is another thumbnail
+        self.proxy.thumbnail(self.origin.url('/pizza.jpg'), 160)
+        self.assertEqual(self.origin.requests, 2)
+
+    def test_concurrent_requests_share_one_fetch(self):
+        self.origin.files['/soup.png'] = (b'\x89PNG fake', 'image/png')
+        self.origin.delay = 0.2
+        with patch.dict(sys.modules, {'PIL': None}):
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(
+                self.proxy.thumbnail(self.origin.url('/soup.png'), 320))) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(self.origin.requests, 1)
+        self.assertEqual(len(results), 5)
+        # Without Pillow the original is kept
+        self.assertEqual({result[:2] for result in results}, {(b'\x89PNG fake', 'image/png')})
+
+    def test_failures_are_remembered(self):
+        self.origin.files['/page.html'] = (b'<html>', 'text/html')
+        for _ in range(2):
+            with self.assertRaises(ImageFetchError):
+                self.proxy.thumbnail(self.origin.url('/page.html'), 320)
+        self.assertEqual(self.origin.requests, 1)
+
+    def test_oversized_source_is_rejected(self):
+        self.origin.files['/huge.jpg'] = (b'x' * 2048, 'image/jpeg')
+        proxy = ImageProxy(ThumbnailCache(self.directory), allow_private=True, max_source_bytes=1024)
+        with self.assertRaises(ImageFetchError):
+            proxy.thumbnail(self.origin.url('/huge.jpg'), 320)
+
+    def resolver(self, *answers):
+        """getaddrinfo stand-in giving each answer in turn (the last one after that)"""
+        answers = list(answers)
+        self.lookups = []
+
+        def resolve(host, port, proto=0):
+            self.lookups.append(host)
+            address = answers.pop(0) if len(answers) > 1 else answers[0]
+            return [(socket.AF_INET, socket.SOCK_STREAM, proto, '', (address, port))]
+        return resolve
+
+    def test_connects_to_the_checked_address(self):
+        self.origin.files['/soup.png'] = (b'\x89PNG fake', 'image/png')
+        port = self.origin.server.server_address[1]
+        proxy = ImageProxy(ThumbnailCache(self.directory), allow_private=True, resolve=self.resolver('127.0.0.1'))
+        with patch.dict(sys.modules, {'PIL': None}):
+            data, _, _ = proxy.thumbnail(f'http://images.test:{port}/soup.png', 320)
+        self.assertEqual(data, b'\x89PNG fake')
+        self.assertEqual(self.lookups, ['images.test'])
+        self.assertEqual(self.origin.hosts, [f'images.test:{port}'])
+
+    def test_rebinding_and_redirects_are_checked(self):
+        # Public on the first lookup, internal on the next
+        proxy = ImageProxy(ThumbnailCache(self.directory), resolve=self.resolver('93.184.216.34', '127.0.0.1'))
+        sent = []
+
+        def handle_request(transport, request):
+            sent.append(request)
+            return httpx.Response(302, headers={'Location': '/next.jpg'}, request=request)
+
+        with patch.object(httpx.HTTPTransport, 'handle_request', handle_request):
+            with self.assertRaisesRegex(ImageFetchError, 'non-public'):
+                proxy.thumbnail('https://images.test/photo.jpg', 320)
+        [request] = sent
+        self.assertEqual(request.url.host, '93.184.216.34')
+        self.assertEqual(request.headers['Host'], 'images.test')
+        self.assertEqual(request.extensions['sni_hostname'], 'images.test')
+        self.assertEqual(self.lookups, ['images.test', 'images.test'])
+
+    def test_private_addresses_are_refused(self):
+        proxy = ImageProxy(ThumbnailCache(self.directory))
+        for url in (self.origin.url('/pizza.jpg'), 'file:///etc/passwd'):
+            with self.assertRaises(ImageFetchError):
+                proxy.thumbnail(url, 320)
+        self.assertEqual(self.origin.requests, 0)
+
+
+@unittest.skipIf(Image is None, 'Pillow is not installed')
+class TestImageRoute(unittest.TestCase):
+    """/img/<item_id> against the local fake Supabase and origin stub"""
+
+    def setUp(self):
+        import budget_lunch
+        from fake_supabase import FakeSupabase
+        from supabase_pool import SupabasePool
+        self.app_module = budget_lunch
+        self.directory = tempfile.mkdtemp()
+        self.origin = OriginStub()
+        self.origin.files['/pizza.jpg'] = (make_jpeg(1080, 1080), 'image/jpeg')
+        self.fake = FakeSupabase(rows=3).start()
+        self.fake.update([('id', 'eq.1')], {'imageurl': self.origin.url('/pizza.jpg')})
+        self.fake.update([('id', 'eq.2')], {'imageurl': None})
+        self.pool = SupabasePool(self.fake.url, 'anon', http2=False)
+        self.patches = [
+            patch.object(budget_lunch, 'supabase', self.pool),
+            patch.object(budget_lunch, 'image_proxy', ImageProxy(ThumbnailCache(self.directory), allow_private=True)),
+        ]
+        for p in self.patches:
+            p.start()
+        budget_lunch.menu_index.invalidate()
+        self.client = budget_lunch.app.test_client()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.app_module.menu_index.invalidate()
+        self.pool.close()
+        self.fake.stop()
+        self.origin.stop()
+        shutil.rmtree(self.directory)
+
+    def test_thumbnail_with_cache_headers(self):
+        response = self.client.get('/img/1?w=100')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, 'image/jpeg')
+        # Rounded up to the 160px size
+        self.assertEqual(Image.open(io.BytesIO(response.data)).size, (160, 160))
+        self.assertIn('max-age=', response.headers['Cache-Control'])
+        revalidated = self.client.get('/img/1?w=100', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.origin.requests, 1)
+
+    def test_missing_image(self):
+        self.assertEqual(self.client.get('/img/2').status_code, 404)
+        self.assertEqual(self.client.get('/img/999').status_code, 404)
+
+    def test_unreachable_origin(self):
+        self.fake.update([('id', 'eq.3')], {'imageurl': self.origin.url('/gone.jpg')})
+        self.app_module.menu_index.invalidate()
+        self.assertEqual(self.client.get('/img/3').status_code, 502)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import time
+
+import jwt
+
+from jwt_auth import LocalJWTVerifier, TokenCache, VerifiedUser, token_expiry
+
+SUPABASE_URL = "https://example.supabase.co"
+SECRET = "test-jwt-secret-with-enough-length-for-hs256"
+
+
+def make_token(**overrides):
+    claims = {
+        "sub": "user-1",
+        "email": "user@example.com",
+        "role": "authenticated",
+        "aud": "authenticated",
+        "iss": f"{SUPABASE_URL}/auth/v1",
+        "exp": int(time.time()) + 3600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, SECRET, algorithm="HS256")
+
+
+class TestLocalJWTVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = LocalJWTVerifier(SUPABASE_URL, "anon", jwt_secret=SECRET, jwks_client=object())
+
+    def test_valid_token(self):
+        user = self.verifier.verify(make_token())
+        self.assertEqual(user.id, "user-1")
+        self.assertEqual(user.email, "user@example.com")
+
+    def test_expired_token(self):
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            self.verifier.verify(make_token(exp=int(time.time()) - 3600))
+
+    def test_wrong_audience(self):
+        with self.assertRaises(jwt.InvalidAudienceError):
+            self.verifier.verify(make_token(aud="anon"))
+
+    def test_wrong_issuer(self):
+        with self.assertRaises(jwt.InvalidIssuerError):
+            self.verifier.verify(make_token(iss="https://evil.example.com/auth/v1"))
+
+    def test_bad_signature(self):
+        token = jwt.encode({"sub": "x", "aud": "authenticated", "exp": int(time.time()) + 60},
+                           "another-secret-that-is-long-enough-too", algorithm="HS256")
+        with self.assertRaises(jwt.InvalidSignatureError):
+            self.verifier.verify(token)
+
+    def test_hs256_without_secret(self):
+        verifier = LocalJWTVerifier(SUPABASE_URL, "anon", jwks_client=object())
+        with self.assertRaises(jwt.InvalidTokenError):
+            verifier.verify(make_token())
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def test_put_and_get(self):
+        cache = TokenCache(ttl=30)
+        user = VerifiedUser({"sub": "user-1"})
+        cache.put("token", user)
+        self.assertIs(cache.get("token"), user)
+        self.assertIsNone(cache.get("other"))
+
+    def test_never_outlives_token(self):
+        cache = TokenCache(ttl=30)
+        cache.put("token", VerifiedUser({"sub": "user-1"}), token_exp=time.time() - 1)
+        self.assertIsNone(cache.get("token"))
+
+    def test_discard(self):
+        cache = TokenCache(ttl=30)
+        cache.put("token", VerifiedUser({"sub": "user-1"}))
+        cache.discard("token")
+        self.assertIsNone(cache.get("token"))
+
+    def test_bounded(self):
+        cache = TokenCache(ttl=30, max_entries=2)
+        for i in range(5):
+            cache.put(f"token-{i}", VerifiedUser({"sub": str(i)}))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get("token-4"))
+
+    def test_token_expiry(self):
+        exp = int(time.time()) + 100
+        self.assertEqual(token_expiry(make_token(exp=exp)), exp)
+        self.assertIsNone(token_expiry("not-a-token"))
+
+
+if __name__ == "__main__":
+    unittest.main()
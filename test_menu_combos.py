@@ -0,0 +1,144 @@
+import itertools
+import os
+import random
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from menu_combos import ComboError, ComboRequest, ComboTable, ComboTableCache
+
+
+def brute_force(rows, budget, max_items):
+    """(total, item count) of the best combo, by enumeration"""
+    best = None
+    for count in range(1, max_items + 1):
+        for combo in itertools.combinations(rows, count):
+            total = sum(round(row['price'] * 100) for row in combo)
+            if total <= budget and (best is None or total > best[0]):
+                best = (total, count)
+    return best
+
+
+class TestComboTable(unittest.TestCase):
+
+    def test_matches_enumeration(self):
+        rng = random.Random(7)
+        for _ in range(100):
+            rows = [{'id': i, 'price': round(rng.uniform(0.5, 12), 2)} for i in range(rng.randint(0, 10))]
+            table = ComboTable(rows, 3000, max_items=3)
+            for budget in (0, 99, 500, 1234, 3000):
+                for max_items in (1, 2, 3):
+                    expected = brute_force(rows, budget, max_items)
+                    combos = table.best(budget, max_items)
+                    if expected is None:
+                        self.assertEqual(combos, [])
+                        continue
+                    total, items = combos[0]
+                    self.assertEqual((total, len(items)), expected)
+                    self.assertEqual(sum(round(row['price'] * 100) for row in items), total)
+                    self.assertEqual(len({row['id'] for row in items}), len(items))
+
+    def test_pizza_and_soda(self):
+        rows = [{'id': 1, 'name': 'soda', 'price': 1.99}, {'id': 2, 'name': 'pizza', 'price': 7.99},
+                {'id': 3, 'name': 'salad', 'price': 8.5}]
+        [(total, items)] = ComboTable(rows, 5000).best(1000)
+        self.assertEqual(total, 998)
+        self.assertEqual([row['name'] for row in items], ['soda', 'pizza'])
+
+    def test_prices_are_exact_cents(self):
+        # 0.1 + 0.2 is not 0.3 in floating point, but is 30 cents
+        rows = [{'id': 1, 'price': 0.1}, {'id': 2, 'price': 0.2}]
+        self.assertEqual(ComboTable(rows, 100).best(30)[0][0], 30)
+
+    def test_alternatives_have_distinct_totals(self):
+        rows = [{'id': i, 'price': price} for i, price in enumerate((1.0, 2.0, 4.0))]
+        combos = ComboTable(rows, 1000).best(600, limit=3)
+        self.assertEqual([total for total, _ in combos], [600, 500, 400])
+        # The fewest items for a total: 4.00 alone rather than never
+        self.assertEqual(len(combos[2][1]), 1)
+
+    def test_free_expensive_and_unpriced_items_are_skipped(self):
+        rows = [{'id': 1, 'price': 0}, {'id': 2, 'price': 99}, {'id': 3, 'price': None}, {'id': 4, 'price': 3}]
+        self.assertEqual(ComboTable(rows, 1000).best(1000), [(300, [rows[3]])])
+
+
+class TestComboTableCache(unittest.TestCase):
+
+    def test_rebuilt_only_when_the_version_moves(self):
+        cache = ComboTableCache(1000, 2)
+        rows = [{'id': 1, 'price': 2.0}]
+        first = cache.get(1, lambda: rows)
+        self.assertIs(cache.get(1, lambda: rows), first)
+        self.assertIsNot(cache.get(2, lambda: rows), first)
+        self.assertEqual(cache.builds, 2)
+
+    def test_keeps_recent_versions(self):
+        cache = ComboTableCache(1000, 2, max_tables=2)
+        rows = [{'id': 1, 'price': 2.0}]
+        a = cache.get(('a', 1), lambda: rows)
+        cache.get(('b', 1), lambda: rows)
+        self.assertIs(cache.get(('a', 1), lambda: rows), a)
+        cache.get(('c', 1), lambda: rows)
+        # ('b', 1) was the least recently used
+        self.assertIs(cache.get(('a', 1), lambda: rows), a)
+        cache.get(('b', 1), lambda: rows)
+        self.assertEqual(cache.builds, 4)
+
+
+class TestComboRequest(unittest.TestCase):
+
+    def test_defaults_and_limits(self):
+        combo_request = ComboRequest.from_args('10', {}, 5000, 3)
+        self.assertEqual((combo_request.budget, combo_request.max_items, combo_request.limit), (1000, 3, 1))
+        for price, args in (('abc', {}), ('-1', {}), ('nan', {}), ('50.01', {}), ('10', {'items': '4'}),
+                            ('10', {'limit': '0'}), ('10', {'items': 'two'})):
+            with self.assertRaises(ComboError):
+                ComboRequest.from_args(price, args, 5000, 3)
+
+
+class TestComboRoute(unittest.TestCase):
+    """/combo/<price> against the local fake Supabase"""
+
+    @classmethod
+    def setUpClass(cls):
+        import budget_lunch
+        from fake_supabase import FakeSupabase
+        from supabase_pool import SupabasePool
+        cls.app_module = budget_lunch
+        cls.fake = FakeSupabase(rows=50).start()
+        cls.pool = SupabasePool(cls.fake.url, 'anon', http2=False)
+        cls.patch = patch.object(budget_lunch, 'supabase', cls.pool)
+        cls.patch.start()
+        budget_lunch.menu_index.invalidate()
+        cls.client = budget_lunch.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.patch.stop()
+        cls.app_module.menu_index.invalidate()
+        cls.pool.close()
+        cls.fake.stop()
+
+    def test_best_combo(self):
+        response = self.client.get('/combo/10?items=2&limit=2')
+        self.assertEqual(response.status_code, 200)
+        data = response.json
+        self.assertEqual(data['budget'], 10.0)
+        self.assertEqual(len(data['combos']), 2)
+        rows = self.fake.select([])
+        expected = brute_force(rows, 1000, 2)
+        best = data['combos'][0]
+        self.assertEqual(round(best['total'] * 100), expected[0])
+        self.assertAlmostEqual(best['total'] + best['change'], 10.0)
+        self.assertLessEqual(len(best['items']), 2)
+
+    def test_bad_budget(self):
+        response = self.client.get('/combo/1000')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most', response.json['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
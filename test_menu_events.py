@@ -0,0 +1,160 @@
+import json
+import os
+import runpy
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from menu_events import MenuEventLog, event_stream, sse_message
+
+
+def parse(messages):
+    """(event, id, data) for each SSE message; comments become ('comment', None, None)"""
+    parsed = []
+    for message in messages:
+        if message.startswith(':'):
+            parsed.append(("comment", None, None))
+            continue
+        fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+        parsed.append((fields["event"], fields.get("id"), json.loads(fields["data"])))
+    return parsed
+
+
+class TestMenuEventLog(unittest.TestCase):
+
+    def setUp(self):
+        self.log = MenuEventLog(capacity=3, max_items=2)
+
+    def test_sse_message_format(self):
+        self.assertEqual(sse_message("delete", {"ids": [1]}, "e-4"), 'id: e-4\nevent: delete\ndata: {"ids":[1]}\n\n')
+
+    def test_since_returns_newer_events(self):
+        self.log.publish("insert", [{"id": 1}])
+        self.log.publish("delete", [2])
+        self.assertEqual(self.log.since(0), [
+            {"type": "insert", "version": 1, "items": [{"id": 1}]},
+            {"type": "delete", "version": 2, "ids": [2]},
+        ])
+        self.assertEqual(self.log.since(2), [])
+
+    def test_empty_payload_is_not_published(self):
+        self.log.publish("update", [])
+        self.assertEqual(self.log.version, 0)
+
+    def test_since_is_none_once_events_fall_out(self):
+        for item_id in range(5):
+            self.log.publish("delete", [item_id])
+        self.assertIsNone(self.log.since(1))
+        self.assertEqual(len(self.log.since(2)), 3)
+        self.assertIsNone(self.log.since(9))
+
+    def test_large_change_becomes_resync(self):
+        self.log.publish("insert", [{"id": 1}, {"id": 2}, {"id": 3}])
+        self.assertEqual(self.log.since(0), [{"type": "resync", "version": 1}])
+
+    def test_event_ids_are_tied_to_this_log(self):
+        event_id = self.log.event_id(7)
+        self.assertEqual(self.log.parse_event_id(event_id), 7)
+        self.assertIsNone(MenuEventLog().parse_event_id(event_id))
+        self.assertIsNone(self.log.parse_event_id("garbage"))
+        self.assertIsNone(self.log.parse_event_id(None))
+
+
+class TestEventStream(unittest.TestCase):
+
+    def setUp(self):
+        self.log = MenuEventLog(capacity=3)
+
+    def stream(self, last_event_id=None, **kwargs):
+        kwargs.setdefault("heartbeat", 0.01)
+        kwargs.setdefault("max_duration", 0.03)
+        return parse(event_stream(self.log, last_event_id, **kwargs))
+
+    def test_new_client_gets_ready(self):
+        self.log.publish("delete", [1])
+        messages = self.stream()
+        self.assertEqual(messages[0], ("ready", self.log.event_id(1), {"version": 1}))
+        self.assertTrue(all(message[0] == "comment" for message in messages[1:]))
+
+    def test_reconnect_replays_missed_events(self):
+        self.log.publish("delete", [1])
+        last_id = self.log.event_id(1)
+        self.log.publish("insert", [{"id": 2}])
+        messages = self.stream(last_id)
+        self.assertEqual(messages[0], ("insert", self.log.event_id(2), {"type": "insert", "version": 2, "items": [{"id": 2}]}))
+
+    def test_unknown_or_old_ids_resync(self):
+        for item_id in range(5):
+            self.log.publish("delete", [item_id])
+        for last_id in (self.log.event_id(0), "other-3"):
+            self.assertEqual(self.stream(last_id)[0], ("resync", self.log.event_id(5), {"version": 5}))
+
+    def test_idle_heartbeat_calls_on_idle(self):
+        calls = []
+        messages = self.stream(on_idle=lambda: calls.append(1))
+        self.assertIn(("comment", None, None), messages)
+        self.assertEqual(len(calls), messages.count(("comment", None, None)))
+
+    def test_live_events_are_streamed(self):
+        stream = event_stream(self.log, heartbeat=0.01, max_duration=1.0)
+        next(stream)
+        self.log.publish("update", [{"id": 9, "price": 1.0}])
+        self.assertEqual(parse([next(stream)])[0][0], "update")
+        stream.close()
+
+
+class TestEventRoutes(unittest.TestCase):
+    """/events/menu against the local fake Supabase"""
+
+    def setUp(self):
+        import budget_lunch
+        from fake_supabase import FakeSupabase
+        from supabase_pool import SupabasePool
+        self.app_module = budget_lunch
+        self.fake = FakeSupabase(rows=5).start()
+        self.pool = SupabasePool(self.fake.url, 'anon', http2=False)
+        self.patch = patch.object(budget_lunch, 'supabase', self.pool)
+        self.patch.start()
+        budget_lunch.menu_index.invalidate()
+        self.client = budget_lunch.app.test_client()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.app_module.menu_index.invalidate()
+        self.pool.close()
+        self.fake.stop()
+
+    def test_default_cap_leaves_threads_for_requests(self):
+        # The config sets defaults in os.environ
+        with patch.dict(os.environ):
+            config = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py'))
+        self.assertLessEqual(self.app_module.MENU_EVENTS_MAX_CLIENTS, config['threads'] // 4)
+        self.assertLessEqual(self.app_module.MENU_EVENTS_MAX_SECONDS, 60)
+
+    def test_requests_are_served_while_streams_are_open(self):
+        import httpx
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, self.app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        streams = []
+        try:
+            with httpx.Client(base_url=f'http://127.0.0.1:{server.server_port}', timeout=5) as client:
+                for _ in range(self.app_module.MENU_EVENTS_MAX_CLIENTS):
+                    stream = client.send(client.build_request('GET', '/events/menu'), stream=True)
+                    streams.append(stream)
+                    self.assertEqual(stream.status_code, 200)
+                    self.assertIn('event: ready', next(stream.iter_text()))
+                refused = client.get('/events/menu')
+                self.assertEqual(refused.status_code, 503)
+                self.assertEqual(refused.headers['Retry-After'], '30')
+                self.assertEqual(client.get('/search/100').status_code, 200)
+        finally:
+            for stream in streams:
+                stream.close()
+            server.shutdown()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import time
+import unittest
+
+from menu_feed import LocalChangePublisher, MenuChangeFeed
+from menu_index import MenuIndex
+
+
+ROWS = [
+    {"id": 1, "name": "pizza", "price": 6.99, "imageurl": None},
+    {"id": 2, "name": "soda", "price": 1.99, "imageurl": None},
+]
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class TestMenuChangeFeed(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = 0
+        self.index = MenuIndex(self.load, max_staleness=30)
+        self.index.reload()
+        self.publisher = LocalChangePublisher()
+        self.feed = MenuChangeFeed(self.index, self.publisher.subscribe, live_staleness=300,
+                                   retry_delay=0.01, max_retry_delay=0.05)
+
+    def tearDown(self):
+        self.feed.stop()
+
+    def load(self):
+        self.loads += 1
+        return [dict(row) for row in ROWS]
+
+    def names(self):
+        return [row["name"] for row in self.index.search(100)]
+
+    def test_apply_events(self):
+        self.feed.apply({"type": "INSERT", "record": {"id": 3, "name": "tea", "price": 0.99}})
+        self.feed.apply({"type": "UPDATE", "record": {"id": 1, "name": "pizza", "price": 0.5}})
+        self.feed.apply({"type": "DELETE", "old_record": {"id": 2}})
+        self.assertEqual(self.names(), ["pizza", "tea"])
+        self.assertEqual(self.feed.events, 3)
+
+    def test_unknown_events_are_ignored(self):
+        version = self.index.version
+        self.feed.apply({"type": "TRUNCATE"})
+        self.assertEqual((self.index.version, self.feed.events), (version, 0))
+
+    def test_live_feed_patches_index(self):
+        self.feed.start()
+        wait_until(lambda: self.feed.connected)
+        self.assertEqual(self.index.max_staleness, 300)
+        # Subscribing invalidates the index, so the next read resyncs
+        self.names()
+        self.assertEqual(self.loads, 2)
+
+        self.publisher.publish("INSERT", record={"id": 3, "name": "tea", "price": 0.99})
+        self.publisher.publish("DELETE", old_record={"id": 1})
+        wait_until(lambda: self.feed.events == 2)
+        self.assertEqual(self.names(), ["tea", "soda"])
+        self.assertEqual(self.loads, 2)
+
+    def test_falls_back_to_polling_and_resubscribes(self):
+        self.feed.start()
+        wait_until(lambda: self.feed.connected)
+        self.names()
+
+        self.publisher.disconnect()
+        wait_until(lambda: self.feed.connects == 2)
+        self.assertTrue(self.feed.connected)
+        self.names()
+        self.assertEqual(self.loads, 3)
+
+        self.feed.stop()
+        self.assertFalse(self.feed.connected)
+        self.assertEqual(self.index.max_staleness, 30)
+
+    def test_start_is_idempotent(self):
+        self.feed.start()
+        self.feed.start()
+        wait_until(lambda: self.feed.connected)
+        self.assertEqual(self.publisher.subscribers(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
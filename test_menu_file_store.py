@@ -0,0 +1,134 @@
+import fcntl
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from menu_file_store import FileMenuStore, LOG_NAME, INDEX_NAME
+from menu_store import ListMenuStore
+
+ITEMS = [
+    {"name": "pizza", "price": 6.99, "imageurl": "p.jpg"},
+    {"name": "salad", "price": 5.99, "imageurl": None},
+    {"name": "soda", "price": 1.99, "imageurl": "d.jpg"},
+    {"name": "café", "price": 2.99, "imageurl": ""},
+]
+
+
+class TestFileMenuStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        shutil.rmtree(self.directory)
+
+    def open(self, **kwargs):
+        kwargs.setdefault('fsync', False)
+        store = FileMenuStore(self.directory, **kwargs)
+        self.stores.append(store)
+        return store
+
+    def test_seed_and_list_interface(self):
+        store = self.open(seed=ITEMS)
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store[-1], ITEMS[-1])
+        self.assertEqual(store[1:3], ITEMS[1:3])
+        self.assertEqual(store, ITEMS)
+        # A second open finds the data and does not seed again
+        self.assertEqual(len(self.open(seed=ITEMS)), 4)
+
+    def test_search_matches_linear_scan(self):
+        store = self.open(seed=ITEMS, rebuild_min=2)
+        store.append({"name": "tea", "price": 1.0, "imageurl": None})
+        reference = ListMenuStore(ITEMS + [store[-1]])
+        for price in (0, 1.0, 2.5, 5.99, 100, float('nan')):
+            self.assertEqual(store.search(price), reference.search(price), price)
+
+    def test_survives_reopen(self):
+        store = self.open(rebuild_min=1)
+        store.extend(ITEMS)
+        store.append({"name": "tea", "price": 1.0, "imageurl": None})
+        store.close()
+        self.stores.remove(store)
+        reopened = self.open()
+        self.assertEqual(reopened._tail, [])
+        self.assertEqual(len(reopened), 5)
+        self.assertEqual(reopened.search(2)[0]["name"], "soda")
+
+    def test_index_is_folded_and_shared(self):
+        writer = self.open(rebuild_min=3)
+        reader = self.open(rebuild_min=3)
+        writer.extend(ITEMS[:2])
+        self.assertEqual(writer._count, 0)
+        writer.extend(ITEMS[2:])
+        self.assertEqual(writer._count, 4)
+        self.assertEqual(writer._tail, [])
+        # Another process sees both the new index and later appends
+        writer.append({"name": "tea", "price": 1.0, "imageurl": None})
+        self.assertEqual([item["name"] for item in reader.search(2)], ["soda", "tea"])
+        self.assertEqual(reader._count, 4)
+
+    def test_missing_or_damaged_index_is_rebuilt_from_log(self):
+        store = self.open(rebuild_min=1)
+        store.extend(ITEMS)
+        store.close()
+        self.stores.remove(store)
+        with open(os.path.join(self.directory, INDEX_NAME), 'r+b') as f:
+            f.write(b'junk')
+        self.assertEqual(self.open().search(3), ListMenuStore(ITEMS).search(3))
+        os.remove(os.path.join(self.directory, INDEX_NAME))
+        self.assertEqual(self.open(), ITEMS)
+
+    def test_index_rebuilt_while_waiting_for_the_lock_is_used(self):
+        writer = self.open(seed=ITEMS, rebuild_min=1)
+        reader = self.open()
+        index_path = os.path.join(self.directory, INDEX_NAME)
+        with open(index_path + '.junk', 'wb') as f:
+            f.write(b'junk')
+        os.replace(index_path + '.junk', index_path)
+        flock = fcntl.flock
+
+        def rebuild_first(fd, operation):
+            # The writer gets in between the reader's shared and exclusive locks
+            if fd == reader._log_fd and operation == fcntl.LOCK_EX:
+                with writer._file_lock(fcntl.LOCK_EX):
+                    writer._rebuild_index(replay=True)
+            flock(fd, operation)
+
+        with patch('menu_file_store.fcntl.flock', rebuild_first), \
+                patch.object(reader, '_rebuild_index') as rebuild:
+            self.assertEqual(reader.search(3), ListMenuStore(ITEMS).search(3))
+        rebuild.assert_not_called()
+
+    def test_torn_record_is_truncated(self):
+        store = self.open()
+        store.extend(ITEMS)
+        store.close()
+        self.stores.remove(store)
+        log_path = os.path.join(self.directory, LOG_NAME)
+        good_size = os.path.getsize(log_path)
+        with open(log_path, 'ab') as f:
+            f.write(b'\x01\x02\x03partial record')
+        store = self.open()
+        self.assertEqual(store, ITEMS)
+        self.assertEqual(os.path.getsize(log_path), good_size)
+        store.append({"name": "tea", "price": 1.0, "imageurl": None})
+        self.assertEqual(store[-1]["name"], "tea")
+
+    def test_clear_is_seen_by_other_instances(self):
+        first = self.open(seed=ITEMS)
+        second = self.open()
+        self.assertEqual(len(second), 4)
+        first.clear()
+        self.assertEqual(len(second), 0)
+        second.extend(ITEMS[:1])
+        self.assertEqual(first.search(10), ITEMS[:1])
+
+
+if __name__ == '__main__':
+    unittest.main()
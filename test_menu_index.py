@@ -0,0 +1,136 @@
+import unittest
+
+from menu_index import MenuIndex
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMenuIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [
+            {"id": 1, "name": "pizza", "price": 6.99},
+            {"id": 2, "name": "salad", "price": 5.99},
+            {"id": 3, "name": "soda", "price": 1.99},
+            {"id": 4, "name": "coffee", "price": 2.99},
+        ]
+        self.loads = 0
+        self.clock = FakeClock()
+        self.index = MenuIndex(self.load, max_staleness=30, clock=self.clock)
+
+    def load(self):
+        self.loads += 1
+        return [dict(row) for row in self.rows]
+
+    def names(self, rows):
+        return [row["name"] for row in rows]
+
+    def test_search_sorted_by_price(self):
+        self.assertEqual(self.names(self.index.search(10)), ["soda", "coffee", "salad", "pizza"])
+        self.assertEqual(self.names(self.index.search(2.99)), ["soda", "coffee"])
+        self.assertEqual(self.index.search(1), [])
+
+    def test_loads_once_within_staleness(self):
+        self.index.search(10)
+        self.index.search(5)
+        self.clock.now = 29
+        self.index.search(3)
+        self.assertEqual(self.loads, 1)
+
+    def test_reloads_after_staleness(self):
+        self.index.search(10)
+        self.rows.append({"id": 5, "name": "burger", "price": 4.5})
+        self.clock.now = 31
+        self.assertIn("burger", self.names(self.index.search(10)))
+        self.assertEqual(self.loads, 2)
+
+    def test_apply_upsert_inserts_and_replaces(self):
+        self.index.search(10)
+        self.index.apply_upsert([{"id": 5, "name": "burger", "price": 4.5}])
+        self.assertEqual(self.names(self.index.search(6)), ["soda", "coffee", "burger", "salad"])
+        self.index.apply_upsert([{"id": 1, "name": "pizza", "price": 0.99}])
+        self.assertEqual(self.names(self.index.search(1)), ["pizza"])
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.loads, 1)
+
+    def test_apply_delete(self):
+        self.index.search(10)
+        self.index.apply_delete([3])
+        self.assertEqual(self.names(self.index.search(10)), ["coffee", "salad", "pizza"])
+
+    def test_get_by_id(self):
+        self.assertEqual(self.index.get(4)["name"], "coffee")
+        self.index.apply_upsert([{"id": 4, "name": "coffee", "price": 0.99}])
+        self.assertEqual(self.index.get(4)["price"], 0.99)
+        self.assertIsNone(self.index.get(99))
+
+    def test_invalidate_forces_reload(self):
+        self.index.search(10)
+        self.index.invalidate()
+        self.index.search(10)
+        self.assertEqual(self.loads, 2)
+
+    def test_version_changes_only_with_data(self):
+        self.index.search(10)
+        version = self.index.version
+        self.clock.now = 31
+        self.index.search(10)
+        self.assertEqual(self.index.version, version)
+        self.index.apply_delete([1])
+        self.assertGreater(self.index.version, version)
+
+    def test_echoed_upsert_keeps_version(self):
+        self.index.search(10)
+        version = self.index.version
+        self.index.apply_upsert([dict(self.rows[0])])
+        self.assertEqual(self.index.version, version)
+
+    def test_listeners_get_item_changes(self):
+        changes = []
+        self.index.add_listener(lambda change, payload: changes.append((change, payload)))
+        self.index.search(10)
+        self.assertEqual(changes, [])
+        self.index.apply_upsert([{"id": 5, "name": "burger", "price": 4.5}, {"id": 1, "name": "pizza", "price": 0.99}])
+        self.index.apply_upsert([{"id": 2, "name": "salad", "price": 5.99}])
+        self.index.apply_delete([3, 42])
+        self.assertEqual(changes, [
+            ("insert", [{"id": 5, "name": "burger", "price": 4.5}]),
+            ("update", [{"id": 1, "name": "pizza", "price": 0.99}]),
+            ("delete", [3]),
+        ])
+
+    def test_listeners_get_reload_diff(self):
+        changes = []
+        self.index.add_listener(lambda change, payload: changes.append((change, payload)))
+        self.index.search(10)
+        self.rows[0]["price"] = 7.49
+        del self.rows[1]
+        self.rows.append({"id": 6, "name": "tea", "price": 1.49})
+        self.index.invalidate()
+        self.index.search(10)
+        self.assertEqual(changes, [
+            ("insert", [{"id": 6, "name": "tea", "price": 1.49}]),
+            ("update", [{"id": 1, "name": "pizza", "price": 7.49}]),
+            ("delete", [2]),
+        ])
+
+    def test_accepts_limits_the_index(self):
+        self.rows[1]["tenant_id"] = "a"
+        index = MenuIndex(self.load, clock=self.clock, accepts=lambda row: row.get("tenant_id") is None)
+        self.assertEqual(self.names(index.search(10)), ["soda", "coffee", "pizza"])
+        changes = []
+        index.add_listener(lambda change, payload: changes.append((change, payload)))
+        index.apply_upsert([{"id": 7, "name": "cake", "price": 3.0, "tenant_id": "a"},
+                            {"id": 3, "name": "soda", "price": 1.99, "tenant_id": "b"}])
+        self.assertEqual(self.names(index.search(10)), ["coffee", "pizza"])
+        self.assertEqual(changes, [("delete", [3])])
+
+
+if __name__ == "__main__":
+    unittest.main()
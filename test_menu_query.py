@@ -0,0 +1,158 @@
+import random
+import unittest
+
+from postgrest import SyncPostgrestClient
+
+from menu_query import MenuQuery, QueryEngine, QueryEngineCache, QueryError, apply_menu_query, tokenize
+from menu_store import MenuStore
+
+
+ROWS = [
+    {"id": 1, "name": "Pepperoni Pizza", "price": 6.99, "imageurl": "p.jpg"},
+    {"id": 2, "name": "Caesar Salad", "price": 5.99, "imageurl": "s.jpg"},
+    {"id": 3, "name": "Soda", "price": 1.99, "imageurl": None},
+    {"id": 4, "name": "Iced Coffee", "price": 2.99, "imageurl": "c.jpg"},
+    {"id": 5, "name": "Tea", "price": 1.99, "imageurl": None},
+    {"id": 6, "name": "Pizza Slice", "price": 3.49, "imageurl": "ps.jpg"},
+]
+
+
+def brute_force(rows, query):
+    """Reference answer: filter every row, then sort the way QueryEngine does"""
+    def matches(row):
+        name = row["name"].casefold()
+        words = tokenize(name)
+        return ((query.min_price is None or row["price"] >= query.min_price)
+                and (query.max_price is None or row["price"] <= query.max_price)
+                and (not query.prefix or name.startswith(query.prefix))
+                and all(any(word.startswith(token) for word in words) for token in query.tokens))
+
+    positions = [position for position, row in enumerate(rows) if matches(row)]
+    if query.sort.lstrip("-") == "name":
+        key = lambda position: (rows[position]["name"].casefold(), rows[position]["price"], position)
+    else:
+        key = lambda position: (rows[position]["price"], position)
+    positions.sort(key=key, reverse=query.sort.startswith("-"))
+    return query.project(rows[position] for position in positions[:query.limit])
+
+
+class TestMenuQuery(unittest.TestCase):
+
+    def test_defaults(self):
+        query = MenuQuery.from_args({})
+        self.assertEqual((query.min_price, query.max_price, query.prefix, query.tokens, query.sort),
+                         (None, None, None, [], "price"))
+
+    def test_parses_filters(self):
+        query = MenuQuery.from_args({"min_price": "2", "max_price": "6.5", "prefix": " Piz ",
+                                     "q": "Iced  coffee!", "sort": "-name", "limit": "5"})
+        self.assertEqual((query.min_price, query.max_price), (2.0, 6.5))
+        self.assertEqual(query.prefix, "piz")
+        self.assertEqual(query.tokens, ["iced", "coffee"])
+        self.assertEqual((query.sort, query.limit), ("-name", 5))
+
+    def test_invalid_params(self):
+        for args in ({"min_price": "cheap"}, {"max_price": "nan"}, {"sort": "id"},
+                     {"limit": "0"}, {"fields": "password"}):
+            with self.assertRaises(QueryError):
+                MenuQuery.from_args(args)
+
+
+class TestQueryEngine(unittest.TestCase):
+
+    def run_query(self, rows=ROWS, **args):
+        query = MenuQuery.from_args(args)
+        return QueryEngine(rows).run(query), brute_force(rows, query)
+
+    def test_price_range_sorted_by_price(self):
+        result, expected = self.run_query(min_price="2", max_price="6")
+        self.assertEqual([row["id"] for row in result], [4, 6, 2])
+        self.assertEqual(result, expected)
+
+    def test_equal_prices_keep_insertion_order(self):
+        result, _ = self.run_query(max_price="2")
+        self.assertEqual([row["id"] for row in result], [3, 5])
+        result, _ = self.run_query(max_price="2", sort="-price")
+        self.assertEqual([row["id"] for row in result], [5, 3])
+
+    def test_prefix_sorted_by_name(self):
+        result, expected = self.run_query(prefix="pi", sort="-name")
+        self.assertEqual([row["id"] for row in result], [6])
+        self.assertEqual(result, expected)
+
+    def test_tokens_match_word_prefixes(self):
+        result, expected = self.run_query(q="piz")
+        self.assertEqual([row["id"] for row in result], [6, 1])
+        self.assertEqual(result, expected)
+        result, _ = self.run_query(q="iced cof")
+        self.assertEqual([row["id"] for row in result], [4])
+        result, _ = self.run_query(q="pizza salad")
+        self.assertEqual(result, [])
+
+    def test_fields_and_limit(self):
+        result, _ = self.run_query(sort="name", limit="2", fields="id,name")
+        self.assertEqual(result, [{"id": 2, "name": "Caesar Salad"}, {"id": 4, "name": "Iced Coffee"}])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(13)
+        words = ["pizza", "salad", "soup", "wrap", "taco", "sushi", "bowl", "curry", "noodle", "pie"]
+        rows = [{"id": i, "name": " ".join(rng.sample(words, rng.randint(1, 3))).title(),
+                 "price": round(rng.uniform(0, 20), 1), "imageurl": None} for i in range(2000)]
+        engine = QueryEngine(rows)
+        for _ in range(300):
+            args = {"sort": rng.choice(["price", "-price", "name", "-name"]),
+                    "limit": str(rng.choice([1, 10, 500, 2000]))}
+            if rng.random() < 0.5:
+                args["min_price"] = str(rng.uniform(0, 20))
+            if rng.random() < 0.5:
+                args["max_price"] = str(rng.uniform(0, 20))
+            if rng.random() < 0.3:
+                args["prefix"] = rng.choice(words)[:rng.randint(1, 3)]
+            if rng.random() < 0.4:
+                args["q"] = " ".join(word[:rng.randint(1, 4)] for word in rng.sample(words, rng.randint(1, 2)))
+            query = MenuQuery.from_args(args)
+            self.assertEqual(engine.run(query), brute_force(rows, query), args)
+
+    def test_runs_over_menu_store(self):
+        store = MenuStore(ROWS)
+        query = MenuQuery.from_args({"q": "pizza", "sort": "-price"})
+        self.assertEqual([row["name"] for row in QueryEngine(store).run(query)], ["Pepperoni Pizza", "Pizza Slice"])
+
+
+class TestQueryEngineCache(unittest.TestCase):
+
+    def test_rebuilds_when_version_changes(self):
+        cache, loads = QueryEngineCache(), []
+
+        def load():
+            loads.append(1)
+            return ROWS
+
+        first = cache.get(1, load)
+        self.assertIs(cache.get(1, load), first)
+        self.assertIsNot(cache.get(2, load), first)
+        self.assertEqual(len(loads), 2)
+
+
+class TestApplyMenuQuery(unittest.TestCase):
+
+    def params(self, **args):
+        query = SyncPostgrestClient("http://localhost").from_("lunch_db").select("*")
+        return apply_menu_query(query, MenuQuery.from_args(args)).params
+
+    def test_filters_and_order(self):
+        params = self.params(min_price="1", max_price="5", prefix="Pi", q="ham", sort="-name", limit="3")
+        self.assertEqual(params.get_list("price"), ["gte.1.0", "lte.5.0"])
+        self.assertEqual(params.get_list("name"), ["ilike.pi*", "ilike.*ham*"])
+        self.assertEqual(params["order"], "name.desc,price.desc,id.desc")
+        self.assertEqual(params["limit"], "3")
+
+    def test_price_sort_has_no_name_key(self):
+        self.assertEqual(self.params()["order"], "price.asc,id.asc")
+
+    def test_like_wildcards_are_escaped(self):
+        self.assertEqual(self.params(prefix="100%_")["name"], "ilike.100\\%\\_*")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+
+from menu_store import MenuItem, MenuStore, ListMenuStore, BULK_REBUILD_THRESHOLD
+
+ITEMS = [
+    {"name": "pizza", "price": 6.99, "imageurl": "p.jpg"},
+    {"name": "salad", "price": 5.99, "imageurl": None},
+    {"name": "soda", "price": 1.99, "imageurl": "d.jpg"},
+    {"name": "coffee", "price": 2.99, "imageurl": "d.jpg"},
+]
+
+
+class TestMenuStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MenuStore(ITEMS)
+
+    def test_behaves_like_list_of_dicts(self):
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store[0], ITEMS[0])
+        self.assertEqual(self.store[-1], ITEMS[-1])
+        self.assertEqual(self.store[1:3], ITEMS[1:3])
+        self.assertEqual(list(self.store), ITEMS)
+        self.assertEqual(self.store, ITEMS)
+        with self.assertRaises(IndexError):
+            self.store[4]
+
+    def test_search_matches_linear_scan_in_insertion_order(self):
+        reference = ListMenuStore(ITEMS)
+        for price in (0, 1.99, 2.5, 2.999, 5.99, 6.99, 100, float('inf'), float('nan')):
+            self.assertEqual(self.store.search(price), reference.search(price), price)
+
+    def test_append_keeps_index_sorted(self):
+        self.store.append({"name": "tea", "price": 1.0, "imageurl": None})
+        self.store.append({"name": "cake", "price": 1.99, "imageurl": None})
+        self.assertEqual([item["name"] for item in self.store.search(2)], ["soda", "tea", "cake"])
+        self.assertEqual(self.store[-1]["price"], 1.99)
+
+    def test_bulk_extend_rebuilds_index(self):
+        items = [{"name": f"item{i}", "price": float(i % 10), "imageurl": None}
+                 for i in range(BULK_REBUILD_THRESHOLD * 2)]
+        store = MenuStore()
+        store.extend(items)
+        store.append({"name": "late", "price": 0.5, "imageurl": None})
+        self.assertEqual(store.search(3), ListMenuStore(items + [store[-1]]).search(3))
+
+    def test_strings_are_interned(self):
+        self.store.extend([{"name": "soda", "price": 1.5, "imageurl": "d.jpg"}] * 10)
+        self.assertEqual(len(self.store._strings), 6)
+        self.assertIs(self.store[-1]["name"], self.store[2]["name"])
+
+    def test_search_returns_stored_rows(self):
+        for price in (2.0, 100):
+            for item in self.store.search(price):
+                self.assertIsInstance(item, MenuItem)
+                self.assertTrue(any(item is row for row in self.store.copy()))
+        self.assertEqual(self.store[1].get("imageurl", "none"), None)
+        self.assertEqual(self.store[0].as_dict(), ITEMS[0])
+        with self.assertRaises(AttributeError):
+            self.store[0].calories = 300
+
+    def test_clear_and_copy(self):
+        snapshot = self.store.copy()
+        self.store.clear()
+        self.assertEqual(len(self.store), 0)
+        self.assertEqual(self.store.search(10), [])
+        self.store.extend(snapshot)
+        self.assertEqual(self.store, ITEMS)
+
+
+class TestColumnarRoutes(unittest.TestCase):
+
+    def test_rows_are_served_as_json_objects(self):
+        import budget_lunch_local_db
+        with patch.object(budget_lunch_local_db, 'lunch_db', MenuStore(ITEMS)):
+            client = budget_lunch_local_db.app.test_client()
+            self.assertEqual(client.get("/search/3").json, [ITEMS[2], ITEMS[3]])
+            self.assertEqual(client.get("/query?sort=price&limit=1").json, [ITEMS[2]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from auth_gateway import AuthGateway
+from menu_tenants import TenantMembers, TenantMenus, valid_tenant
+
+
+class TestTenantMenus(unittest.TestCase):
+
+    def setUp(self):
+        self.tables = {
+            'a': [{'id': 1, 'name': 'pizza', 'price': 6.99, 'tenant_id': 'a'}],
+            'b': [{'id': 2, 'name': 'soda', 'price': 1.99, 'tenant_id': 'b'},
+                  {'id': 3, 'name': 'tea', 'price': 2.5, 'tenant_id': 'b'}],
+            'c': [{'id': 4, 'name': 'soup', 'price': 4.0, 'tenant_id': 'c'}],
+        }
+        self.loaded = []
+        self.menus = TenantMenus(self.load, max_tenants=2, max_rows=100)
+
+    def load(self, tenant):
+        self.loaded.append(tenant)
+        return [dict(row) for row in self.tables.get(tenant, [])]
+
+    def names(self, tenant):
+        return [row['name'] for row in self.menus.get(tenant).index.all()]
+
+    def test_tenants_only_see_their_rows(self):
+        self.assertEqual(self.names('a'), ['pizza'])
+        self.assertEqual(self.names('b'), ['soda', 'tea'])
+        self.assertEqual(self.names('nobody'), [])
+
+    def test_least_recently_used_tenant_is_evicted(self):
+        self.names('a')
+        self.names('b')
+        old_scope = self.menus.get('b').scope
+        self.names('a')
+        self.names('c')
+        self.assertEqual([menu.tenant for menu in self.menus.resident()], ['a', 'c'])
+        self.assertEqual(self.menus.stats()['evictions'], 1)
+        self.assertEqual(self.menus.rows, 2)
+        # Loaded again on its next use, under a new scope
+        self.assertEqual(self.names('b'), ['soda', 'tea'])
+        self.assertEqual(self.loaded.count('b'), 2)
+        self.assertNotEqual(self.menus.get('b').scope, old_scope)
+
+    def test_row_cap_evicts_but_keeps_the_newest(self):
+        self.menus.max_rows = 2
+        self.names('a')
+        self.names('b')
+        self.assertEqual([menu.tenant for menu in self.menus.resident()], ['b'])
+        self.assertEqual(self.menus.rows, 2)
+        self.menus.max_rows = 1
+        self.names('b')
+        # Over the cap on its own, but just used
+        self.assertEqual(len(self.menus), 1)
+
+    def test_writes_only_move_their_tenant(self):
+        a, b = self.menus.get('a'), self.menus.get('b')
+        a.index.ensure_fresh()
+        b.index.ensure_fresh()
+        versions = (a.index.version, b.index.version)
+        self.menus.apply_upsert([{'id': 5, 'name': 'salad', 'price': 5.0, 'tenant_id': 'a'},
+                                 {'id': 6, 'name': 'cake', 'price': 3.0, 'tenant_id': 'c'}])
+        self.assertEqual(self.names('a'), ['salad', 'pizza'])
+        self.assertEqual((a.index.version, b.index.version), (versions[0] + 1, versions[1]))
+        # Not resident, so nothing to patch
+        self.assertNotIn('c', self.loaded)
+        self.menus.apply_delete([3])
+        self.assertEqual(self.names('b'), ['soda'])
+        self.assertEqual(a.index.version, versions[0] + 1)
+
+    def test_staleness_applies_to_every_tenant(self):
+        self.menus.get('a')
+        self.menus.max_staleness = 300
+        self.assertEqual(self.menus.get('a').index.max_staleness, 300)
+        self.assertEqual(self.menus.get('b').index.max_staleness, 300)
+
+    def test_valid_tenant(self):
+        for tenant in ('campus-1', 'downtown_2', 'a'):
+            self.assertTrue(valid_tenant(tenant))
+        for tenant in ('', 'Upper', '-x', 'a.b', 'a' * 64, 'x,y'):
+            self.assertFalse(valid_tenant(tenant))
+
+
+class TestTenantMembers(unittest.TestCase):
+
+    def test_answers_are_cached_for_ttl(self):
+        now = [0.0]
+        calls = []
+
+        def lookup(tenant, user_id):
+            calls.append((tenant, user_id))
+            return (tenant, user_id) == ('a', 'alice')
+
+        members = TenantMembers(lookup, ttl=30, clock=lambda: now[0])
+        self.assertTrue(members.is_member('a', 'alice'))
+        self.assertFalse(members.is_member('b', 'alice'))
+        self.assertTrue(members.is_member('a', 'alice'))
+        self.assertFalse(members.is_member('a', None))
+        self.assertEqual(len(calls), 2)
+        now[0] = 31
+        members.is_member('a', 'alice')
+        self.assertEqual(len(calls), 3)
+
+
+class TestTenantRoutes(unittest.TestCase):
+    """/t/<tenant>/ routes against the local fake Supabase"""
+
+    def setUp(self):
+        import budget_lunch
+        from fake_supabase import BENCH_EMAIL, BENCH_PASSWORD, FakeSupabase
+        from supabase_pool import SupabasePool
+        self.app_module = budget_lunch
+        self.fake = FakeSupabase(rows=30, tenants=3).start()
+        self.pool = SupabasePool(self.fake.url, 'anon', http2=False)
+        self.patches = [
+            patch.object(budget_lunch, 'supabase', self.pool),
+            patch.object(budget_lunch, 'auth_gateway', AuthGateway()),
+            patch.object(budget_lunch, 'TENANTS', True),
+            patch.object(budget_lunch, 'tenant_menus', TenantMenus(budget_lunch.load_tenant_menu)),
+            patch.object(budget_lunch, 'tenant_members', TenantMembers(budget_lunch.lookup_tenant_member)),
+        ]
+        for p in self.patches:
+            p.start()
+        budget_lunch.menu_index.invalidate()
+        self.client = budget_lunch.app.test_client()
+        login = self.client.post('/login', json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+        self.headers = {'Authorization': f"Bearer {login.json['access_token']}"}
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.app_module.menu_index.invalidate()
+        self.pool.close()
+        self.fake.stop()
+
+    def tenant_ids(self, tenant):
+        return {row['id'] for row in self.client.get(f'/t/{tenant}/search/100').json}
+
+    def test_search_and_query_are_scoped(self):
+        self.assertEqual(self.tenant_ids('t1'), {item_id for item_id in range(1, 31) if item_id % 3 == 1})
+        rows = self.client.get('/t/t2/query?sort=-price&limit=5').json
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(all(row['tenant_id'] == 't2' for row in rows))
+        self.assertEqual(self.client.get('/t/nobody/search/100').json, [])
+
+    def test_write_leaves_other_tenants_cached(self):
+        etags = {tenant: self.client.get(f'/t/{tenant}/search/100').headers['ETag'] for tenant in ('t0', 't1')}
+        response = self.client.get('/t/t1/add/bagel/1.25', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('bagel', [row['name'] for row in self.client.get('/t/t1/search/2').json])
+        self.assertNotEqual(self.client.get('/t/t1/search/100').headers['ETag'], etags['t1'])
+        unchanged = self.client.get('/t/t0/search/100', headers={'If-None-Match': etags['t0']})
+        self.assertEqual(unchanged.status_code, 304)
+
+    def test_edits_cannot_reach_other_tenants(self):
+        # Item 3 belongs to t0
+        item = {'name': 'stolen', 'price': 1.0, 'imageurl': None}
+        self.assertEqual(self.client.put('/t/t1/update/3', json=item, headers=self.headers).status_code, 404)
+        self.assertEqual(self.client.delete('/t/t1/delete/3', headers=self.headers).status_code, 404)
+        self.assertEqual(self.fake.select([('id', 'eq.3')])[0]['tenant_id'], 't0')
+        self.assertEqual(self.client.delete('/t/t0/delete/3', headers=self.headers).status_code, 200)
+        self.assertNotIn(3, self.tenant_ids('t0'))
+
+    def test_list_needs_auth_and_is_scoped(self):
+        self.assertEqual(self.app_module.app.test_client().get('/t/t0/list').status_code, 401)
+        rows = self.client.get('/t/t0/list?limit=100', headers=self.headers).json
+        self.assertEqual({row['tenant_id'] for row in rows['items']}, {'t0'})
+
+    def test_unscoped_routes_skip_tenant_rows(self):
+        # Every seeded row belongs to a tenant
+        self.assertEqual(self.client.get('/search/100').json, [])
+        self.assertEqual(self.client.get('/combo/50').json['combos'], [])
+        self.assertEqual(self.client.get('/img/3').status_code, 404)
+        self.client.get('/add/bagel/1.25', headers=self.headers)
+        self.assertEqual([row['name'] for row in self.client.get('/search/100').json], ['bagel'])
+        # Unscoped edits leave tenant items alone
+        item = {'name': 'stolen', 'price': 1.0, 'imageurl': None}
+        self.client.put('/update/3', json=item, headers=self.headers)
+        self.client.delete('/delete/3', headers=self.headers)
+        self.assertEqual(self.fake.select([('id', 'eq.3')])[0]['tenant_id'], 't0')
+        self.assertNotEqual(self.fake.select([('id', 'eq.3')])[0]['name'], 'stolen')
+        response = self.client.post('/bulk/items?mode=upsert', json=[{'id': 3, 'name': 'stolen', 'price': 1}],
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['errors'][0]['field'], 'id')
+        listed = self.client.get('/list?limit=100', headers=self.headers).json['items']
+        self.assertEqual([row['name'] for row in listed], ['bagel'])
+
+    def test_combo_image_and_home_are_scoped(self):
+        combos = self.client.get('/t/t0/combo/50?limit=3').json['combos']
+        self.assertTrue(combos)
+        self.assertTrue(all(row['tenant_id'] == 't0' for combo in combos for row in combo['items']))
+        # Item 3 belongs to t0
+        self.assertEqual(self.client.get('/t/t1/img/3').status_code, 404)
+        home = self.client.get('/t/t0/')
+        self.assertEqual(home.status_code, 200)
+        self.assertIn(b'menu_events', home.data)
+
+    def test_event_stream_is_scoped(self):
+        self.client.get('/t/t0/search/100')
+        stream = self.client.get('/t/t0/events/menu', buffered=False)
+        chunks = iter(stream.response)
+        self.assertIn(b'event: ready', next(chunks))
+        # Written elsewhere, e.g. arriving through the change feed
+        self.app_module.tenant_menus.apply_upsert([{'id': 90, 'name': 'cake', 'price': 3.0, 'tenant_id': 't1'},
+                                                   {'id': 91, 'name': 'bagel', 'price': 1.25, 'tenant_id': 't0'}])
+        insert = next(chunks)
+        self.assertIn(b'event: insert', insert)
+        self.assertIn(b'bagel', insert)
+        self.assertNotIn(b'cake', insert)
+        stream.close()
+
+    def test_edits_need_membership(self):
+        from fake_supabase import BENCH_EMAIL
+        self.fake.add_user('guest@example.com', 'guest-password')
+        client = self.app_module.app.test_client()
+        login = client.post('/login', json={'email': 'guest@example.com', 'password': 'guest-password'})
+        guest = {'Authorization': f"Bearer {login.json['access_token']}"}
+        self.assertEqual(client.get('/t/t0/add/bagel/1.25', headers=guest).status_code, 403)
+        self.assertEqual(client.delete('/t/t0/delete/3', headers=guest).status_code, 403)
+        self.assertEqual(self.fake.select([('id', 'eq.3')])[0]['tenant_id'], 't0')
+        self.assertEqual(self.app_module.app.test_client().get('/t/t0/add/bagel/1.25').status_code, 401)
+        self.assertTrue(self.app_module.tenant_members.is_member('t0', self.fake._users[BENCH_EMAIL][1]['id']))
+
+    def test_off_by_default_keeps_plain_queries(self):
+        with patch.object(self.app_module, 'TENANTS', False):
+            self.app_module.menu_index.invalidate()
+            self.assertEqual(self.client.get('/t/t0/search/100').status_code, 404)
+            # No tenant_id filter, so every row is on the plain menu
+            self.assertEqual(len(self.client.get('/search/100').json), 30)
+        self.app_module.menu_index.invalidate()
+
+    def test_missing_tenant_column_is_reported(self):
+        with patch('builtins.print') as printed:
+            self.app_module.check_tenant_column()
+        printed.assert_not_called()
+        # The fake answers 400, as PostgREST does for an unknown column
+        with patch.object(self.fake, 'select', side_effect=KeyError('tenant_id')), \
+                patch('builtins.print') as printed:
+            self.app_module.check_tenant_column()
+        self.assertIn('Tenant Menus migration', printed.call_args[0][0])
+
+    def test_malformed_tenant(self):
+        self.assertEqual(self.client.get('/t/Not.Valid/search/5').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
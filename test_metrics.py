@@ -0,0 +1,189 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from flask import Flask, Response
+
+import metrics
+from metrics import MetricsRegistry, install_metrics, record_supabase_call, supabase_operation
+
+
+def fake_call(method, url, prefer=None):
+    headers = {'prefer': prefer} if prefer else {}
+    return SimpleNamespace(method=method, url=url, headers=headers)
+
+
+def sample(metric, *labels):
+    return metrics.registry.collect()[metric.name].get(json.dumps(list(labels)))
+
+
+class TestMetricTypes(unittest.TestCase):
+
+    def test_counter_render_escapes_labels(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('things_total', 'Things', ('name',))
+        counter.inc('a"b\\c')
+        counter.inc('a"b\\c', amount=2)
+        self.assertEqual(registry.render(), (
+            '# HELP things_total Things\n'
+            '# TYPE things_total counter\n'
+            'things_total{name="a\\"b\\\\c"} 3\n'
+        ))
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, '/x')
+        lines = registry.render().splitlines()
+        self.assertIn('latency_seconds_bucket{route="/x",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{route="/x",le="1.0"} 2', lines)
+        self.assertIn('latency_seconds_bucket{route="/x",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_sum{route="/x"} 5.55', lines)
+        self.assertIn('latency_seconds_count{route="/x"} 3', lines)
+
+    def test_supabase_operation(self):
+        base = 'https://project.supabase.co'
+        self.assertEqual(supabase_operation('GET', f'{base}/rest/v1/lunch_db?price=lte.5'),
+                         ('rest', 'select', 'lunch_db'))
+        self.assertEqual(supabase_operation('POST', f'{base}/rest/v1/lunch_db'), ('rest', 'insert', 'lunch_db'))
+        self.assertEqual(supabase_operation('POST', f'{base}/rest/v1/lunch_db', 'resolution=merge-duplicates'),
+                         ('rest', 'upsert', 'lunch_db'))
+        self.assertEqual(supabase_operation('DELETE', f'{base}/rest/v1/lunch_db?id=eq.1'),
+                         ('rest', 'delete', 'lunch_db'))
+        self.assertEqual(supabase_operation('POST', f'{base}/rest/v1/rpc/update_menu_items'),
+                         ('rest', 'rpc', 'update_menu_items'))
+        self.assertEqual(supabase_operation('POST', f'{base}/auth/v1/token?grant_type=password'),
+                         ('auth', 'sign_in', ''))
+        self.assertEqual(supabase_operation('GET', f'{base}/auth/v1/user'), ('auth', 'get_user', ''))
+
+    def test_job_hooks(self):
+        metrics.record_job_depth('hooks_test', 3, 1)
+        metrics.record_job_depth('hooks_test', 2, 1)
+        metrics.record_job('hooks_test', 'ok', 0.5, 0.02)
+        metrics.record_job('hooks_test', 'rejected')
+        self.assertEqual(sample(metrics.job_queue_depth, 'hooks_test'), 2)
+        self.assertEqual(sample(metrics.jobs, 'hooks_test', 'rejected'), 1)
+        self.assertEqual(sample(metrics.job_wait, 'hooks_test')[-1], 1)
+
+
+class TestWorkerMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_registry(self):
+        registry = MetricsRegistry(self.directory)
+        counter = registry.counter('hits_total', 'Hits')
+        gauge = registry.gauge('busy', 'Busy')
+        return registry, counter, gauge
+
+    def test_counters_add_up_and_dead_gauges_drop(self):
+        # A worker that has exited: its counters still count, its gauge does not
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        with open(os.path.join(self.directory, f'{dead.pid}.json'), 'w') as f:
+            json.dump({'hits_total': {'[]': 4}, 'busy': {'[]': 7}}, f)
+
+        registry, counter, gauge = self.make_registry()
+        counter.inc(amount=2)
+        gauge.inc()
+        lines = registry.render().splitlines()
+        self.assertIn('hits_total 6', lines)
+        self.assertIn('busy 1', lines)
+
+    def test_exited_workers_are_folded_into_one_file(self):
+        for hits in (4, 5):
+            dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+            dead.wait()
+            with open(os.path.join(self.directory, f'{dead.pid}.json'), 'w') as f:
+                json.dump({'hits_total': {'[]': hits}, 'busy': {'[]': 7}}, f)
+            registry, counter, _ = self.make_registry()
+            self.assertIn('hits_total', registry.render())
+        counter.inc(amount=2)
+        self.assertIn('hits_total 11', registry.render().splitlines())
+        self.assertEqual(sorted(os.listdir(self.directory)), ['.retire.lock', f'{os.getpid()}.json', 'retired.json'])
+        with open(os.path.join(self.directory, 'retired.json')) as f:
+            self.assertEqual(json.load(f), {'hits_total': {'[]': 9}})
+
+
+class TestMetricsMiddleware(unittest.TestCase):
+
+    def make_app(self):
+        app = Flask(__name__)
+
+        @app.route('/items/<int:item_id>')
+        def item(item_id):
+            # Stands in for the transport hook during a Supabase call
+            record_supabase_call(fake_call('GET', 'https://x.supabase.co/rest/v1/lunch_db'), 0.25,
+                                 status_code=200)
+            return {'id': item_id}
+
+        @app.route('/stream')
+        def stream():
+            return Response((chunk for chunk in ('a', 'b')), mimetype='text/plain')
+
+        install_metrics(app)
+        return app
+
+    def test_route_label_status_and_remote_time(self):
+        client = self.make_app().test_client()
+        before = sample(metrics.http_requests, '/items/<int:item_id>', 'GET', '200') or 0
+        remote_before = sample(metrics.http_remote, '/items/<int:item_id>')
+        calls_before = sample(metrics.supabase_requests, 'rest', 'select', 'lunch_db', '2xx') or 0
+
+        # Servers close the body once sent; that is when a request is counted
+        for path, status in (('/items/3', 200), ('/items/4', 200), ('/nowhere', 404)):
+            with client.get(path) as response:
+                self.assertEqual(response.status_code, status)
+
+        self.assertEqual(sample(metrics.http_requests, '/items/<int:item_id>', 'GET', '200'), before + 2)
+        self.assertGreaterEqual(sample(metrics.http_requests, metrics.UNMATCHED_ROUTE, 'GET', '404'), 1)
+        remote = sample(metrics.http_remote, '/items/<int:item_id>')
+        remote_sum = remote[-2] - (remote_before[-2] if remote_before else 0)
+        self.assertAlmostEqual(remote_sum, 0.5)
+        self.assertEqual(sample(metrics.supabase_requests, 'rest', 'select', 'lunch_db', '2xx'), calls_before + 2)
+        self.assertEqual(sample(metrics.http_in_flight, '/items/<int:item_id>'), 0)
+
+    def test_streamed_body_is_counted_once_closed(self):
+        client = self.make_app().test_client()
+        before = sample(metrics.http_requests, '/stream', 'GET', '200') or 0
+        response = client.get('/stream', buffered=False)
+        self.assertEqual(sample(metrics.http_in_flight, '/stream'), 1)
+        self.assertEqual(b''.join(response.response), b'ab')
+        response.close()
+        self.assertEqual(sample(metrics.http_in_flight, '/stream'), 0)
+        self.assertEqual(sample(metrics.http_requests, '/stream', 'GET', '200'), before + 1)
+
+    def test_metrics_endpoint(self):
+        response = self.make_app().test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE budget_lunch_http_requests_total counter', response.get_data(as_text=True))
+
+    def test_metrics_token(self):
+        with patch.dict(os.environ, {'METRICS_TOKEN': 's3cret'}):
+            client = self.make_app().test_client()
+        self.assertEqual(client.get('/metrics').status_code, 401)
+        self.assertEqual(client.get('/metrics', headers={'Authorization': 'Bearer s3creX'}).status_code, 401)
+        self.assertEqual(client.get('/metrics', headers={'Authorization': 'Bearer s3cr\u00e9t'}).status_code, 401)
+        response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_can_be_required(self):
+        with patch.dict(os.environ, {'METRICS_REQUIRE_TOKEN': '1'}):
+            app = self.make_app()
+        self.assertEqual(app.test_client().get('/metrics').status_code, 403)
+        app.config['METRICS_TOKEN'] = 's3cret'
+        response = app.test_client().get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
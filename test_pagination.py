@@ -0,0 +1,110 @@
+import unittest
+
+from pagination import PageRequest, PaginationError, decode_cursor, encode_cursor, iter_pages, MAX_PAGE_SIZE
+from menu_index import MenuIndex
+
+
+ROWS = [
+    {"id": 1, "name": "pizza", "price": 6.99, "imageurl": "p.jpg"},
+    {"id": 2, "name": "salad", "price": 5.99, "imageurl": "s.jpg"},
+    {"id": 3, "name": "soda", "price": 1.99, "imageurl": "d.jpg"},
+    {"id": 4, "name": "coffee", "price": 2.99, "imageurl": "c.jpg"},
+    {"id": 5, "name": "tea", "price": 1.99, "imageurl": "t.jpg"},
+]
+
+
+class TestPageRequest(unittest.TestCase):
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor({"id": 7, "price": 4.5})
+        self.assertEqual(decode_cursor(cursor), (4.5, 7))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(PaginationError):
+            decode_cursor("not-a-cursor")
+
+    def test_invalid_limit(self):
+        for value in ("0", "-3", "ten"):
+            with self.assertRaises(PaginationError):
+                PageRequest.from_args({"limit": value})
+
+    def test_limit_is_capped(self):
+        self.assertEqual(PageRequest.from_args({"limit": "100000"}).limit, MAX_PAGE_SIZE)
+
+    def test_unknown_field(self):
+        with self.assertRaises(PaginationError):
+            PageRequest.from_args({"fields": "id,password"})
+
+    def test_unpaginated_keeps_plain_list(self):
+        page = PageRequest.from_args({})
+        self.assertEqual(page.response(ROWS), ROWS)
+        self.assertEqual(page.select_columns(), "*")
+
+    def test_projection(self):
+        page = PageRequest.from_args({"fields": "name,price"})
+        self.assertEqual(page.response(ROWS[:1]), [{"name": "pizza", "price": 6.99}])
+        self.assertEqual(page.select_columns(), "name,price")
+
+    def test_stream_format(self):
+        self.assertEqual(PageRequest.from_args({"stream": "ndjson"}).stream, "ndjson")
+        self.assertIsNone(PageRequest.from_args({}).stream)
+        with self.assertRaises(PaginationError):
+            PageRequest.from_args({"stream": "xml"})
+        with self.assertRaises(PaginationError):
+            PageRequest.from_args({"stream": "json", "limit": "5"})
+
+    def test_paginated_select_keeps_cursor_columns(self):
+        page = PageRequest.from_args({"fields": "name", "limit": "2"})
+        self.assertEqual(page.select_columns(), "name,id,price")
+
+
+class TestIndexPagination(unittest.TestCase):
+
+    def setUp(self):
+        self.index = MenuIndex(lambda: [dict(row) for row in ROWS])
+
+    def fetch_all(self, max_price, limit):
+        names, cursor = [], None
+        while True:
+            args = {"limit": str(limit), "fields": "name"}
+            if cursor:
+                args["cursor"] = cursor
+            page = PageRequest.from_args(args)
+            body = page.response(self.index.search(max_price, after=page.after, limit=page.limit + 1))
+            names.extend(item["name"] for item in body["items"])
+            self.assertLessEqual(len(body["items"]), limit)
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return names
+
+    def test_pages_cover_everything_once(self):
+        self.assertEqual(self.fetch_all(10, 2), ["soda", "tea", "coffee", "salad", "pizza"])
+
+    def test_pages_respect_price_bound(self):
+        self.assertEqual(self.fetch_all(3, 1), ["soda", "tea", "coffee"])
+
+    def test_last_page_has_no_cursor(self):
+        page = PageRequest.from_args({"limit": "10"})
+        body = page.response(self.index.search(10, limit=page.limit + 1))
+        self.assertEqual(len(body["items"]), 5)
+        self.assertIsNone(body["next_cursor"])
+
+    def test_iter_pages_walks_whole_result(self):
+        calls = []
+
+        def fetch(page):
+            calls.append(page.after)
+            return self.index.search(10, after=page.after, limit=page.limit + 1)
+
+        pages = list(iter_pages(fetch, page_size=2, fields=["name"]))
+        self.assertEqual([[row["name"] for row in rows] for rows in pages],
+                         [["soda", "tea"], ["coffee", "salad"], ["pizza"]])
+        self.assertEqual(len(calls), 3)
+
+    def test_iter_pages_exact_multiple(self):
+        pages = list(iter_pages(lambda page: self.index.search(3, after=page.after, limit=page.limit + 1), page_size=3))
+        self.assertEqual([len(rows) for rows in pages], [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
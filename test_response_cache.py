@@ -0,0 +1,58 @@
+import unittest
+
+from flask import Flask
+
+from response_cache import ResponseCache, ENTRY_OVERHEAD
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_get_after_put(self):
+        cache = ResponseCache()
+        self.assertIsNone(cache.get('a'))
+        entry = cache.put('a', b'[1]')
+        self.assertIs(cache.get('a'), entry)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_evicts_least_recently_used_past_byte_bound(self):
+        cache = ResponseCache(max_bytes=2 * (ENTRY_OVERHEAD + 10))
+        cache.put('a', b'x' * 10)
+        cache.put('b', b'y' * 10)
+        cache.get('a')
+        cache.put('c', b'z' * 10)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertLessEqual(cache.size, cache.max_bytes)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_oversized_body_is_not_stored(self):
+        cache = ResponseCache(max_bytes=100)
+        entry = cache.put('big', b'x' * 1000)
+        self.assertEqual(entry.body, b'x' * 1000)
+        self.assertEqual(len(cache), 0)
+
+    def test_same_body_same_etag(self):
+        cache = ResponseCache()
+        self.assertEqual(cache.put((1, 5.0), b'[]').etag, cache.put((2, 5.0), b'[]').etag)
+        self.assertNotEqual(cache.put((1, 5.0), b'[]').etag, cache.put((3, 5.0), b'[1]').etag)
+
+    def test_conditional_request_gets_304(self):
+        cache = ResponseCache()
+        entry = cache.put('a', b'[1]')
+        app = Flask(__name__)
+        app.add_url_rule('/', 'search', lambda: entry.to_response('no-cache'))
+        client = app.test_client()
+
+        response = client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'[1]')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+
+        response = client.get('/', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from auth_gateway import AuthGateway
+from session_auth import SignedSession
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSignedSession(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.signed = SignedSession(ttl=300, clock=self.clock)
+        self.session = {}
+
+    def test_user_until_expiry(self):
+        self.signed.issue(self.session, 'u1', 'a@example.com')
+        user = self.signed.user(self.session)
+        self.assertEqual((user.id, user.email), ('u1', 'a@example.com'))
+        self.assertEqual(self.signed.expires_in(self.session), 300)
+        self.clock.now += 300
+        self.assertIsNone(self.signed.user(self.session))
+        self.assertEqual(self.signed.expires_in(self.session), 0)
+
+    def test_clear(self):
+        self.signed.issue(self.session, 'u1', 'a@example.com')
+        self.signed.clear(self.session)
+        self.assertIsNone(self.signed.user(self.session))
+        self.assertIsNone(self.signed.expires_in(self.session))
+
+
+class TestSignedSessionApp(unittest.TestCase):
+    """SESSION_MODE=signed against the local fake Supabase"""
+
+    def setUp(self):
+        import budget_lunch
+        from fake_supabase import BENCH_EMAIL, BENCH_PASSWORD, FakeSupabase
+        from supabase_pool import SupabasePool
+        self.app_module = budget_lunch
+        self.fake = FakeSupabase(rows=1).start()
+        self.pool = SupabasePool(self.fake.url, 'anon', http2=False)
+        self.clock = FakeClock()
+        self.patches = [
+            patch.object(budget_lunch, 'supabase', self.pool),
+            patch.object(budget_lunch, 'auth_gateway', AuthGateway()),
+            patch.object(budget_lunch, 'SESSION_MODE', 'signed'),
+            patch.object(budget_lunch, 'signed_session', SignedSession(ttl=300, clock=self.clock)),
+        ]
+        for p in self.patches:
+            p.start()
+        self.client = budget_lunch.app.test_client()
+        self.email = BENCH_EMAIL
+        login = self.client.post('/login', json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+        self.assertEqual(login.status_code, 200)
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.pool.close()
+        self.fake.stop()
+
+    def check_auth(self):
+        return self.client.get('/check-auth').json
+
+    def test_check_auth_is_answered_locally(self):
+        before = self.fake.requests
+        for _ in range(3):
+            data = self.check_auth()
+            self.assertTrue(data['authenticated'])
+            self.assertEqual(data['user']['email'], self.email)
+            self.assertEqual(data['session_expires_in'], 300)
+        # require_auth routes are checked the same way
+        self.assertEqual(self.client.get('/writes/nope').status_code, 404)
+        self.assertEqual(self.fake.requests, before)
+
+    def test_expired_session_is_refreshed(self):
+        self.clock.now += 301
+        before = self.fake.requests
+        data = self.check_auth()
+        self.assertTrue(data['authenticated'])
+        self.assertEqual(data['session_expires_in'], 300)
+        self.assertEqual(self.fake.requests, before + 1)
+        self.assertEqual(self.check_auth()['session_expires_in'], 300)
+        self.assertEqual(self.fake.requests, before + 1)
+
+    def test_refresh_endpoint(self):
+        self.clock.now += 200
+        response = self.client.post('/refresh-session')
+        self.assertEqual(response.json, {'success': True, 'expires_in': 300})
+
+    def test_revoked_session_is_signed_out_at_expiry(self):
+        self.fake.revoke(self.email)
+        self.assertTrue(self.check_auth()['authenticated'])
+        self.clock.now += 301
+        self.assertFalse(self.check_auth()['authenticated'])
+        # The spent session is dropped, not verified again by its access token
+        before = self.fake.requests
+        self.assertFalse(self.check_auth()['authenticated'])
+        self.assertEqual(self.fake.requests, before)
+        self.assertEqual(self.client.post('/refresh-session').status_code, 401)
+
+    def test_refresh_outage_keeps_the_session(self):
+        self.clock.now += 301
+        for status in (503, 500):
+            self.fake.auth_error_status = status
+            response = self.client.post('/refresh-session')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '5')
+            # Expired pages are told to wait, not sent to the login page
+            self.assertEqual(self.client.get('/writes/nope').status_code, 503)
+        self.fake.auth_error_status = None
+        response = self.client.post('/refresh-session')
+        self.assertEqual(response.json, {'success': True, 'expires_in': 300})
+
+    def test_unreachable_auth_keeps_the_session(self):
+        from supabase_pool import SupabasePool
+        self.clock.now += 301
+        # Nothing listens on the discard port
+        unreachable = SupabasePool('http://127.0.0.1:9', 'anon', http2=False)
+        with patch.object(self.app_module, 'supabase', unreachable):
+            self.assertEqual(self.client.post('/refresh-session').status_code, 503)
+        unreachable.close()
+        with self.client.session_transaction() as stored:
+            self.assertIn('refresh_token', stored)
+
+    def test_tampered_cookie_is_rejected(self):
+        cookie = self.client.get_cookie('session')
+        value = cookie.value
+        forged = value[:-2] + ('AA' if not value.endswith('AA') else 'BB')
+        self.client.set_cookie('session', forged)
+        self.assertFalse(self.check_auth()['authenticated'])
+
+    def test_logout_clears_signed_user(self):
+        self.client.post('/logout')
+        self.assertFalse(self.check_auth()['authenticated'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask
+
+from static_assets import AssetPipeline, IMMUTABLE_CACHE_CONTROL
+
+
+class TestAssetPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        with open(os.path.join(self.root, 'styles.css'), 'w') as f:
+            f.write('body { color: red; }\n' * 100)
+        with open(os.path.join(self.root, 'index.html'), 'w') as f:
+            f.write('<link rel="stylesheet" href="/styles.css"><p>hi</p>')
+        self.pipeline = AssetPipeline(self.root, assets=('styles.css',), pages=('index.html',))
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/', 'home', lambda: self.pipeline.serve('index.html'))
+        self.app.add_url_rule('/styles.css', 'css', lambda: self.pipeline.serve('styles.css'))
+        self.app.add_url_rule('/assets/<path:filename>', 'assets',
+                              lambda filename: self.pipeline.serve_fingerprinted(filename) or ('', 404))
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_page_references_are_fingerprinted(self):
+        url = self.pipeline.url_for('styles.css')
+        self.assertRegex(url, r'^/assets/styles\.[0-9a-f]{12}\.css$')
+        self.assertIn(url.encode(), self.client.get('/').data)
+
+    def test_fingerprinted_asset_is_immutable(self):
+        response = self.client.get(self.pipeline.url_for('styles.css'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response.content_type, 'text/css; charset=utf-8')
+
+    def test_unknown_fingerprint(self):
+        self.assertEqual(self.client.get('/assets/styles.000000000000.css').status_code, 404)
+
+    def test_legacy_url_revalidates(self):
+        response = self.client.get('/styles.css')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertIsNotNone(response.headers.get('ETag'))
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/styles.css').headers['ETag']
+        response = self.client.get('/styles.css', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_if_modified_since_returns_304(self):
+        last_modified = self.client.get('/styles.css').headers['Last-Modified']
+        response = self.client.get('/styles.css', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_page_is_as_new_as_its_assets(self):
+        os.utime(os.path.join(self.root, 'index.html'), (1000, 1000))
+        os.utime(os.path.join(self.root, 'styles.css'), (5000, 5000))
+        pipeline = AssetPipeline(self.root, assets=('styles.css',), pages=('index.html',))
+        self.assertEqual(pipeline.assets['index.html'].last_modified, 5000)
+        # A revalidation from before the stylesheet changed gets the new page
+        with self.app.test_request_context('/', headers={'If-Modified-Since': 'Thu, 01 Jan 1970 00:30:00 GMT'}):
+            self.assertEqual(pipeline.serve('index.html').status_code, 200)
+
+    def test_gzip_variant(self):
+        # Compressed on first request, not at startup
+        self.assertNotIn('gzip', self.pipeline.assets['styles.css'].variants)
+        response = self.client.get('/styles.css', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), self.pipeline.assets['styles.css'].body)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_identity_without_accept_encoding(self):
+        response = self.client.get('/styles.css')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, self.pipeline.assets['styles.css'].body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import unittest
+
+from flask import Flask
+
+from streaming import json_array_chunks, ndjson_chunks, stream_response
+
+PAGES = [[{"id": 1, "price": 1.5}, {"id": 2, "price": 2.0}], [], [{"id": 3, "price": 4.0}]]
+
+
+class TestEncoders(unittest.TestCase):
+
+    def test_json_array(self):
+        chunks = list(json_array_chunks(PAGES))
+        self.assertEqual(json.loads(''.join(chunks)), [row for rows in PAGES for row in rows])
+        self.assertEqual(len(chunks), 4)
+
+    def test_empty_json_array(self):
+        self.assertEqual(json.loads(''.join(json_array_chunks([[]]))), [])
+
+    def test_ndjson(self):
+        lines = ''.join(ndjson_chunks(PAGES)).splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [1, 2, 3])
+
+
+class TestStreamResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.fetched = 0
+
+        def pages():
+            for rows in PAGES:
+                self.fetched += 1
+                yield rows
+
+        app = Flask(__name__)
+        app.add_url_rule('/json', 'json', lambda: stream_response(pages(), 'json'))
+        app.add_url_rule('/ndjson', 'ndjson', lambda: stream_response(pages(), 'ndjson', 'menu.ndjson'))
+        self.client = app.test_client()
+
+    def test_body_is_produced_lazily(self):
+        response = self.client.get('/json', buffered=False)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(self.fetched, 0)
+        self.assertEqual(len(json.loads(response.get_data())), 3)
+        self.assertEqual(self.fetched, 3)
+
+    def test_ndjson_headers(self):
+        response = self.client.get('/ndjson')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=menu.ndjson')
+        self.assertEqual(response.headers['X-Accel-Buffering'], 'no')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from supabase_pool import SupabasePool
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Packages a worker should not pay for until it talks to Supabase
+DEFERRED_MODULES = ('postgrest', 'supabase_auth', 'pydantic', 'realtime', 'httpcore._sync')
+
+
+class TestLazyClients(unittest.TestCase):
+
+    def test_clients_are_built_on_first_use(self):
+        from fake_supabase import FakeSupabase
+        fake = FakeSupabase(rows=3).start()
+        pool = SupabasePool(fake.url, 'anon', http2=False)
+        try:
+            self.assertIsNone(pool._postgrest)
+            self.assertIsNone(pool._rest_http)
+            self.assertEqual(len(pool.table('lunch_db').select('*').execute().data), 3)
+            self.assertIsNotNone(pool._rest_http)
+            self.assertIsNone(pool._auth)
+            self.assertIs(pool.postgrest, pool.postgrest)
+        finally:
+            pool.close()
+            fake.stop()
+
+    def test_close_before_use(self):
+        SupabasePool('http://127.0.0.1:9', 'anon').close()
+
+
+class TestPoolStats(unittest.TestCase):
+
+    def setUp(self):
+        from fake_supabase import FakeSupabase
+        self.fake = FakeSupabase(rows=3).start()
+        self.pool = SupabasePool(self.fake.url, 'anon', http2=False)
+
+    def tearDown(self):
+        self.pool.close()
+        self.fake.stop()
+
+    def test_counts_requests_and_connections(self):
+        self.pool.table('lunch_db').select('*').execute()
+        stats = self.pool.pool_stats()
+        self.assertEqual(stats['rest']['requests'], 1)
+        self.assertEqual(stats['rest']['connections'], 1)
+        self.assertEqual(stats['auth']['requests'], 0)
+
+    def test_survives_httpx_internals_changing(self):
+        self.pool.table('lunch_db').select('*').execute()
+        transport = self.pool._transports['rest']._transport
+        connection_pool = transport._pool
+        del transport._pool
+        try:
+            stats = self.pool.pool_stats()['rest']
+        finally:
+            transport._pool = connection_pool
+        self.assertNotIn('connections', stats)
+        self.assertEqual(stats['requests'], 1)
+
+    def test_pool_stats_route_needs_metrics_token(self):
+        import budget_lunch
+        with patch.object(budget_lunch, 'supabase', self.pool), \
+                patch.dict(budget_lunch.app.config, {'METRICS_TOKEN': 's3cret'}):
+            client = budget_lunch.app.test_client()
+            self.assertEqual(client.get('/pool-stats').status_code, 401)
+            response = client.get('/pool-stats', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('rest', response.json)
+
+
+class TestListAlongsideAuth(unittest.TestCase):
+    """/list fetches its page while the token is verified"""
+
+    def setUp(self):
+        import budget_lunch
+        from auth_gateway import AuthGateway
+        from fake_supabase import BENCH_EMAIL, BENCH_PASSWORD, FakeSupabase
+        self.app_module = budget_lunch
+        self.fake = FakeSupabase(rows=5).start()
+        self.pool = SupabasePool(self.fake.url, 'anon', http2=False)
+        self.patches = [
+            patch.object(budget_lunch, 'supabase', self.pool),
+            patch.object(budget_lunch, 'auth_gateway', AuthGateway()),
+        ]
+        for p in self.patches:
+            p.start()
+        self.client = budget_lunch.app.test_client()
+        login = self.client.post('/login', json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+        self.headers = {'Authorization': f"Bearer {login.json['access_token']}"}
+        budget_lunch.token_cache.clear()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.app_module.token_cache.clear()
+        self.pool.close()
+        self.fake.stop()
+
+    def test_query_runs_while_token_is_verified(self):
+        # Each side waits for the other, so running them in turn breaks the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        verify, fetch = self.app_module.verify_jwt_token, self.app_module.fetch_menu_page
+
+        def verify_jwt_token(token):
+            barrier.wait()
+            return verify(token)
+
+        def fetch_menu_page(page, tenant=None):
+            barrier.wait()
+            return fetch(page, tenant)
+
+        with patch.object(self.app_module, 'verify_jwt_token', verify_jwt_token), \
+                patch.object(self.app_module, 'fetch_menu_page', fetch_menu_page):
+            response = self.client.get('/list?limit=3', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json['items']), 3)
+
+    def test_no_query_without_credentials(self):
+        with patch.object(self.app_module, 'fetch_menu_page') as fetch:
+            self.assertEqual(self.app_module.app.test_client().get('/list').status_code, 401)
+        fetch.assert_not_called()
+
+    def test_bad_token_gets_401_not_the_page(self):
+        client = self.app_module.app.test_client()
+        response = client.get('/list?limit=3', headers={'Authorization': 'Bearer nope'})
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('items', response.json)
+
+    def test_bad_arguments_are_reported_after_auth(self):
+        self.assertEqual(self.app_module.app.test_client().get('/list?limit=x').status_code, 401)
+        self.assertEqual(self.client.get('/list?limit=x', headers=self.headers).status_code, 400)
+
+
+class TestImportCost(unittest.TestCase):
+
+    def imported_after(self, code):
+        script = f"import json, sys; {code}; print(json.dumps(sorted(sys.modules)))"
+        result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+        return set(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    def test_app_import_defers_supabase_packages(self):
+        modules = self.imported_after('import budget_lunch')
+        self.assertEqual([name for name in DEFERRED_MODULES if name in modules], [])
+
+    def test_warm_up_builds_clients(self):
+        modules = self.imported_after("import budget_lunch; budget_lunch.app.extensions['warm_up']()")
+        self.assertIn('postgrest', modules)
+        self.assertIn('supabase_auth', modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
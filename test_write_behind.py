@@ -0,0 +1,193 @@
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from write_behind import ItemNotFound, WriteBehindQueue
+
+
+class RecordingFlush:
+    """flush callable that records batches, optionally blocking or failing"""
+
+    def __init__(self):
+        self.batches = []
+        self.error = None
+        self.gate = None
+        self.started = threading.Event()
+
+    def __call__(self, updates, deletes):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        self.batches.append((updates, deletes))
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.flush = RecordingFlush()
+        self.queue = WriteBehindQueue(self.flush, window=0.05)
+
+    def test_updates_to_one_item_are_coalesced(self):
+        first = self.queue.update(1, {'price': 2.0})
+        second = self.queue.update(1, {'price': 3.0})
+        other = self.queue.update(2, {'price': 4.0})
+        self.assertTrue(second.wait(5))
+        self.assertTrue(first.done() and other.done())
+        self.assertEqual(self.flush.batches, [([{'id': 1, 'price': 3.0}, {'id': 2, 'price': 4.0}], [])])
+        self.assertEqual(self.queue.stats()['coalesced'], 1)
+
+    def test_delete_wins_over_update(self):
+        self.queue.update(1, {'price': 2.0})
+        self.queue.delete(1)
+        ticket = self.queue.update(1, {'price': 5.0})
+        self.assertTrue(ticket.wait(5))
+        self.assertEqual(self.flush.batches, [([], [1])])
+
+    def test_edit_during_flight_goes_to_next_batch(self):
+        self.flush.gate = threading.Event()
+        self.queue.update(1, {'price': 2.0})
+        self.assertTrue(self.flush.started.wait(5))
+        later = self.queue.update(1, {'price': 9.0})
+        self.flush.gate.set()
+        self.assertTrue(later.wait(5))
+        self.assertEqual([batch[0] for batch in self.flush.batches],
+                         [[{'id': 1, 'price': 2.0}], [{'id': 1, 'price': 9.0}]])
+
+    def test_failed_flush_resolves_tickets_with_error(self):
+        self.flush.error = RuntimeError('down')
+        ticket = self.queue.delete(3)
+        self.assertTrue(ticket.wait(5))
+        self.assertEqual(ticket.status(), 'failed')
+        self.assertEqual(self.queue.stats()['failures'], 1)
+        self.assertIs(self.queue.ticket(ticket.write_id), ticket)
+
+    def test_missing_ids_fail_their_tickets(self):
+        flush = lambda updates, deletes: [2]
+        queue = WriteBehindQueue(flush, window=0.01)
+        found = queue.update(1, {'price': 1.0})
+        missing = queue.update(2, {'price': 1.0})
+        self.assertTrue(missing.wait(5))
+        self.assertEqual((found.status(), missing.status()), ('done', 'not_found'))
+        self.assertIsInstance(missing.error, ItemNotFound)
+        self.assertEqual(queue.stats()['missing'], 1)
+
+    def test_max_batch_flushes_early(self):
+        queue = WriteBehindQueue(self.flush, window=60, max_batch=2)
+        queue.update(1, {'price': 1.0})
+        ticket = queue.update(2, {'price': 1.0})
+        self.assertTrue(ticket.wait(5))
+
+    def test_overlay_applies_queued_and_recent_writes(self):
+        rows = [{'id': 1, 'price': 1.0}, {'id': 2, 'price': 2.0}, {'id': 3, 'price': 3.0}]
+        since = self.queue.generation()
+        self.queue.update(1, {'price': 7.0})
+        self.assertTrue(self.queue.delete(2).wait(5))
+        self.flush.gate = threading.Event()
+        self.queue.update(3, {'price': 8.0})
+        # The first batch is flushed, the second queued or in flight: both apply
+        self.assertEqual(self.queue.overlay(rows, since), [{'id': 1, 'price': 7.0}, {'id': 3, 'price': 8.0}])
+        self.flush.gate.set()
+        self.assertTrue(self.queue.drain(5))
+        self.assertEqual(self.queue.overlay(rows, self.queue.generation()), rows)
+
+
+class TestWriteBehindApp(unittest.TestCase):
+    """/update and /delete through the queue, against the local fake Supabase"""
+
+    @classmethod
+    def setUpClass(cls):
+        import budget_lunch
+        from fake_supabase import BENCH_EMAIL, BENCH_PASSWORD, FakeSupabase
+        from supabase_pool import SupabasePool
+        cls.app_module = budget_lunch
+        cls.fake = FakeSupabase(rows=20).start()
+        cls.pool = SupabasePool(cls.fake.url, 'anon', http2=False)
+        cls.patches = [patch.object(budget_lunch, 'supabase', cls.pool), patch.object(budget_lunch, 'WRITE_BEHIND', True)]
+        for p in cls.patches:
+            p.start()
+        budget_lunch.menu_index.invalidate()
+        cls.client = budget_lunch.app.test_client()
+        login = cls.client.post('/login', json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+        cls.headers = {'Authorization': f"Bearer {login.json['access_token']}"}
+
+    @classmethod
+    def tearDownClass(cls):
+        for p in cls.patches:
+            p.stop()
+        cls.app_module.menu_index.invalidate()
+        cls.pool.close()
+        cls.fake.stop()
+
+    def stored(self, item_id):
+        return self.fake.select([('id', f'eq.{item_id}')])
+
+    def test_update_is_visible_before_and_after_flush(self):
+        response = self.client.put('/update/5', json={'name': 'queued soup', 'price': 0.05, 'imageurl': None},
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('queued soup', [row['name'] for row in self.client.get('/search/0.05').json])
+        status = self.client.get(f"/writes/{response.json['write_id']}?wait=5", headers=self.headers).json
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(self.stored(5)[0]['name'], 'queued soup')
+
+    def test_delete_with_wait(self):
+        response = self.client.delete('/delete/7?wait=1', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored(7), [])
+        self.assertNotIn(7, [row['id'] for row in self.client.get('/search/100').json])
+
+    def test_update_after_queued_delete_is_not_resurrected(self):
+        self.assertEqual(self.client.delete('/delete/9', headers=self.headers).status_code, 202)
+        response = self.client.put('/update/9', json={'name': 'ghost', 'price': 1.0, 'imageurl': None},
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.stored(9), [])
+        self.assertNotIn(9, [row['id'] for row in self.client.get('/search/100').json])
+
+    def test_flush_does_not_recreate_rows_deleted_elsewhere(self):
+        response = self.client.put('/update/11', json={'name': 'late edit', 'price': 2.0, 'imageurl': None},
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 202)
+        # Deleted on another node before the batch goes out
+        self.fake.delete([('id', 'eq.11')])
+        self.app_module.write_queue.drain(5)
+        self.assertEqual(self.stored(11), [])
+        self.assertNotIn(11, [row['id'] for row in self.client.get('/search/100').json])
+        status = self.client.get(f"/writes/{response.json['write_id']}", headers=self.headers).json
+        self.assertEqual((status['status'], status['error']), ('not_found', 'Unknown item'))
+
+    def test_wait_on_update_of_item_deleted_elsewhere_is_404(self):
+        self.app_module.menu_index.ensure_fresh()
+        self.fake.delete([('id', 'eq.13')])
+        response = self.client.put('/update/13?wait=1', json={'name': 'late edit', 'price': 2.0, 'imageurl': None},
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json['error'], 'Unknown item')
+        self.assertEqual(self.stored(13), [])
+
+    def test_batch_is_one_request(self):
+        self.app_module.write_queue.drain(5)
+        with patch.object(self.app_module.write_queue, 'window', 0.2), \
+                patch.object(self.pool, 'rpc', wraps=self.pool.rpc) as rpc, \
+                patch.object(self.fake, 'update', wraps=self.fake.update) as patched:
+            tickets = [self.client.put(f'/update/{item_id}', json={'name': 'batched', 'price': 3.0, 'imageurl': None},
+                                       headers=self.headers).json['write_id'] for item_id in (15, 16, 17)]
+            self.app_module.write_queue.drain(5)
+        self.assertEqual(rpc.call_count, 1)
+        self.assertEqual(len(rpc.call_args[0][1]['items']), 3)
+        patched.assert_not_called()
+        self.assertEqual([self.stored(item_id)[0]['name'] for item_id in (15, 16, 17)], ['batched'] * 3)
+        self.assertEqual({self.app_module.write_queue.ticket(write_id).status() for write_id in tickets}, {'done'})
+
+    def test_unknown_write_id(self):
+        self.assertEqual(self.client.get('/writes/nope', headers=self.headers).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class ItemNotFound(LookupError):
+    """A queued update whose item no longer existed when it was flushed"""
+
+
+class WriteTicket:
+    """Acknowledgment for one queued write; `wait()` blocks until it is flushed"""
+
+    def __init__(self, write_id, item_id):
+        self.write_id = write_id
+        self.item_id = item_id
+        self.error = None
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """True once the batch holding this write was flushed (check `error`)"""
+        return self._done.wait(timeout)
+
+    def status(self):
+        if not self.done():
+            return 'pending'
+        if isinstance(self.error, ItemNotFound):
+            return 'not_found'
+        return 'failed' if self.error is not None else 'done'
+
+    def _resolve(self, error=None):
+        self.error = error
+        self._done.set()
+
+
+class WriteBehindQueue:
+    """Coalesces per-item updates and deletes and flushes them in batches
+
+    `update(item_id, values)` and `delete(item_id)` queue an operation and
+    return a WriteTicket right away. Operations on the same id are merged
+    while they wait: a later update replaces the earlier values, and a
+    delete wins over any update. `window` seconds after the first queued
+    operation (or once `max_batch` ids are waiting), a background thread
+    calls `flush(updates, deletes)` with the merged rows and ids; it may
+    return the ids of updates that matched no row, whose tickets then fail
+    with ItemNotFound. There is
+    only one flusher thread, so an id edited again while its batch is in
+    flight goes into the next batch, and writes to one id are applied in
+    order.
+
+    `overlay(rows, since)` re-applies queued, in-flight and recently flushed
+    operations to rows read from the database, so a reload racing a flush
+    does not bring old values back. `since` comes from `generation()`,
+    taken before the read started.
+    """
+
+    def __init__(self, flush, window=0.05, max_batch=500, history=256, clock=time.monotonic):
+        self._flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()
+        self._waiters = {}
+        self._in_flight = {}
+        self._recent = deque(maxlen=history)
+        self._tickets = OrderedDict()
+        self._max_tickets = history * 16
+        self._generation = 0
+        self._first_at = None
+        self._next_write = 0
+        self._pid = None
+        self.submitted = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+        self.missing = 0
+
+    def update(self, item_id, values):
+        return self._submit(item_id, ('update', dict(values)))
+
+    def delete(self, item_id):
+        return self._submit(item_id, ('delete', None))
+
+    def _submit(self, item_id, op):
+        self._start()
+        with self._cond:
+            current = self._pending.get(item_id)
+            if current is not None:
+                self.coalesced += 1
+                if current[0] == 'delete':
+                    # Updating a deleted row matches nothing
+                    op = current
+            else:
+                if not self._pending:
+                    self._first_at = self._clock()
+            self._pending[item_id] = op
+            self._next_write += 1
+            ticket = WriteTicket(f"{os.getpid():x}-{self._next_write}", item_id)
+            self._waiters.setdefault(item_id, []).append(ticket)
+            self._tickets[ticket.write_id] = ticket
+            while len(self._tickets) > self._max_tickets:
+                self._tickets.popitem(last=False)
+            self.submitted += 1
+            self._cond.notify_all()
+        return ticket
+
+    def ticket(self, write_id):
+        """A ticket issued by this process, or None"""
+        with self._cond:
+            return self._tickets.get(write_id)
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # A forked worker inherits the queue's state but not its thread
+            self._pending.clear()
+            self._waiters.clear()
+            self._in_flight = {}
+            threading.Thread(target=self._run, name='write-behind', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._flush_next()
+
+    def _take_batch(self):
+        """Wait for the window to pass, then claim up to max_batch ids"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            while len(self._pending) < self.max_batch:
+                remaining = self._first_at + self.window - self._clock()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = {}
+            while self._pending and len(batch) < self.max_batch:
+                item_id, op = self._pending.popitem(last=False)
+                batch[item_id] = op
+            tickets = [ticket for item_id in batch for ticket in self._waiters.pop(item_id, [])]
+            self._in_flight = batch
+            self._first_at = self._clock() if self._pending else None
+            return batch, tickets
+
+    def _flush_next(self):
+        batch, tickets = self._take_batch()
+        updates = [{'id': item_id, **op[1]} for item_id, op in batch.items() if op[0] == 'update']
+        deletes = [item_id for item_id, op in batch.items() if op[0] == 'delete']
+        error = None
+        missing = set()
+        try:
+            missing = set(self._flush(updates, deletes) or ())
+        except Exception as e:
+            print(f"Write-behind flush error: {e}")
+            error = e
+        with self._cond:
+            self.missing += len(missing)
+            self._in_flight = {}
+            self.flushes += 1
+            if error is None:
+                self._generation += 1
+                self._recent.append((self._generation, batch))
+                self.flushed += len(batch)
+            else:
+                self.failures += 1
+            self._cond.notify_all()
+        for ticket in tickets:
+            if error is None and ticket.item_id in missing:
+                ticket._resolve(ItemNotFound(f"Item {ticket.item_id} no longer exists"))
+            else:
+                ticket._resolve(error)
+
+    def drain(self, timeout=None):
+        """Wait until nothing is queued or in flight; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def generation(self):
+        with self._cond:
+            return self._generation
+
+    def overlay(self, rows, since):
+        """`rows` with operations flushed after generation `since`, or not yet flushed, applied"""
+        with self._cond:
+            ops = {}
+            for generation, batch in self._recent:
+                if generation > since:
+                    ops.update(batch)
+            ops.update(self._in_flight)
+            ops.update(self._pending)
+        if not ops:
+            return rows
+        merged = []
+        for row in rows:
+            op = ops.get(row.get('id'))
+            if op is None:
+                merged.append(row)
+            elif op[0] == 'update':
+                merged.append({**row, **op[1]})
+        return merged
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self._pending),
+                'in_flight': len(self._in_flight),
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'flushes': self.flushes,
+                'flushed': self.flushed,
+                'failures': self.failures,
+                'missing': self.missing,
+            }